@@ -0,0 +1,80 @@
+"""
+Synthetic inputs for the render benchmarks.
+
+Everything is generated from a seed, so two runs of a benchmark render the
+same corpus.
+"""
+import math
+import random
+import wave
+from typing import List
+
+from dualang.subtitle_loader import Subtitle
+
+WORDS = [
+    "今日", "は", "とても", "いい", "天気", "です", "ね", "私", "の", "友達",
+    "が", "駅", "で", "待って", "います", "映画", "を", "見に", "行きましょう", "か",
+]
+
+# Longest cue, and share of the time between two cue starts that a cue fills
+MAX_CUE_MS = 4000
+CUE_FILL = 0.8
+
+
+def make_sentences(count: int, seed: int = 0) -> List[str]:
+    """
+    Returns `count` Japanese-looking sentences of 3 to 12 words. One sentence
+    in ten repeats an earlier one, as recurring lines do in real subtitles.
+    """
+    rng = random.Random(seed)
+    sentences: List[str] = []
+    for _ in range(count):
+        if sentences and rng.random() < 0.1:
+            sentences.append(rng.choice(sentences))
+        else:
+            sentences.append("".join(rng.choice(WORDS) for _ in range(rng.randint(3, 12))) + "。")
+    return sentences
+
+
+def make_subtitles(count: int, duration_ms: int, seed: int = 0) -> List[Subtitle]:
+    """
+    Returns `count` cues spread evenly over `duration_ms` of audio.
+    """
+    spacing = duration_ms / count
+    length = min(MAX_CUE_MS, int(spacing * CUE_FILL))
+    return [
+        Subtitle(int(i * spacing), int(i * spacing) + length, text)
+        for i, text in enumerate(make_sentences(count, seed))
+    ]
+
+
+def _timestamp(ms: int) -> str:
+    hours, ms = divmod(ms, 3600 * 1000)
+    minutes, ms = divmod(ms, 60 * 1000)
+    seconds, ms = divmod(ms, 1000)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d},{ms:03d}"
+
+
+def write_subtitle_file(subtitles: List[Subtitle], subtitle_file: str) -> None:
+    """Writes the cues as an SRT file."""
+    with open(subtitle_file, "w", encoding="utf-8") as f:
+        for i, subtitle in enumerate(subtitles, 1):
+            f.write(f"{i}\n{_timestamp(subtitle.start)} --> {_timestamp(subtitle.end)}\n{subtitle.text}\n\n")
+
+
+def write_source_audio(audio_file: str, duration_ms: int, frame_rate: int = 16000) -> None:
+    """
+    Writes `duration_ms` of a quiet 220 Hz mono tone as a 16-bit WAV file, one
+    second at a time, so even long sources take little memory to generate.
+    """
+    second = b"".join(
+        round(3000 * math.sin(2 * math.pi * 220 * i / frame_rate)).to_bytes(2, "little", signed=True)
+        for i in range(frame_rate)
+    )
+    with wave.open(audio_file, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(frame_rate)
+        for _ in range(duration_ms // 1000):
+            f.writeframes(second)
+        f.writeframes(second[: duration_ms % 1000 * frame_rate // 1000 * 2])
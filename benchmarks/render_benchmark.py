@@ -0,0 +1,211 @@
+"""
+Benchmarks the render commands on synthetic corpora.
+
+Each command is run once per corpus size with the fake translator and the
+offline tone TTS engine, so the numbers measure the render pipeline rather
+than network latency. Every run happens in a fresh process, and its wall
+time, peak RSS and output duration are written to a JSON file, so results
+of different sizes and revisions can be plotted against each other.
+
+Usage:
+    python -m benchmarks.render_benchmark --sizes 100:5,1000:30 --output results.json
+"""
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import List, Tuple
+
+from benchmarks.corpus import make_sentences, make_subtitles, write_source_audio, write_subtitle_file
+
+COMMANDS = ["fromaudio", "fromtext", "plaintext"]
+# (cues, minutes of source audio)
+DEFAULT_SIZES = [(100, 5), (500, 15), (1000, 30), (2500, 60), (5000, 120)]
+TRANSITION_SOUND = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "examples", "bell.wav")
+
+
+def parse_sizes(value: str) -> List[Tuple[int, int]]:
+    """Parses "cues:minutes,cues:minutes" into a list of sizes."""
+    sizes = []
+    for size in value.split(","):
+        cues, _, minutes = size.partition(":")
+        sizes.append((int(cues), int(minutes)))
+    return sizes
+
+
+def _peak_rss_mb(who: int) -> float:
+    import resource
+
+    peak = resource.getrusage(who).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _output_seconds(output_file: str) -> float:
+    import ffmpeg  # type: ignore
+
+    return float(ffmpeg.probe(output_file)["format"]["duration"])
+
+
+def _render(command: str, cues: int, work_dir: str, decode_mode: str, tts_workers: int) -> dict:
+    """Renders one corpus with `command`. Runs in its own process."""
+    import resource
+
+    from dualang.tts_engine import get_tts_engine
+    from dualang.tts_pool import TTSPool
+    from dualang.translator import TranslationStrategy, build_batch_translator
+
+    translate_batch_func = build_batch_translator(TranslationStrategy.FAKE)
+    tts_pool = TTSPool(workers=tts_workers, engine=get_tts_engine("tone"))
+    output_file = os.path.join(work_dir, f"{command}.mp3")
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull), contextlib.redirect_stderr(devnull):
+        start = time.perf_counter()
+        if command == "fromaudio":
+            from dualang.audio_source import DecodeMode
+            from dualang.command.fromaudio import create_audio_from_audio
+            from dualang.subtitle_loader import load_subtitle_file
+
+            create_audio_from_audio(
+                os.path.join(work_dir, "source.wav"),
+                load_subtitle_file(os.path.join(work_dir, "source.srt")),
+                output_file,
+                TRANSITION_SOUND,
+                "EN-US",
+                False,
+                translate_batch_func=translate_batch_func,
+                tts_pool=tts_pool,
+                decode_mode=DecodeMode(decode_mode),
+                scratch_dir=os.path.join(work_dir, "pcm"),
+            )
+        elif command == "fromtext":
+            from dualang.command.fromtext import create_audio as create_audio_from_text
+
+            sentences = [{"ja": text, "en": text} for text in make_sentences(cues)]
+            create_audio_from_text(
+                sentences, TRANSITION_SOUND, output_file, "ja", "ja", "en", 100, 2, 1, False, tts_pool=tts_pool
+            )
+        elif command == "plaintext":
+            from dualang.command.plaintext import create_audio as create_audio_from_plaintext
+
+            create_audio_from_plaintext(
+                make_sentences(cues),
+                TRANSITION_SOUND,
+                output_file,
+                "ja",
+                100,
+                2,
+                1,
+                translate_batch_func,
+                False,
+                tts_pool=tts_pool,
+            )
+        else:
+            raise ValueError(f"Unknown command {command}.")
+        wall_seconds = time.perf_counter() - start
+
+    return {
+        "wall_seconds": round(wall_seconds, 3),
+        "peak_rss_mb": round(_peak_rss_mb(resource.RUSAGE_SELF), 1),
+        "peak_children_rss_mb": round(_peak_rss_mb(resource.RUSAGE_CHILDREN), 1),
+        "output_seconds": round(_output_seconds(output_file), 3),
+    }
+
+
+def run_case(command: str, cues: int, minutes: int, decode_mode: str, tts_workers: int) -> dict:
+    """
+    Generates a corpus of `cues` cues over `minutes` of source audio and
+    renders it with `command` in a fresh process.
+    """
+    result = {"command": command, "cues": cues}
+    if command == "fromaudio":
+        result.update(minutes=minutes, decode_mode=decode_mode)
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        if command == "fromaudio":
+            duration_ms = minutes * 60 * 1000
+            write_source_audio(os.path.join(work_dir, "source.wav"), duration_ms)
+            write_subtitle_file(make_subtitles(cues, duration_ms), os.path.join(work_dir, "source.srt"))
+
+        # A fresh process per case, so that peak RSS is not carried over
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+            future = executor.submit(_render, command, cues, work_dir, decode_mode, tts_workers)
+            try:
+                result.update(future.result())
+            except Exception as e:
+                traceback.print_exc()
+                result["error"] = f"{type(e).__name__}: {e}"
+    return result
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the render commands on synthetic corpora.")
+    parser.add_argument(
+        "--sizes",
+        type=parse_sizes,
+        default=DEFAULT_SIZES,
+        help='Corpus sizes as comma separated "cues:minutes" pairs. Minutes only apply to fromaudio. Default is "'
+        + ",".join(f"{cues}:{minutes}" for cues, minutes in DEFAULT_SIZES)
+        + '".',
+    )
+    parser.add_argument(
+        "--commands",
+        default=",".join(COMMANDS),
+        help=f'Comma separated commands to benchmark. Default is "{",".join(COMMANDS)}".',
+    )
+    parser.add_argument(
+        "--decode-mode",
+        choices=["full", "ranges", "mmap"],
+        default="full",
+        help='Decode mode of fromaudio. Default is "full".',
+    )
+    parser.add_argument("--tts-workers", type=int, default=1, help="Number of TTS workers. Default is 1.")
+    parser.add_argument(
+        "-o", "--output", default="benchmark-results.json", help='JSON file to write. Default is "benchmark-results.json".'
+    )
+    args = parser.parse_args(argv)
+
+    commands = [command for command in args.commands.split(",") if command]
+    for command in commands:
+        if command not in COMMANDS:
+            parser.error(f"Unknown command {command}. Options are {', '.join(COMMANDS)}.")
+
+    report = {
+        "revision": _git_revision(),
+        "date": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "results": [],
+    }
+    for command in commands:
+        for cues, minutes in args.sizes:
+            result = run_case(command, cues, minutes, args.decode_mode, args.tts_workers)
+            report["results"].append(result)
+            print(json.dumps(result, ensure_ascii=False))
+            # Written after every case, so an interrupted run keeps its results
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
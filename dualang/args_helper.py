@@ -1,5 +1,45 @@
+import argparse
+import importlib
 import os
-from typing import Optional
+from typing import Iterator, List, Optional, Tuple
+
+SUBTITLE_EXTENSIONS = [".srt", ".ass", ".vtt"]
+SUBTITLE_LANGUAGE_SUFFIXES = ["", ".ja", ".en", ".fr", ".de", ".es", ".it", ".nl", ".pl", ".pt", ".ru", ".zh"]
+AUDIO_EXTENSIONS = {
+    ".aac", ".flac", ".m4a", ".m4b", ".mkv", ".mp3", ".mp4", ".ogg", ".opus", ".wav", ".webm",
+}
+
+
+class LazyCommand:
+    """
+    Entry point of a subcommand that imports its module on the first call,
+    so that only the dependencies of the command being run are loaded.
+    """
+
+    def __init__(self, module: str, function: str):
+        self.module = module
+        self.function = function
+
+    def __call__(self, args):
+        return getattr(importlib.import_module(self.module), self.function)(args)
+
+
+def positive_int(value: str) -> int:
+    """Argument type for counts that must be at least 1, such as numbers of workers."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
+def subtitle_file_candidates(base_name: str) -> Iterator[str]:
+    """
+    Yields the subtitle file names tried for an audio file named `base_name`
+    plus an extension, in order of preference.
+    """
+    for suffix in SUBTITLE_LANGUAGE_SUFFIXES:
+        for ext in SUBTITLE_EXTENSIONS:
+            yield base_name + suffix + ext
 
 
 def get_subtitle_file_name(
@@ -20,35 +60,15 @@ def get_subtitle_file_name(
         return subtitle_file
 
     base_name = input_audio.rsplit(".", 1)[0]
-    for ext in [".srt", ".ass", ".vtt"]:
-        subtitle_file = base_name + ext
+    for subtitle_file in subtitle_file_candidates(base_name):
         if os.path.isfile(subtitle_file):
             return subtitle_file
 
-    for prefix in [
-        "",
-        ".ja",
-        ".en",
-        ".fr",
-        ".de",
-        ".es",
-        ".it",
-        ".nl",
-        ".pl",
-        ".pt",
-        ".ru",
-        ".zh",
-    ]:
-        for ext in [".srt", ".ass", ".vtt"]:
-            subtitle_file = base_name + prefix + ext
-            if os.path.isfile(subtitle_file):
-                return subtitle_file
-
     print("Fail to found subtitle file")
     return None
 
 
-def get_output_file_name(input_audio: str, output_file: Optional[str]) -> str:
+def get_output_file_name(input_audio: str, output_file: Optional[str], extension: str = ".mp3") -> str:
     """
     Returns the output file name for the given input audio file and output file path.
     If the output file path is not provided, it is generated based on the input audio file path.
@@ -58,6 +78,7 @@ def get_output_file_name(input_audio: str, output_file: Optional[str]) -> str:
     Args:
     - input_audio (str): Path to the input audio file.
     - output_file (Optional[str]): Path to the output file. If not provided, it is generated based on the input audio file path.
+    - extension (str): Extension of generated output file names, including the dot.
 
     Returns:
     - output_file (str): Path to the output file.
@@ -65,14 +86,41 @@ def get_output_file_name(input_audio: str, output_file: Optional[str]) -> str:
     if output_file is None:
         output_file = os.path.join(
             os.path.dirname(input_audio),
-            os.path.basename(input_audio).rsplit(".", 1)[0] + ".mp3",
+            os.path.basename(input_audio).rsplit(".", 1)[0] + extension,
         )
         if output_file == input_audio:
-            output_file = output_file.rsplit(".", 1)[0] + "_out.mp3"
+            output_file = output_file.rsplit(".", 1)[0] + "_out" + extension
     elif os.path.isdir(output_file):
         output_file = os.path.join(
-            output_file, os.path.basename(input_audio).rsplit(".", 1)[0] + ".mp3"
+            output_file, os.path.basename(input_audio).rsplit(".", 1)[0] + extension
         )
         if output_file == input_audio:
-            output_file = output_file.rsplit(".", 1)[0] + "_out.mp3"
+            output_file = output_file.rsplit(".", 1)[0] + "_out" + extension
     return output_file
+
+
+def find_episodes(directory: str) -> List[Tuple[str, str]]:
+    """
+    Returns the (audio file, subtitle file) pairs in `directory`, sorted by
+    audio file name. The directory is listed once, and every audio file is
+    paired with its first subtitle candidate in the listing. Audio files
+    without subtitles are left out.
+
+    Args:
+    - directory (str): Directory to scan. Subdirectories are not scanned.
+
+    Returns:
+    - episodes (List[Tuple[str, str]]): Paths of the audio and subtitle files.
+    """
+    with os.scandir(directory) as entries:
+        files = {entry.name for entry in entries if entry.is_file()}
+
+    episodes = []
+    for name in sorted(files):
+        base_name, ext = os.path.splitext(name)
+        if ext.lower() not in AUDIO_EXTENSIONS:
+            continue
+        subtitle_file = next((c for c in subtitle_file_candidates(base_name) if c in files), None)
+        if subtitle_file is not None:
+            episodes.append((os.path.join(directory, name), os.path.join(directory, subtitle_file)))
+    return episodes
@@ -0,0 +1,107 @@
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, Iterable, Optional
+
+if TYPE_CHECKING:
+    from pydub import AudioSegment  # type: ignore
+
+
+@dataclass(frozen=True)
+class AudioFormat:
+    frame_rate: int
+    channels: int
+    sample_width: int  # bytes per sample
+
+    @classmethod
+    def of(cls, segment: "AudioSegment") -> "AudioFormat":
+        return cls(segment.frame_rate, segment.channels, segment.sample_width)
+
+    def union(self, other: "AudioFormat") -> "AudioFormat":
+        """
+        Returns the smallest format that holds both formats without loss, the
+        same one pydub picks when concatenating segments.
+        """
+        return AudioFormat(
+            max(self.frame_rate, other.frame_rate),
+            max(self.channels, other.channels),
+            max(self.sample_width, other.sample_width),
+        )
+
+    @classmethod
+    def negotiate(cls, formats: Iterable["AudioFormat"]) -> "AudioFormat":
+        """
+        Returns the format to render inputs of `formats` in: the union of all
+        of them, so that no input loses quality when converted to it.
+        """
+        formats = iter(formats)
+        audio_format = next(formats)
+        for other in formats:
+            audio_format = audio_format.union(other)
+        return audio_format
+
+    def silence(self, duration: int) -> "AudioSegment":
+        """Returns `duration` milliseconds of silence in this format."""
+        from pydub import AudioSegment  # type: ignore
+
+        frames = self.frame_rate * duration // 1000
+        return AudioSegment(
+            data=b"\0" * (frames * self.frame_width),
+            sample_width=self.sample_width,
+            frame_rate=self.frame_rate,
+            channels=self.channels,
+        )
+
+    def convert(self, segment: "AudioSegment") -> "AudioSegment":
+        return (
+            segment.set_channels(self.channels)
+            .set_frame_rate(self.frame_rate)
+            .set_sample_width(self.sample_width)
+        )
+
+    @property
+    def frame_width(self) -> int:
+        return self.channels * self.sample_width
+
+    @property
+    def pcm_format(self) -> str:
+        """Name of the matching raw PCM format in ffmpeg."""
+        return {1: "s8", 2: "s16le", 4: "s32le"}[self.sample_width]
+
+
+@dataclass(frozen=True)
+class OutputFormat:
+    """A codec and container that rendered audio can be encoded to."""
+
+    name: str
+    extension: str
+    muxer: str  # ffmpeg format of the output file
+    codec: str
+    bitrate: Optional[str] = None  # default bitrate
+    frame_rate: Optional[int] = None  # sample rate the codec requires, if any
+
+
+OUTPUT_FORMATS: Dict[str, OutputFormat] = {
+    output_format.name: output_format
+    for output_format in [
+        OutputFormat("mp3", ".mp3", muxer="mp3", codec="libmp3lame", bitrate="128k"),
+        OutputFormat("opus", ".opus", muxer="ogg", codec="libopus", bitrate="48k", frame_rate=48000),
+        OutputFormat("aac", ".m4a", muxer="ipod", codec="aac", bitrate="96k"),
+        OutputFormat("m4b", ".m4b", muxer="ipod", codec="aac", bitrate="96k"),
+        OutputFormat("wav", ".wav", muxer="wav", codec="pcm_s16le"),
+    ]
+}
+DEFAULT_OUTPUT_FORMAT = "mp3"
+
+
+def get_output_format(name: str) -> OutputFormat:
+    try:
+        return OUTPUT_FORMATS[name]
+    except KeyError:
+        raise ValueError(f"Unknown output format {name}. Options are {', '.join(OUTPUT_FORMATS)}.")
+
+
+@dataclass(frozen=True)
+class EncodingSettings:
+    """How rendered audio is encoded."""
+
+    output_format: str = DEFAULT_OUTPUT_FORMAT
+    bitrate: Optional[str] = None  # defaults to the bitrate of the output format
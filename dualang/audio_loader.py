@@ -1,78 +1,203 @@
-import tempfile
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+
 import ffmpeg
 
-from pydub import playback
 from pydub import AudioSegment  # type: ignore
 
+from dualang.audio_format import AudioFormat
+from dualang.tracing import span
+
+# ISO 639-1 codes accepted by --audio-track, and the ISO 639-2 tags that
+# containers such as MKV use
+LANGUAGE_TAGS = {
+    "ja": "jpn",
+    "en": "eng",
+    "fr": "fra",
+    "de": "deu",
+    "es": "spa",
+    "it": "ita",
+    "nl": "nld",
+    "pl": "pol",
+    "pt": "por",
+    "ru": "rus",
+    "zh": "zho",
+}
+
+# Probes of this process, by file identity
+_probes: Dict[str, dict] = {}
+
+
+def probe(input_audio: str, cache_dir: Optional[str] = None) -> dict:
+    """
+    Returns the ffprobe information of the file.
 
-def load_audio_segment(input_audio: str, verbose: bool = False) -> AudioSegment:
+    Probes are keyed by the path, size and mtime of the file, and kept for
+    the lifetime of the process. If `cache_dir` is provided, they are also
+    stored there as JSON files, so later runs on the same unchanged file do
+    not run ffprobe again.
     """
-    Converts an MKV file into an AudioSegment.
+    stat = os.stat(input_audio)
+    key = hashlib.sha256(
+        f"{os.path.abspath(input_audio)}\0{stat.st_size}\0{stat.st_mtime_ns}".encode()
+    ).hexdigest()
+    if key in _probes:
+        return _probes[key]
+
+    cache_file = os.path.join(cache_dir, f"{key}.json") if cache_dir is not None else None
+    info = None
+    if cache_file is not None and os.path.isfile(cache_file):
+        try:
+            with open(cache_file, encoding="utf-8") as f:
+                info = json.load(f)
+        except ValueError:
+            info = None
+    if info is None:
+        with span("source.probe"):
+            info = ffmpeg.probe(input_audio)
+        if cache_file is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+            with open(cache_file + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(info, f)
+            os.replace(cache_file + ".tmp", cache_file)
+
+    _probes[key] = info
+    return info
+
+
+def get_audio_tracks(input_audio: str, cache_dir: Optional[str] = None) -> List[dict]:
+    """
+    Returns the ffprobe information of every audio stream in the file.
+    """
+    return [stream for stream in probe(input_audio, cache_dir)["streams"] if stream["codec_type"] == "audio"]
+
+
+def _describe_track(index: int, track: dict) -> str:
+    language = track.get("tags", {}).get("language", "unknown")
+    return f"{index}: {language} (codec: {track.get('codec_name', 'unknown')})"
+
+
+def select_audio_track(audio_tracks: List[dict], audio_track: Optional[str] = None) -> int:
+    """
+    Returns the position of the audio track to use among `audio_tracks`.
 
     Args:
-        input_audio (str): Path to the input MKV file.
+        audio_tracks (List[dict]): ffprobe information of the audio streams.
+        audio_track (Optional[str]): Position of the track among the audio
+            streams, starting at 0, or a language tag such as "ja" or "jpn".
+            If not provided, the default track is used, or the first one if
+            no track is marked as default.
 
     Returns:
-        AudioSegment: The audio data from the MKV file.
+        int: Position of the selected track among the audio streams.
     """
-    # Check if the input file is an MKV file
-    if input_audio.endswith(".mkv"):
-        # Use ffmpeg to get the number of audio tracks in the file
-        probe = ffmpeg.probe(input_audio)
-        audio_tracks = [
-            stream for stream in probe["streams"] if stream["codec_type"] == "audio"
-        ]
-        if len(audio_tracks) > 1:
-            selected_track = get_selected_track(audio_tracks, input_audio)
-        else:
-            selected_track = 0
-        # Use ffmpeg to copy the selected audio track to a temporary file without re-encoding it
-        codec_name = audio_tracks[selected_track]["codec_name"]
-        temp_audio = tempfile.mktemp(suffix=f".{codec_name}")
-        out, err = (
-            ffmpeg.input(input_audio)
-            .output(temp_audio, map=f"0:{selected_track}", c="copy")
-            .run(capture_stdout=True, capture_stderr=True)
-        )
-        print(err, file=sys.stderr)
-        if verbose:
-            print(out)
-        # Load the temporary file using AudioSegment.from_file
-        input_audio = AudioSegment.from_file(temp_audio)
-        print("Loaded input audio from MKV file")
+    if not audio_tracks:
+        raise ValueError("No audio track found.")
+
+    if audio_track is None:
+        for i, track in enumerate(audio_tracks):
+            if track.get("disposition", {}).get("default"):
+                return i
+        return 0
+
+    if audio_track.isdigit():
+        selected_track = int(audio_track)
+        if selected_track < len(audio_tracks):
+            return selected_track
     else:
-        # Load the input audio file using AudioSegment.from_file
-        input_audio = AudioSegment.from_file(input_audio)
-        print("Loaded input audio")
+        language = audio_track.lower()
+        language = LANGUAGE_TAGS.get(language, language)
+        for i, track in enumerate(audio_tracks):
+            if track.get("tags", {}).get("language", "").lower() == language:
+                return i
 
-    return input_audio
+    tracks = ", ".join(_describe_track(i, track) for i, track in enumerate(audio_tracks))
+    raise ValueError(f"No audio track matches {audio_track}. Available tracks: {tracks}")
 
 
-def get_selected_track(audio_tracks, input_audio):
-    # If there is more than one audio track, ask the user to select one
-    print(f"The MKV file has {len(audio_tracks)} audio tracks.")
-    for i, track in enumerate(audio_tracks, start=1):
-        print(
-            f'{i}: {track["tags"]["language"] if "tags" in track and "language" in track["tags"] else "unknown"} (codec: {track["codec_name"]})'
-        )
+def open_audio_track(
+    input_audio: str, audio_track: Optional[str] = None, cache_dir: Optional[str] = None
+) -> Tuple[int, AudioFormat]:
+    """
+    Selects an audio track of the file as in `select_audio_track`, and
+    returns its position among the audio streams with the 16-bit PCM format
+    it is decoded to. `cache_dir` is where probes are cached.
+    """
+    audio_tracks = get_audio_tracks(input_audio, cache_dir)
+    try:
+        track = select_audio_track(audio_tracks, audio_track)
+    except ValueError as e:
+        raise ValueError(f"{input_audio}: {e}")
+    stream = audio_tracks[track]
+    return track, AudioFormat(
+        frame_rate=int(stream["sample_rate"]), channels=int(stream["channels"]), sample_width=2
+    )
+
+
+def decode_audio(input_audio: str, audio_format: AudioFormat, track: int = 0, verbose: bool = False) -> AudioSegment:
+    """
+    Decodes an audio track of a file straight to raw PCM in `audio_format`
+    with a single ffmpeg process, resampling and remixing on the way.
 
-    listen_sample = input(
-        "Do you want to listen to a sample of the audio tracks? (yes/no): "
+    Args:
+        input_audio (str): Path to the input file.
+        audio_format (AudioFormat): Format of the returned audio.
+        track (int): Position of the track among the audio streams.
+        verbose (bool): Show ffmpeg's output.
+
+    Returns:
+        AudioSegment: The audio data of the track.
+    """
+    out, err = (
+        ffmpeg.input(input_audio)
+        .output(
+            "pipe:",
+            map=f"0:a:{track}",
+            format=audio_format.pcm_format,
+            ar=audio_format.frame_rate,
+            ac=audio_format.channels,
+        )
+        .run(capture_stdout=True, capture_stderr=True)
     )
-    if listen_sample.lower() == "yes":
-        for i, track in enumerate(audio_tracks, start=1):
-            codec_name = track["codec_name"]
-            temp_audio = tempfile.mktemp(suffix=f".{codec_name}")
-            out, err = (
-                ffmpeg.input(input_audio)
-                .output(temp_audio, map=f"0:{i-1}", c="aac")
-                .run(capture_stdout=True, capture_stderr=True)
-            )
-            print(out, err)
-            sample_audio = AudioSegment.from_file(temp_audio)[
-                :30000
-            ]  # Get the first 30 seconds
-            print(f"Playing sample for track {i}:")
-            playback.play(sample_audio)
-    selected_track = int(input("Please select an audio track: ")) - 1
-    return selected_track
+    if verbose:
+        print(err.decode(errors="replace"))
+    return AudioSegment(
+        data=out[: len(out) - len(out) % audio_format.frame_width],
+        sample_width=audio_format.sample_width,
+        frame_rate=audio_format.frame_rate,
+        channels=audio_format.channels,
+    )
+
+
+def load_audio_segment(
+    input_audio: str,
+    verbose: bool = False,
+    audio_track: Optional[str] = None,
+    cache_dir: Optional[str] = None,
+    audio_format: Optional[AudioFormat] = None,
+) -> AudioSegment:
+    """
+    Decodes an audio track of an audio or video file into an AudioSegment.
+
+    The track is decoded straight from the container to raw PCM by a single
+    ffmpeg process.
+
+    Args:
+        input_audio (str): Path to the input file.
+        verbose (bool): Show ffmpeg's output.
+        audio_track (Optional[str]): Track to decode, as in `select_audio_track`.
+        cache_dir (Optional[str]): Directory where probes are cached.
+        audio_format (Optional[AudioFormat]): Format to decode to. Defaults
+            to the format of the track.
+
+    Returns:
+        AudioSegment: The audio data of the selected track.
+    """
+    track, track_format = open_audio_track(input_audio, audio_track, cache_dir)
+    with span("source.decode") as trace:
+        segment = decode_audio(input_audio, audio_format or track_format, track, verbose)
+        trace["bytes"] = len(segment.raw_data)
+    print("Loaded input audio")
+    return segment
@@ -0,0 +1,266 @@
+"""
+Random access to the audio of a source file.
+
+`fromaudio` needs the audio under every subtitle cue plus a continuous stretch
+of the original. An AudioSource provides both, either from a fully decoded
+AudioSegment, by decoding only the requested ranges with ffmpeg, or from a
+memory-mapped raw PCM file decoded once.
+"""
+import contextlib
+import hashlib
+import mmap
+import os
+from abc import ABC, abstractmethod
+from enum import Enum
+from typing import Iterator, Optional
+
+import ffmpeg  # type: ignore
+from pydub import AudioSegment  # type: ignore
+
+from dualang.audio_format import AudioFormat
+from dualang.audio_loader import load_audio_segment, open_audio_track
+from dualang.tracing import span
+
+# Length of the pieces yielded by AudioSource.iter_chunks
+CHUNK_MS = 60 * 1000
+
+# Size of the decoded PCM files kept by DecodeMode.MMAP
+DEFAULT_SCRATCH_SIZE_MB = 8192
+
+
+class DecodeMode(Enum):
+    FULL = "full"
+    RANGES = "ranges"
+    MMAP = "mmap"
+
+
+class AudioSource(ABC):
+    audio_format: AudioFormat
+
+    @abstractmethod
+    def slice(self, start: int, end: int) -> AudioSegment:
+        """Returns the audio between `start` and `end` milliseconds."""
+
+    @abstractmethod
+    def iter_chunks(self, start: int = 0, end: Optional[int] = None) -> Iterator[AudioSegment]:
+        """Yields the audio between `start` and `end` milliseconds in consecutive pieces."""
+
+
+class SegmentAudioSource(AudioSource):
+    """Source backed by a fully decoded AudioSegment."""
+
+    def __init__(self, segment: AudioSegment):
+        self.segment = segment
+        self.audio_format = AudioFormat.of(segment)
+
+    def slice(self, start: int, end: int) -> AudioSegment:
+        return self.segment[start:end]
+
+    def iter_chunks(self, start: int = 0, end: Optional[int] = None) -> Iterator[AudioSegment]:
+        end = len(self.segment) if end is None else end
+        for chunk_start in range(start, end, CHUNK_MS):
+            yield self.segment[chunk_start : min(chunk_start + CHUNK_MS, end)]
+
+
+class RangeAudioSource(AudioSource):
+    """
+    Source that decodes only the requested ranges, seeking in the input file
+    with ffmpeg, so the cost is proportional to the audio actually used.
+    """
+
+    def __init__(
+        self,
+        input_audio: str,
+        audio_track: Optional[str] = None,
+        probe_dir: Optional[str] = None,
+        audio_format: Optional[AudioFormat] = None,
+    ):
+        self.input_audio = input_audio
+        self.track, track_format = open_audio_track(input_audio, audio_track, probe_dir)
+        self.audio_format = audio_format or track_format
+
+    def _decode(self, start: int, end: Optional[int]):
+        kwargs = {"ss": start / 1000}
+        if end is not None:
+            kwargs["t"] = (end - start) / 1000
+        return ffmpeg.input(self.input_audio, **kwargs).output(
+            "pipe:",
+            map=f"0:a:{self.track}",
+            format=self.audio_format.pcm_format,
+            ar=self.audio_format.frame_rate,
+            ac=self.audio_format.channels,
+        )
+
+    def _to_segment(self, data: bytes) -> AudioSegment:
+        frame_width = self.audio_format.frame_width
+        return AudioSegment(
+            data=data[: len(data) - len(data) % frame_width],
+            sample_width=self.audio_format.sample_width,
+            frame_rate=self.audio_format.frame_rate,
+            channels=self.audio_format.channels,
+        )
+
+    def slice(self, start: int, end: int) -> AudioSegment:
+        if end <= start:
+            return self._to_segment(b"")
+        out, _ = self._decode(start, end).run(capture_stdout=True, capture_stderr=True)
+        return self._to_segment(out)
+
+    def iter_chunks(self, start: int = 0, end: Optional[int] = None) -> Iterator[AudioSegment]:
+        chunk_bytes = self.audio_format.frame_rate * CHUNK_MS // 1000 * self.audio_format.frame_width
+        process = self._decode(start, end).global_args("-loglevel", "error").run_async(pipe_stdout=True)
+        try:
+            while True:
+                data = process.stdout.read(chunk_bytes)
+                if not data:
+                    break
+                yield self._to_segment(data)
+        finally:
+            process.stdout.close()
+            process.wait()
+
+
+class MmapAudioSource(AudioSource):
+    """
+    Source backed by a raw PCM file that is memory-mapped rather than read.
+
+    The input is decoded once into `scratch_dir`, under a name derived from
+    its path, size and mtime, so later runs on the same unchanged file reuse
+    it. Decoding a file again removes its older decodes, and once the
+    directory holds more than `max_bytes`, the least recently used decodes
+    of other files are removed. Slices are zero-copy views over the mapping,
+    so resident memory stays small even for feature-length inputs.
+    """
+
+    def __init__(
+        self,
+        input_audio: str,
+        scratch_dir: str,
+        verbose: bool = False,
+        audio_track: Optional[str] = None,
+        probe_dir: Optional[str] = None,
+        audio_format: Optional[AudioFormat] = None,
+        max_bytes: int = DEFAULT_SCRATCH_SIZE_MB * 1024 * 1024,
+    ):
+        self.input_audio = input_audio
+        track, track_format = open_audio_track(input_audio, audio_track, probe_dir)
+        self.audio_format = audio_format or track_format
+
+        # Decodes of the same path share a prefix, so stale ones can be found
+        stat = os.stat(input_audio)
+        path_key = hashlib.sha256(os.path.abspath(input_audio).encode()).hexdigest()[:32]
+        parts = [stat.st_size, stat.st_mtime_ns, track, self.audio_format]
+        key = hashlib.sha256("\0".join(str(part) for part in parts).encode()).hexdigest()[:32]
+        self.pcm_file = os.path.join(scratch_dir, f"{path_key}-{key}.pcm")
+
+        if os.path.isfile(self.pcm_file):
+            # Refresh the mtime, which orders the eviction of decodes
+            os.utime(self.pcm_file)
+            print("Reusing decoded input audio")
+        else:
+            os.makedirs(scratch_dir, exist_ok=True)
+            temp_file = self.pcm_file + ".tmp"
+            try:
+                with span("source.decode") as trace:
+                    ffmpeg.input(input_audio).output(
+                        temp_file,
+                        map=f"0:a:{track}",
+                        format=self.audio_format.pcm_format,
+                        ar=self.audio_format.frame_rate,
+                        ac=self.audio_format.channels,
+                    ).overwrite_output().run(quiet=not verbose)
+                    trace["bytes"] = os.path.getsize(temp_file)
+            except BaseException:
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(temp_file)
+                raise
+            os.replace(temp_file, self.pcm_file)
+            print("Decoded input audio")
+            _evict_decodes(scratch_dir, self.pcm_file, f"{path_key}-", max_bytes)
+
+        with open(self.pcm_file, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                self._view = memoryview(b"")
+            else:
+                self._view = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        self._view = self._view[: len(self._view) - len(self._view) % self.audio_format.frame_width]
+
+    def _offset(self, ms: int) -> int:
+        frame = int(ms * self.audio_format.frame_rate / 1000)
+        return min(frame * self.audio_format.frame_width, len(self._view))
+
+    def _to_segment(self, data) -> AudioSegment:
+        return AudioSegment(
+            data=data,
+            sample_width=self.audio_format.sample_width,
+            frame_rate=self.audio_format.frame_rate,
+            channels=self.audio_format.channels,
+        )
+
+    def __len__(self) -> int:
+        return round(len(self._view) / self.audio_format.frame_width * 1000 / self.audio_format.frame_rate)
+
+    def slice(self, start: int, end: int) -> AudioSegment:
+        start_offset, end_offset = self._offset(start), self._offset(end)
+        return self._to_segment(self._view[start_offset : max(start_offset, end_offset)])
+
+    def iter_chunks(self, start: int = 0, end: Optional[int] = None) -> Iterator[AudioSegment]:
+        end = len(self) if end is None else end
+        for chunk_start in range(start, end, CHUNK_MS):
+            yield self.slice(chunk_start, min(chunk_start + CHUNK_MS, end))
+
+
+def _evict_decodes(scratch_dir: str, keep: str, prefix: str, max_bytes: int) -> None:
+    """
+    Removes the decodes in `scratch_dir` that start with `prefix` other than
+    `keep`, then the least recently used ones until the directory fits in
+    `max_bytes`. Mappings of removed files stay valid in the processes that
+    hold them.
+    """
+    decodes = {}
+    for name in os.listdir(scratch_dir):
+        path = os.path.join(scratch_dir, name)
+        if not name.endswith(".pcm") or path == keep:
+            continue
+        if name.startswith(prefix):
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+            continue
+        with contextlib.suppress(FileNotFoundError):
+            decodes[path] = os.stat(path)
+
+    total = os.path.getsize(keep) + sum(stat.st_size for stat in decodes.values())
+    for path in sorted(decodes, key=lambda path: decodes[path].st_mtime):
+        if total <= max_bytes:
+            break
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path)
+        total -= decodes[path].st_size
+
+
+def open_audio_source(
+    input_audio: str,
+    decode_mode: DecodeMode = DecodeMode.FULL,
+    verbose: bool = False,
+    scratch_dir: Optional[str] = None,
+    audio_track: Optional[str] = None,
+    probe_dir: Optional[str] = None,
+    audio_format: Optional[AudioFormat] = None,
+) -> AudioSource:
+    """
+    Opens an audio track of the input for slicing in the given decode mode.
+    `scratch_dir` is where DecodeMode.MMAP keeps decoded PCM files, and
+    `probe_dir` is where probes of the input are cached. See
+    `select_audio_track` for `audio_track`. The track is decoded to
+    `audio_format` if provided, so its slices need no further conversion.
+    """
+    if decode_mode == DecodeMode.FULL:
+        return SegmentAudioSource(load_audio_segment(input_audio, verbose, audio_track, probe_dir, audio_format))
+    elif decode_mode == DecodeMode.RANGES:
+        return RangeAudioSource(input_audio, audio_track, probe_dir, audio_format)
+    elif decode_mode == DecodeMode.MMAP:
+        if scratch_dir is None:
+            raise ValueError("A scratch directory is required to memory-map the input audio.")
+        return MmapAudioSource(input_audio, scratch_dir, verbose, audio_track, probe_dir, audio_format)
+    else:
+        raise ValueError(f"Unsupported decode mode {decode_mode}.")
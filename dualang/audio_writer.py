@@ -0,0 +1,133 @@
+import os
+from typing import Dict, Iterable, Optional
+
+import ffmpeg  # type: ignore
+from pydub import AudioSegment  # type: ignore
+
+from dualang.audio_format import AudioFormat, EncodingSettings, OutputFormat, get_output_format
+from dualang.tracing import span
+
+def _encoder_args(output_format: OutputFormat, bitrate: Optional[str]) -> Dict:
+    args = {"acodec": output_format.codec}
+    if bitrate or output_format.bitrate:
+        args["audio_bitrate"] = bitrate or output_format.bitrate
+    if output_format.frame_rate is not None:
+        args["ar"] = output_format.frame_rate
+    return args
+
+
+class _PipeEncoder:
+    """Encodes the whole output with a single ffmpeg process reading from a pipe."""
+
+    def __init__(
+        self, output_file: str, audio_format: AudioFormat, output_format: OutputFormat, bitrate: Optional[str]
+    ):
+        self.output_file = output_file
+        self._process = (
+            ffmpeg.input(
+                "pipe:",
+                format=audio_format.pcm_format,
+                ar=audio_format.frame_rate,
+                ac=audio_format.channels,
+            )
+            .output(output_file, format=output_format.muxer, **_encoder_args(output_format, bitrate))
+            .global_args("-loglevel", "error")
+            .overwrite_output()
+            .run_async(pipe_stdin=True)
+        )
+
+    def write(self, data: bytes) -> None:
+        try:
+            self._process.stdin.write(data)
+        except BrokenPipeError:
+            self._process.wait()
+            raise RuntimeError(
+                f"ffmpeg exited with code {self._process.returncode} while writing {self.output_file}"
+            )
+
+    def close(self) -> None:
+        self._process.stdin.close()
+        self._process.wait()
+        if self._process.returncode != 0:
+            raise RuntimeError(
+                f"ffmpeg exited with code {self._process.returncode} while writing {self.output_file}"
+            )
+
+    def abort(self) -> None:
+        try:
+            self._process.stdin.close()
+        except BrokenPipeError:
+            pass
+        self._process.kill()
+        self._process.wait()
+
+
+class StreamingAudioWriter:
+    """
+    Encodes audio to a file while it is being produced.
+
+    Every appended segment is converted to `audio_format` and passed on to
+    ffmpeg as raw PCM, so only the segment being written is held in memory,
+    and encoding overlaps with whatever produces the next segment.
+
+    Use it as a context manager; if the block raises, the partial output file
+    is removed.
+    """
+
+    def __init__(
+        self,
+        output_file: str,
+        audio_format: AudioFormat,
+        encoding: Optional[EncodingSettings] = None,
+    ):
+        encoding = encoding or EncodingSettings()
+        self.output_file = output_file
+        self.audio_format = audio_format
+        self.output_format = get_output_format(encoding.output_format)
+        self._frames = 0
+
+        self._encoder = _PipeEncoder(output_file, audio_format, self.output_format, encoding.bitrate)
+
+    def append(self, segment: AudioSegment) -> None:
+        data = self.audio_format.convert(segment).raw_data
+        self._frames += len(data) // self.audio_format.frame_width
+        self._encoder.write(data)
+
+    def extend(self, segments: Iterable[AudioSegment]) -> None:
+        for segment in segments:
+            self.append(segment)
+
+    @property
+    def bytes_written(self) -> int:
+        """Returns the amount of PCM written so far in bytes."""
+        return self._frames * self.audio_format.frame_width
+
+    def __len__(self) -> int:
+        """Returns the duration written so far in milliseconds."""
+        return round(self._frames * 1000 / self.audio_format.frame_rate)
+
+    def close(self) -> None:
+        with span("export.finish"):
+            self._encoder.close()
+
+    def abort(self) -> None:
+        self._encoder.abort()
+        if os.path.exists(self.output_file):
+            os.remove(self.output_file)
+
+    def __enter__(self) -> "StreamingAudioWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def build_encoding_settings(args) -> EncodingSettings:
+    """
+    Returns the encoding configured by the --format and --bitrate command
+    line options.
+    """
+    return EncodingSettings(output_format=args.output_format, bitrate=args.bitrate)
@@ -1,4 +1,87 @@
+"""
+This module provides a function to condense an audio file to the parts that
+have subtitles. The subtitle cues are padded and merged into sorted,
+non-overlapping intervals, and a single streaming ffmpeg pass cuts them out
+of the input with the concat demuxer: gaps between intervals are skipped by
+seeking rather than decoded, and nothing is held in memory.
+
+Functions:
+- condense_audio: Writes the audio under the subtitle cues to a new file.
+"""
 import os
+import sys
+import tempfile
+from typing import List, Optional
+
+import ffmpeg  # type: ignore
+
+from dualang.audio_loader import open_audio_track
+from dualang.intervals import Interval, merge_intervals
+from dualang.subtitle_loader import load_subtitle_file, SubtitleError
+
+# Frames are re-chunked to this many samples before selection, which bounds
+# how far a cut can land from an interval boundary.
+SELECT_FRAME_SAMPLES = 128
+
+
+def write_concat_script(input_file: str, intervals: List[Interval], script_file: str) -> None:
+    """
+    Writes an ffmpeg concat demuxer script that plays `intervals` of `input_file` back to back.
+    """
+    path = os.path.abspath(input_file).replace("'", "'\\''")
+    with open(script_file, "w", encoding="utf-8") as f:
+        f.write("ffconcat version 1.0\n")
+        for start, end in intervals:
+            f.write(f"file '{path}'\ninpoint {start / 1000:.3f}\noutpoint {end / 1000:.3f}\n")
+
+
+def condense_audio(
+    input_file: str,
+    subtitle_data: list,
+    output_file: str,
+    padding: int = 0,
+    verbose: bool = False,
+    audio_track: Optional[str] = None,
+) -> int:
+    """
+    Writes the audio under the subtitle cues of `input_file` to `output_file`.
+
+    Args:
+        input_file (str): Input audio or video file.
+        subtitle_data (list): Subtitles with start and end in milliseconds.
+        output_file (str): Output file. The codec is chosen from its extension.
+        padding (int): Milliseconds kept before and after each cue.
+        verbose (bool): Show ffmpeg's output.
+        audio_track (Optional[str]): Track to keep, as in `select_audio_track`.
+
+    Returns:
+        int: Duration of the condensed audio in milliseconds.
+    """
+    intervals = list(merge_intervals(((s.start, s.end) for s in subtitle_data), padding))
+    if not intervals:
+        raise ValueError("No subtitle intervals to keep.")
+    track, _ = open_audio_track(input_file, audio_track)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        script_file = os.path.join(temp_dir, "intervals.ffconcat")
+        write_concat_script(input_file, intervals, script_file)
+
+        # The concat demuxer only seeks to packet boundaries, so tag every frame
+        # with its interval and drop the samples that fall outside of it.
+        (
+            ffmpeg.input(script_file, format="concat", safe=0, segment_time_metadata=1)
+            .output(
+                output_file,
+                map=f"0:a:{track}",
+                af=f"asetnsamples=n={SELECT_FRAME_SAMPLES},aselect=concatdec_select,asetpts=N/SR/TB",
+                threads=0,
+            )
+            .overwrite_output()
+            .run(quiet=not verbose)
+        )
+
+    return sum(end - start for start, end in intervals)
+
 
 def condense_audio_main(args):
     # Retrieve the values of the arguments
@@ -6,5 +89,25 @@ def condense_audio_main(args):
     output_file = args.output if args.output else os.path.splitext(input_file)[0] + "_condensed" + os.path.splitext(input_file)[1]
     padding = args.padding if args.padding else 0
 
-    # TODO: Add the logic to condense the audio
+    if not os.path.isfile(input_file):
+        print(f"Error: Audio file {input_file} does not exist.")
+        sys.exit(1)
+
+    try:
+        subtitle_data = load_subtitle_file(args.subtitle)
+    except SubtitleError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
     print(f"Condensing audio from {input_file} to {output_file} with padding {padding}ms")
+    try:
+        duration = condense_audio(input_file, subtitle_data, output_file, padding, args.verbose, args.audio_track)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    except ffmpeg.Error as e:
+        print(f"Error: ffmpeg failed to condense {input_file}.")
+        if e.stderr:
+            print(e.stderr.decode(errors="replace"), file=sys.stderr)
+        sys.exit(1)
+    print(f"Condensed audio: {duration / 1000:.1f} seconds")
@@ -1,72 +1,280 @@
+"""
+This module creates an EPUB book from a folder of SRT files, with one chapter
+per file.
+
+The SRT files are parsed into chapters by parallel processes, and each chapter
+is written into the EPUB archive as soon as it is ready, in order, so only the
+chapters in flight are held in memory. With --since, rendered chapters are
+kept in a chapter store in the cache directory, and chapters whose SRT file
+did not change since it was last rendered are taken from the store instead of
+being parsed again.
+
+Functions:
+- create_epub: Writes an EPUB book with a chapter for each SRT file.
+- render_chapter: Renders the XHTML document of the chapter of an SRT file.
+"""
+import contextlib
+import hashlib
 import os
-import pysrt
-from ebooklib import epub
+import re
+import sys
+import zipfile
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime, timezone
+from html import escape
+from typing import Deque, Iterator, List, Optional
+
+from dualang.subtitle_loader import iter_subtitles, SubtitleError
+from dualang.tts_cache import get_cache_dir
+
+# Bump when the rendering of chapters changes, so stored chapters are redone
+CHAPTER_VERSION = 1
+
+# Size of the chapter store
+DEFAULT_STORE_SIZE_MB = 256
+
+# Formatting tags such as <i> in SRT texts
+_TAG = re.compile(r"<[^>]*>")
+
+_CONTAINER = """<?xml version="1.0" encoding="utf-8"?>
+<container xmlns="urn:oasis:names:tc:opendocument:xmlns:container" version="1.0">
+  <rootfiles>
+    <rootfile media-type="application/oebps-package+xml" full-path="EPUB/content.opf"/>
+  </rootfiles>
+</container>
+"""
+
+_STYLE = "BODY {color: white;}"
+
 
 def read_srt_files(directory):
     """Read all SRT files in a directory."""
-    srt_files = [directory + '/' + f for f in os.listdir(directory) if f.endswith('.srt')]
+    srt_files = [os.path.join(directory, f) for f in os.listdir(directory) if f.endswith('.srt')]
     return sorted(srt_files)
 
-def parse_srt_file(file_path):
-    """Parse an SRT file and extract the subtitles."""
-    subs = pysrt.open(file_path)
-    for sub in subs:
-        yield sub.text
 
-def add_chapter(book, title, filename, content):
-    chapter = epub.EpubHtml(title=title, file_name=filename, content=content)
-    book.add_item(chapter)
-    return chapter
+def chapter_title(file_path: str) -> str:
+    return os.path.basename(file_path).split('.')[0].replace('_', ' ').replace('-', ' ').replace(' ja', '')
+
+
+def render_chapter(file_path: str) -> str:
+    """
+    Renders the XHTML document of the chapter of an SRT file: its title and
+    a paragraph for each subtitle.
+    """
+    title = escape(chapter_title(file_path))
+    parts = [
+        "<?xml version='1.0' encoding='utf-8'?>\n<!DOCTYPE html>\n"
+        '<html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops" lang="ja" xml:lang="ja">\n'
+        f"  <head>\n    <title>{title}</title>\n  </head>\n  <body>\n    <h1>{title}</h1>\n"
+    ]
+    parts.extend(
+        f"    <p>{escape(_TAG.sub('', subtitle.text))}</p>\n" for subtitle in iter_subtitles(file_path)
+    )
+    parts.append("  </body>\n</html>\n")
+    return "".join(parts)
 
-def create_epub(subtitles, output, epub_title):
-    book = epub.EpubBook()
 
-    # set metadata
-    book.set_identifier('id123456')
-    book.set_title(epub_title)
-    book.set_language('ja')
+class ChapterStore:
+    """
+    Directory of rendered chapters, keyed by the path, size and mtime of
+    their SRT file. Only the latest chapter of each SRT file is kept, and
+    `prune` removes the least recently used chapters once the store is
+    larger than `max_bytes`.
+    """
 
-    chapters = []
-    for i, subtitle in enumerate(subtitles):
-        chapter_name = os.path.basename(subtitle).split('.')[0].replace('_', ' ').replace('-', ' ').replace(' ja', '')
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_STORE_SIZE_MB * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
 
-        # create chapter
-        c1 = epub.EpubHtml(title=chapter_name, file_name=f"chap_{i:0d}.xhtml", lang="ja")
-        c1.content = f"<h1>{chapter_name}</h1>"
-        for line in  parse_srt_file(subtitle):
-            c1.content += f"<p>{line}</p>"
+    def path_for(self, file_path: str) -> str:
+        stat = os.stat(file_path)
+        path_key = hashlib.sha256(os.path.abspath(file_path).encode()).hexdigest()[:32]
+        version_key = hashlib.sha256(
+            f"{CHAPTER_VERSION}\0{stat.st_size}\0{stat.st_mtime_ns}".encode()
+        ).hexdigest()[:32]
+        return os.path.join(self.directory, path_key[:2], f"{path_key}-{version_key}.xhtml")
 
-        book.add_item(c1)
+    def get(self, file_path: str) -> Optional[str]:
+        """Returns the stored chapter of the file, or None if it changed."""
+        path = self.path_for(file_path)
+        try:
+            with open(path, encoding="utf-8") as f:
+                chapter = f.read()
+        except FileNotFoundError:
+            return None
+        with contextlib.suppress(FileNotFoundError):
+            os.utime(path)
+        return chapter
 
-        chapters.append(c1)
+    def put(self, file_path: str, chapter: str) -> None:
+        """Stores the chapter of the file, in place of any earlier one."""
+        path = self.path_for(file_path)
+        directory, name = os.path.split(path)
+        os.makedirs(directory, exist_ok=True)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            f.write(chapter)
+        os.replace(path + ".tmp", path)
 
+        prefix = name.split("-")[0] + "-"
+        for other in os.listdir(directory):
+            if other.startswith(prefix) and other.endswith(".xhtml") and other != name:
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(os.path.join(directory, other))
 
-    book.toc = (
-        (epub.Section(epub_title), chapters),
+    def prune(self) -> None:
+        """Removes the least recently used chapters until the store fits in `max_bytes`."""
+        chapters = {}
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".xhtml"):
+                    with contextlib.suppress(FileNotFoundError):
+                        chapters[os.path.join(root, name)] = os.stat(os.path.join(root, name))
+
+        total = sum(stat.st_size for stat in chapters.values())
+        for path in sorted(chapters, key=lambda path: chapters[path].st_mtime):
+            if total <= self.max_bytes:
+                break
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+            total -= chapters[path].st_size
+
+
+def load_chapter(file_path: str, store_dir: Optional[str] = None, since: bool = False) -> str:
+    """
+    Returns the chapter of an SRT file. If `since` is set, it is taken from
+    the chapter store in `store_dir` if the file did not change, or else
+    rendered and stored. Otherwise it is rendered, and the store is not used.
+    """
+    store = ChapterStore(store_dir) if store_dir is not None and since else None
+    chapter = store.get(file_path) if store is not None else None
+    if chapter is None:
+        chapter = render_chapter(file_path)
+        if store is not None:
+            store.put(file_path, chapter)
+    return chapter
+
+
+def iter_chapters(
+    subtitles: List[str], jobs: int = 1, store_dir: Optional[str] = None, since: bool = False
+) -> Iterator[str]:
+    """
+    Yields the chapters of the SRT files in order, loaded by `jobs`
+    processes. At most two chapters per process are loaded ahead of the one
+    being consumed.
+    """
+    if jobs <= 1:
+        for subtitle in subtitles:
+            yield load_chapter(subtitle, store_dir, since)
+        return
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        pending: Deque[Future] = deque()
+        for subtitle in subtitles:
+            if len(pending) >= 2 * jobs:
+                yield pending.popleft().result()
+            pending.append(executor.submit(load_chapter, subtitle, store_dir, since))
+        while pending:
+            yield pending.popleft().result()
+
+
+def _package(epub_title: str, count: int) -> str:
+    modified = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    return "".join(
+        [
+            "<?xml version='1.0' encoding='utf-8'?>\n"
+            '<package xmlns="http://www.idpf.org/2007/opf" unique-identifier="id" version="3.0">\n'
+            '  <metadata xmlns:dc="http://purl.org/dc/elements/1.1/" xmlns:opf="http://www.idpf.org/2007/opf">\n'
+            f'    <meta property="dcterms:modified">{modified}</meta>\n'
+            '    <dc:identifier id="id">id123456</dc:identifier>\n'
+            f"    <dc:title>{escape(epub_title)}</dc:title>\n"
+            "    <dc:language>ja</dc:language>\n"
+            "  </metadata>\n  <manifest>\n",
+            *(
+                f'    <item href="chap_{i}.xhtml" id="chapter_{i}" media-type="application/xhtml+xml"/>\n'
+                for i in range(count)
+            ),
+            '    <item href="toc.ncx" id="ncx" media-type="application/x-dtbncx+xml"/>\n'
+            '    <item href="nav.xhtml" id="nav" media-type="application/xhtml+xml" properties="nav"/>\n'
+            '    <item href="style/nav.css" id="style_nav" media-type="text/css"/>\n'
+            '  </manifest>\n  <spine toc="ncx">\n    <itemref idref="nav"/>\n',
+            *(f'    <itemref idref="chapter_{i}"/>\n' for i in range(count)),
+            "  </spine>\n</package>\n",
+        ]
     )
 
-    book.add_item(epub.EpubNcx())
-    book.add_item(epub.EpubNav())
 
-    style = "BODY {color: white;}"
-    nav_css = epub.EpubItem(
-        uid="style_nav",
-        file_name="style/nav.css",
-        media_type="text/css",
-        content=style,
+def _nav(epub_title: str, titles: List[str]) -> str:
+    title = escape(epub_title)
+    return "".join(
+        [
+            "<?xml version='1.0' encoding='utf-8'?>\n<!DOCTYPE html>\n"
+            '<html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops" lang="ja" xml:lang="ja">\n'
+            f"  <head>\n    <title>{title}</title>\n  </head>\n  <body>\n"
+            f'    <nav epub:type="toc" id="id" role="doc-toc">\n      <h2>{title}</h2>\n'
+            f"      <ol>\n        <li>\n          <span>{title}</span>\n          <ol>\n",
+            *(
+                f'            <li>\n              <a href="chap_{i}.xhtml">{escape(chapter)}</a>\n            </li>\n'
+                for i, chapter in enumerate(titles)
+            ),
+            "          </ol>\n        </li>\n      </ol>\n    </nav>\n  </body>\n</html>\n",
+        ]
     )
 
-    book.add_item(nav_css)
 
-    book.spine = ["nav"] + chapters
+def _ncx(epub_title: str, titles: List[str]) -> str:
+    title = escape(epub_title)
+    return "".join(
+        [
+            "<?xml version='1.0' encoding='utf-8'?>\n"
+            '<ncx xmlns="http://www.daisy.org/z3986/2005/ncx/" version="2005-1">\n'
+            '  <head>\n    <meta content="id123456" name="dtb:uid"/>\n    <meta content="0" name="dtb:depth"/>\n'
+            '    <meta content="0" name="dtb:totalPageCount"/>\n    <meta content="0" name="dtb:maxPageNumber"/>\n'
+            f"  </head>\n  <docTitle>\n    <text>{title}</text>\n  </docTitle>\n  <navMap>\n"
+            f'    <navPoint id="sep_0">\n      <navLabel>\n        <text>{title}</text>\n      </navLabel>\n'
+            '      <content src="chap_0.xhtml"/>\n',
+            *(
+                f'      <navPoint id="chapter_{i}">\n        <navLabel>\n          <text>{escape(chapter)}</text>\n'
+                f'        </navLabel>\n        <content src="chap_{i}.xhtml"/>\n      </navPoint>\n'
+                for i, chapter in enumerate(titles)
+            ),
+            "    </navPoint>\n  </navMap>\n</ncx>\n",
+        ]
+    )
+
 
-    epub.write_epub(output, book)
+def create_epub(subtitles, output, epub_title, jobs=1, store_dir=None, since=False):
+    """
+    Writes an EPUB book to `output` with a chapter for each SRT file in
+    `subtitles`, in order. See `iter_chapters` for the other arguments.
+    """
+    titles = [chapter_title(subtitle) for subtitle in subtitles]
+    try:
+        with zipfile.ZipFile(output + ".tmp", "w", zipfile.ZIP_DEFLATED) as book:
+            # The mimetype must come first, uncompressed
+            book.writestr("mimetype", "application/epub+zip", compress_type=zipfile.ZIP_STORED)
+            book.writestr("META-INF/container.xml", _CONTAINER)
+            for i, chapter in enumerate(iter_chapters(subtitles, jobs, store_dir, since)):
+                book.writestr(f"EPUB/chap_{i}.xhtml", chapter)
+            book.writestr("EPUB/style/nav.css", _STYLE)
+            book.writestr("EPUB/toc.ncx", _ncx(epub_title, titles))
+            book.writestr("EPUB/nav.xhtml", _nav(epub_title, titles))
+            book.writestr("EPUB/content.opf", _package(epub_title, len(titles)))
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(output + ".tmp")
+        raise
+    os.replace(output + ".tmp", output)
+    if store_dir is not None and since:
+        ChapterStore(store_dir).prune()
 
-import os
-import sys
 
 def create_epub_main(args):
-    subtitles = sorted(read_srt_files(args.input_folder))
+    subtitles = read_srt_files(args.input_folder)
+    if not subtitles:
+        print(f"Error: No SRT files found in {args.input_folder}.")
+        sys.exit(1)
 
     # Ensure output file ends with .epub
     if not args.output.endswith('.epub'):
@@ -81,4 +289,10 @@ def create_epub_main(args):
             sys.exit(0)
 
     print(args.output)
-    create_epub(subtitles, args.output, args.title)
+    jobs = args.jobs or os.cpu_count() or 1
+    store_dir = os.path.join(get_cache_dir(args.cache_dir), "epub")
+    try:
+        create_epub(subtitles, args.output, args.title, jobs, store_dir, args.since)
+    except SubtitleError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
@@ -7,28 +7,38 @@ the input audio file based on the start and end times in the subtitle file, and
 generates a TTS translation of the subtitle text using the specified translation
 strategy and language. The TTS translations are concatenated with the original
 audio segments and a transition sound to create a final bilingual TTS audio
-file.
+file. Translation, speech synthesis and decoding run as overlapping stages of
+a pipeline with bounded queues between them. Repeated sentences are only
+translated, synthesized and decoded once per run. Rendered cues are
+checkpointed in a work directory, so an interrupted run resumes where it
+stopped.
 
 Functions:
 - create_audio_from_audio: Generates bilingual TTS from audio and subtitle files.
+- render_episode: Renders one input with the settings of the command line.
 """
-import tempfile
 import os
-import hashlib
-import ffmpeg
-from pydub import playback
 
-from typing import Callable, Optional
+from typing import Callable, Iterable, List, Optional
 
-import pydub  # type: ignore
-
-from gtts import gTTS  # type: ignore
 from pydub import AudioSegment  # type: ignore
 from tqdm import tqdm
 
-from dualang.subtitle_loader import load_subtitle_file
-from dualang.audio_loader import load_audio_segment
+from dualang.audio_format import AudioFormat, EncodingSettings, get_output_format
+from dualang.audio_writer import StreamingAudioWriter, build_encoding_settings
+from dualang.merge_cues import merge_cues
+from dualang.pipeline import Pipeline, Stage
+from dualang.render_job import RenderJob, job_key, prune_jobs
+from dualang.run_memo import RunMemo
+from dualang.tracing import span, start_tracing, stop_tracing
+from dualang.subtitle_loader import load_subtitle_file, Subtitle, SubtitleError
+from dualang.audio_loader import open_audio_track
+from dualang.audio_source import DecodeMode, open_audio_source
 from dualang.args_helper import get_subtitle_file_name, get_output_file_name
+from dualang.translation_memory import build_translation_memory
+from dualang.translator import DEEPL_MAX_BATCH_SIZE
+from dualang.tts_cache import get_cache_dir
+from dualang.tts_pool import TTSPool, build_tts_pool
 from dualang.util import add_label_to_file
 
 
@@ -39,63 +49,236 @@ def create_audio_from_audio(
     transition_sound: str,
     tr_lang: str,
     verbose: bool,
-    translate_func: Callable[[str, str], str],
+    translate_batch_func: Callable[[List[str], str], List[str]],
     interval: int = 100,
-) -> None:
+    tts_pool: Optional[TTSPool] = None,
+    decode_mode: DecodeMode = DecodeMode.FULL,
+    scratch_dir: Optional[str] = None,
+    job_dir: Optional[str] = None,
+    resume: bool = True,
+    audio_track: Optional[str] = None,
+    probe_dir: Optional[str] = None,
+    encoding: Optional[EncodingSettings] = None,
+) -> Optional[RenderJob]:
     if verbose:
         for i, subtitle in enumerate(subtitle_data):
             print(f"{i:03d} {subtitle.text}")
 
-    input_audio = load_audio_segment(input_audio, verbose)
-
-    # Create a temporary directory to store the audio segments
-    temp_dir = tempfile.mkdtemp()
+    tts_pool = tts_pool or TTSPool()
+    transition_sound = AudioSegment.from_file(transition_sound)
 
-    # Create an empty list to store the audio segments
-    audio_segments = []
+    # Pick the output format once, and bring every input to it before the
+    # render: the source is decoded to it, speech is decoded straight into
+    # it, and the transition sound and the silence are converted once. The
+    # segments of a cue can then be written out without any conversion.
+    _, track_format = open_audio_track(input_audio, audio_track, probe_dir)
+    audio_format = AudioFormat.negotiate(
+        [track_format, AudioFormat.of(transition_sound), tts_pool.engine.audio_format]
+    )
+    source = open_audio_source(
+        input_audio, decode_mode, verbose, scratch_dir, audio_track, probe_dir, audio_format
+    )
+    transition_sound = audio_format.convert(transition_sound)
+    silent = audio_format.silence(interval)
+
+    subtitle_data = [subtitle for subtitle in subtitle_data if subtitle.text.strip()]
+
+    job = RenderJob(job_dir, audio_format, resume) if job_dir is not None else None
+    if job is not None:
+        done = job.count(subtitle_data)
+        if done:
+            print(f"Resuming: {done} of {len(subtitle_data)} sentences already rendered")
+
+    # Repeated sentences are translated, synthesized and decoded once, and
+    # their clip is reused by every cue that has the same text
+    texts = [subtitle.text for subtitle in subtitle_data if job is None or subtitle not in job]
+    translations, speech_files, speech = RunMemo(texts), RunMemo(texts), RunMemo(texts)
+
+    # Cues rendered by an earlier run pass through the stages with no
+    # translation and no speech, and are read back from the job when decoded
+    def translate(subtitles):
+        pending = [job is None or subtitle not in job for subtitle in subtitles]
+        texts = [subtitle.text for subtitle, todo in zip(subtitles, pending) if todo]
+        translated = iter(
+            translations.get_many(texts, lambda texts: translate_batch_func(texts, target_lang=tr_lang))
+            if texts
+            else []
+        )
+        return [
+            (subtitle, next(translated) if todo else None)
+            for subtitle, todo in zip(subtitles, pending)
+        ]
+
+    def synthesize(item):
+        subtitle, translation = item
+        if translation is None:
+            return subtitle, None
+        return subtitle, speech_files.get(
+            subtitle.text, lambda: tts_pool.synthesize_to_file(translation, tr_lang)
+        )
 
-    # Iterate over the sentences in the subtitle file
-    for subtitle in tqdm(subtitle_data, desc="Processing sentences"):
-        if not subtitle.text.strip():
-            continue
+    def decode(item):
+        subtitle, tts_file = item
+        if tts_file is None:
+            with span("render.load") as trace:
+                audio_segment = job.load(subtitle)
+                trace["bytes"] = len(audio_segment.raw_data)
+            return [audio_segment]
+        tts_audio_segment = speech.get(subtitle.text, lambda: tts_file.load(audio_format))
 
         # Assuming subtitle.start and subtitle.end are in milliseconds
-        start_time = subtitle.start
-        end_time = subtitle.end
-
-        audio_segment = input_audio[start_time:end_time]
-        silent = AudioSegment.silent(duration=interval)
-        tts_audio_segment = get_translation_audio(subtitle.text, tr_lang, translate_func, temp_dir)
-
-        # Repeat the audio segment three times with a silent interval in between
-        repeated_audio_segment = (
-            (audio_segment + silent) * 2 +
-            (tts_audio_segment + silent) * 1 +
-            (audio_segment + silent) * 2
+        with span("render.slice") as trace:
+            audio_segment = source.slice(subtitle.start, subtitle.end)
+            trace["bytes"] = len(audio_segment.raw_data)
+
+        # Repeat the audio segment with a silent interval after each repetition.
+        # The fragments are written one by one rather than concatenated, so a
+        # slice of the source is passed on to the encoder without being copied.
+        audio_segments = (
+            [audio_segment, silent] * 2 +
+            [tts_audio_segment, silent] * 1 +
+            [audio_segment, silent] * 2
+        )
+        if job is not None:
+            with span("render.save") as trace:
+                audio_segments = job.save(subtitle, audio_segments)
+                trace["bytes"] = sum(len(segment.raw_data) for segment in audio_segments)
+        return audio_segments
+
+    # Translate cue N+k, synthesize cue N and decode cue N-k at the same time,
+    # appending each finished segment with the transition sound in cue order
+    pipeline = Pipeline(
+        [
+            Stage("translate", translate, batch_size=DEEPL_MAX_BATCH_SIZE),
+            Stage("synthesize", synthesize, workers=tts_pool.workers),
+            Stage("decode", decode, workers=os.cpu_count() or 1),
+        ],
+        verbose=verbose,
+    )
+    # Encode the output while it is being rendered, so that only the segments
+    # in flight are held in memory
+    with StreamingAudioWriter(output_file, audio_format, encoding) as final_audio:
+        with tqdm(total=len(subtitle_data), desc="Processing sentences") as pbar:
+
+            def assemble(audio_segments):
+                with span("export.write") as trace:
+                    start = final_audio.bytes_written
+                    final_audio.extend(audio_segments)
+                    final_audio.append(transition_sound)
+                    trace["bytes"] = final_audio.bytes_written - start
+                pbar.update()
+
+            try:
+                pipeline.run(subtitle_data, assemble)
+            finally:
+                if job is not None:
+                    job.close()
+
+        # Repeat the original at the end. When decoding ranges only, that is the
+        # part of the original covered by the processed subtitles.
+        if decode_mode == DecodeMode.RANGES and subtitle_data:
+            original = source.iter_chunks(
+                min(subtitle.start for subtitle in subtitle_data),
+                max(subtitle.end for subtitle in subtitle_data),
+            )
+        else:
+            original = source.iter_chunks()
+        with span("export.original") as trace:
+            start = final_audio.bytes_written
+            final_audio.extend(original)
+            trace["bytes"] = final_audio.bytes_written - start
+
+    if translations.saved or speech_files.saved or speech.saved:
+        print(
+            f"Repeated sentences: {translations.saved} translations, {speech_files.saved} TTS requests"
+            f" and {speech.saved} decodes saved"
         )
 
-        # Append the repeated audio segment to the list of audio segments
-        audio_segments.append(repeated_audio_segment)
-
-    # Load the transition sound
-    transition_sound = AudioSegment.from_file(transition_sound)
+    # Add label to the final audio file
+    add_label_to_file(output_file, "bilingual-audio")
+    return job
+
+
+def select_subtitles(args, subtitles: Iterable[Subtitle]) -> List[Subtitle]:
+    """
+    Returns the cues to render with the fromaudio command line `args`:
+    merged into sentence units with --merge-cues, then cut to
+    --offset/--limit. Merging comes first, so that runs over different
+    chunks render the same units as a run over all subtitles.
+    """
+    subtitles = list(subtitles)
+    if args.merge_cues:
+        cues = len(subtitles)
+        subtitles = list(merge_cues(subtitles, args.merge_max_gap, args.merge_max_duration))
+        print(f"Merged {cues} cues into {len(subtitles)} sentences")
+    subtitles = subtitles[args.offset :]
+    if args.limit is not None:
+        subtitles = subtitles[: args.limit]
+    return subtitles
 
-    # Concatenate the audio segments into a single audio file
-    final_audio = pydub.AudioSegment.empty()
-    for audio_segment in tqdm(audio_segments, desc="Processing audio segments"):
-        # Append the transition sound to each audio segment
-        if audio_segment.channels > 1:
-            audio_segment = audio_segment.set_channels(1)
-        final_audio += audio_segment + transition_sound
 
-    # Repeat the original at the end
-    final_audio += input_audio
+def render_episode(
+    args,
+    input_audio: str,
+    subtitle_file: str,
+    output_file: str,
+    translate_batch_func: Callable[[List[str], str], List[str]],
+) -> None:
+    """
+    Renders `input_audio` with the subtitles in `subtitle_file` to
+    `output_file`, using the settings of the fromaudio command line `args`.
+    """
+    # Load the subtitle file and parse it into a list of sentences
+    with span("subtitles.load") as trace:
+        subtitle_data = load_subtitle_file(subtitle_file)
+        trace["cues"] = len(subtitle_data)
+    subtitle_data = select_subtitles(args, subtitle_data)
+
+    # Checkpoints are shared by every run over the same input and settings,
+    # whatever part of the subtitles it renders. Old ones under the cache
+    # directory are pruned.
+    cache_dir = get_cache_dir(args.cache_dir)
+    if args.no_checkpoint:
+        job_dir = None
+    elif args.job_dir:
+        job_dir = args.job_dir
+    else:
+        jobs_dir = os.path.join(cache_dir, "jobs")
+        job_dir = os.path.join(
+            jobs_dir,
+            job_key(
+                input_audio, args.audio_track, args.tr_lang, args.tr_strategy, args.tts_engine, args.silent_interval
+            ),
+        )
+        prune_jobs(jobs_dir, keep=job_dir)
 
-    # Save the final audio to the output file
-    final_audio.export(output_file, format="mp3")
+    job = create_audio_from_audio(
+        input_audio,
+        subtitle_data,
+        output_file,
+        args.transition_sound,
+        args.tr_lang,
+        args.verbose,
+        translate_batch_func=translate_batch_func,
+        interval=args.silent_interval,
+        tts_pool=build_tts_pool(args),
+        decode_mode=DecodeMode(args.decode_mode),
+        scratch_dir=os.path.join(cache_dir, "pcm"),
+        job_dir=job_dir,
+        resume=not args.no_resume,
+        audio_track=args.audio_track,
+        probe_dir=os.path.join(cache_dir, "probe"),
+        encoding=build_encoding_settings(args),
+    )
 
-    # Add label to the final audio file
-    add_label_to_file(output_file, "bilingual-audio")
+    # Once every subtitle made it into a single output, the checkpoints are no
+    # longer needed
+    if job is None:
+        return
+    if args.offset == 0 and args.limit is None and not args.keep_job_dir:
+        job.remove()
+    else:
+        print(f"Rendered segments are kept in {job_dir}")
 
 
 def fromaudio_main(args):
@@ -107,10 +290,21 @@ def fromaudio_main(args):
         )
         exit(1)
 
-    from dualang.translator import build_translator, TranslationStrategy
+    if args.input_dir is not None:
+        if args.trace:
+            print("Error: --trace cannot be used with --input-dir.")
+            exit(1)
 
+        from dualang.command.fromaudio_batch import fromaudio_batch_main
+
+        fromaudio_batch_main(args)
+        return
+
+    from dualang.translator import build_batch_translator, TranslationStrategy
+
+    translation_memory = build_translation_memory(args)
     try:
-        translate_func = build_translator(TranslationStrategy(args.tr_strategy))
+        translate_batch_func = build_batch_translator(TranslationStrategy(args.tr_strategy), translation_memory)
     except ValueError as e:
         print(str(e))
         exit(1)
@@ -131,40 +325,24 @@ def fromaudio_main(args):
         exit(1)
 
     # If output file is not provided, derive it from the input audio file
-    args.output_file = get_output_file_name(args.input_audio, args.output_file)
-
-    # Load the subtitle file and parse it into a list of sentences
-    subtitle_data = load_subtitle_file(subtitle_file)
-    subtitle_data = subtitle_data[args.offset :]
-    if args.limit is not None:
-        subtitle_data = subtitle_data[: args.limit]
-
-    create_audio_from_audio(
-        args.input_audio,
-        subtitle_data,
-        args.output_file,
-        args.transition_sound,
-        args.tr_lang,
-        args.verbose,
-        translate_func=translate_func,
-        interval=args.silent_interval,
+    args.output_file = get_output_file_name(
+        args.input_audio, args.output_file, get_output_format(args.output_format).extension
     )
-def get_translation_audio(subtitle_text: str, tr_lang: str, translate_func: Callable[[str, str], str], temp_dir: str) -> AudioSegment:
-    # Translate the subtitle text using the provided translate function
-    translation = translate_func(subtitle_text, target_lang=tr_lang)
-
-    # Convert the translation into speech using gTTS
-    # Use the text attribute of the TextResult object
-    tts = gTTS(text=translation.text, lang=tr_lang)
-
-    # Generate a hash of the subtitle text
-    subtitle_hash = hashlib.md5(subtitle_text.encode()).hexdigest()
 
-    # Save the translated speech to a temporary file using the hash as the filename
-    tts_file = os.path.join(temp_dir, f"{subtitle_hash}.mp3")
-    tts.save(tts_file)
+    tracer = start_tracing() if args.trace else None
+    try:
+        render_episode(args, args.input_audio, subtitle_file, args.output_file, translate_batch_func)
+    except (SubtitleError, ValueError) as e:
+        # ValueError: no audio track matches --audio-track, or --job-dir holds other files
+        print(f"Error: {e}")
+        exit(1)
+    finally:
+        if tracer is not None:
+            stop_tracing()
+            tracer.write(args.trace)
+            print(tracer.summary())
+            print(f"Trace written to {args.trace}")
 
-    # Load the translated speech as an audio segment
-    tts_audio_segment = AudioSegment.from_file(tts_file)
+    if translation_memory is not None:
+        print(f"Translation memory: {translation_memory.hits} hits, {translation_memory.misses} misses")
 
-    return tts_audio_segment
@@ -0,0 +1,172 @@
+"""
+Batch mode of `fromaudio`: renders every episode in a directory.
+
+The directory is scanned once to pair audio files with their subtitles. All
+lines of the season are translated in a single pass, and translations that
+recur in several episodes are synthesized once, so that the episodes, which
+are rendered in parallel on a process pool, find the shared work in the
+translation memory and the TTS cache.
+
+Functions:
+- render_episodes: Renders episodes on a process pool and reports the results.
+"""
+import os
+import sys
+import time
+import traceback
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from dualang.args_helper import find_episodes, get_output_file_name
+from dualang.audio_format import get_output_format
+from dualang.command.fromaudio import render_episode, select_subtitles
+from dualang.subtitle_loader import load_cue_table, SubtitleError
+from dualang.translation_memory import build_translation_memory
+from dualang.tts_pool import build_tts_pool
+
+
+def _describe(error: BaseException) -> str:
+    lines = str(error).strip().splitlines()
+    return f"{type(error).__name__}: {lines[0]}" if lines else type(error).__name__
+
+
+@dataclass
+class EpisodeResult:
+    input_audio: str
+    seconds: float
+    error: Optional[str] = None
+
+
+def _render_episode_worker(args, input_audio: str, subtitle_file: str, output_file: str) -> EpisodeResult:
+    from dualang.translator import build_batch_translator, TranslationStrategy
+
+    start = time.perf_counter()
+    translation_memory = build_translation_memory(args)
+    try:
+        translate_batch_func = build_batch_translator(TranslationStrategy(args.tr_strategy), translation_memory)
+        render_episode(args, input_audio, subtitle_file, output_file, translate_batch_func)
+    except Exception as e:
+        traceback.print_exc()
+        return EpisodeResult(input_audio, time.perf_counter() - start, _describe(e))
+    finally:
+        if translation_memory is not None:
+            translation_memory.close()
+    return EpisodeResult(input_audio, time.perf_counter() - start)
+
+
+def share_work(args, episodes: List[Tuple[str, str]]) -> None:
+    """
+    Translates the lines of all episodes in one pass, and synthesizes the
+    translations of lines that occur in more than one episode. Needs the
+    translation memory, and the TTS cache for the synthesis.
+    """
+    from dualang.translator import build_batch_translator, TranslationStrategy
+
+    translation_memory = build_translation_memory(args)
+    if translation_memory is None:
+        return
+
+    texts: Counter = Counter()
+    for _, subtitle_file in episodes:
+        try:
+            subtitle_data = select_subtitles(args, load_cue_table(subtitle_file))
+        except SubtitleError:
+            # Reported by the render of the episode
+            continue
+        texts.update({subtitle.text for subtitle in subtitle_data if subtitle.text.strip()})
+
+    try:
+        translate_batch_func = build_batch_translator(TranslationStrategy(args.tr_strategy), translation_memory)
+        unique_texts = list(texts)
+        translations = dict(zip(unique_texts, translate_batch_func(unique_texts, target_lang=args.tr_lang)))
+    finally:
+        translation_memory.close()
+    print(f"Translated {len(unique_texts)} unique lines")
+
+    tts_pool = build_tts_pool(args)
+    recurring = {translations[text] for text, count in texts.items() if count > 1}
+    if tts_pool.cache is None or not recurring:
+        return
+
+    def warm(text):
+        # Clips too large for the cache are not kept
+        tts_pool.synthesize_to_file(text, args.tr_lang).release()
+
+    with ThreadPoolExecutor(max_workers=tts_pool.workers) as executor:
+        list(executor.map(warm, recurring))
+    print(f"Synthesized {len(recurring)} lines shared by several episodes")
+
+
+def render_episodes(args, episodes: List[Tuple[str, str]], jobs: int) -> List[EpisodeResult]:
+    """
+    Renders (audio file, subtitle file) pairs with the settings in `args`, on
+    `jobs` processes. Failures are reported in the results rather than raised.
+    """
+    extension = get_output_format(args.output_format).extension
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [
+            executor.submit(
+                _render_episode_worker,
+                args,
+                input_audio,
+                subtitle_file,
+                get_output_file_name(input_audio, args.output_file, extension),
+            )
+            for input_audio, subtitle_file in episodes
+        ]
+        results = []
+        for (input_audio, _), future in zip(episodes, futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                # The worker process died
+                results.append(EpisodeResult(input_audio, 0.0, _describe(e)))
+    return results
+
+
+def print_report(results: List[EpisodeResult], seconds: float) -> None:
+    width = max([len("Episode")] + [len(os.path.basename(r.input_audio)) for r in results])
+    print(f"{'Episode':<{width}}  {'Time':>8}  Result")
+    for result in results:
+        status = "ok" if result.error is None else f"failed: {result.error}"
+        print(f"{os.path.basename(result.input_audio):<{width}}  {result.seconds:7.1f}s  {status}")
+    rendered = sum(1 for result in results if result.error is None)
+    print(f"Rendered {rendered} of {len(results)} episodes in {seconds:.1f}s")
+
+
+def fromaudio_batch_main(args):
+    if not os.path.isdir(args.input_dir):
+        print(f"Error: Directory {args.input_dir} does not exist.")
+        sys.exit(1)
+
+    if args.output_file is not None and not os.path.isdir(args.output_file):
+        print(f"Error: Output directory {args.output_file} does not exist.")
+        sys.exit(1)
+
+    if args.subtitle_file or args.job_dir:
+        print("Error: --subtitle-file and --job-dir cannot be used with --input-dir.")
+        sys.exit(1)
+
+    if not os.path.isfile(args.transition_sound):
+        print(f"Error: Transition sound file {args.transition_sound} does not exist.")
+        sys.exit(1)
+
+    if args.jobs < 1:
+        print(f"Error: Number of jobs must be at least 1, got {args.jobs}.")
+        sys.exit(1)
+
+    episodes = find_episodes(args.input_dir)
+    if not episodes:
+        print(f"Error: No audio files with subtitles found in {args.input_dir}.")
+        sys.exit(1)
+    print(f"Found {len(episodes)} episodes in {args.input_dir}")
+
+    start = time.perf_counter()
+    share_work(args, episodes)
+    results = render_episodes(args, episodes, args.jobs)
+    print_report(results, time.perf_counter() - start)
+
+    if any(result.error is not None for result in results):
+        sys.exit(1)
@@ -1,14 +1,17 @@
-from gtts import gTTS  # type: ignore
 from pydub import AudioSegment  # type: ignore
 from tqdm import tqdm
 
 import json
-import tempfile
+
+from dualang.audio_format import AudioFormat, get_output_format
+from dualang.audio_writer import StreamingAudioWriter, build_encoding_settings
+from dualang.tts_pool import TTSPool, build_tts_pool
 
 
 def create_audio(
     sentences,
     transition_sound,
+    output_file,
     target_lang,
     target_key,
     tr_key,
@@ -16,49 +19,45 @@ def create_audio(
     target_repeat,
     translation_repeat,
     verbose,
+    tts_pool=None,
+    encoding=None,
 ):
-    final_audio = AudioSegment.silent(duration=0)
-
     # Load the transition sound
     transition_sound = AudioSegment.from_file(transition_sound)
 
+    # Convert target language and translation text to speech, in sentence order
+    tts_pool = tts_pool or TTSPool()
+    clips = tts_pool.imap(
+        request
+        for sentence in sentences
+        for request in ((sentence[target_key], target_lang), (sentence[tr_key], "en"))
+    )
+
+    # Encode the output while it is being rendered
+    audio_format = AudioFormat.of(transition_sound).union(tts_pool.engine.audio_format)
+
     # Iterate through the sentences with a progress bar and print the currently processing sentence
-    with tqdm(total=len(sentences)) as pbar:
+    with StreamingAudioWriter(output_file, audio_format, encoding) as final_audio, tqdm(total=len(sentences)) as pbar:
         for i, sentence in enumerate(sentences, 1):
             if verbose:
                 pbar.write(f"{i:03d} {sentence[target_key]}")
             pbar.set_postfix_str(f"Processing: {sentence[target_key]}")
             pbar.update()
 
-            target_text = sentence[target_key]
-            translation_text = sentence[tr_key]
-
-            # Convert target language text to speech
-            target_tts = gTTS(text=target_text, lang=target_lang)
-            with tempfile.NamedTemporaryFile(delete=False) as target_file:
-                target_tts.save(target_file.name)
-                target_audio = AudioSegment.from_mp3(target_file.name)
-
-            # Convert translation text to speech
-            translation_tts = gTTS(text=translation_text, lang="en")
-            with tempfile.NamedTemporaryFile(delete=False) as translation_file:
-                translation_tts.save(translation_file.name)
-                translation_audio = AudioSegment.from_mp3(translation_file.name)
+            # Target language and translation speech, synthesized ahead by the pool
+            target_audio = next(clips)
+            translation_audio = next(clips)
 
             # Repeat and combine the audio with interval between repetitions
-            combined_audio = (
-                target_audio + AudioSegment.silent(duration=interval)
-            ) * target_repeat
-            combined_audio += (
-                translation_audio * translation_repeat
-                + AudioSegment.silent(duration=interval)
-            )
-            combined_audio += target_audio
+            silent = AudioSegment.silent(duration=interval)
+            for _ in range(target_repeat):
+                final_audio.extend([target_audio, silent])
+            for _ in range(translation_repeat):
+                final_audio.append(translation_audio)
+            final_audio.extend([silent, target_audio])
 
             # Add to the final audio with a "ding" sound
-            final_audio += combined_audio + transition_sound
-
-    return final_audio
+            final_audio.append(transition_sound)
 
 
 def fromtext_main(args):
@@ -71,21 +70,23 @@ def fromtext_main(args):
         exit(1)
 
     # If output file is not provided, derive it from the input file
+    extension = get_output_format(args.output_format).extension
     if args.output is None:
-        args.output = args.input.rsplit(".", 1)[0] + ".mp3"
+        args.output = args.input.rsplit(".", 1)[0] + extension
 
     # Validate the output file
-    if not args.output.endswith(".mp3"):
-        print(f"Error: {args.output} is not a valid MP3 file.")
+    if not args.output.endswith(extension):
+        print(f"Error: {args.output} does not have the {extension} extension of the {args.output_format} format.")
         exit(1)
 
     # If target-lang-key or tr-lang-key are not provided, use the same value from target-lang or tr-lang
     target_lang_key = args.target_lang_key if args.target_lang_key else args.target_lang
     tr_lang_key = args.tr_lang_key if args.tr_lang_key else args.tr_lang
 
-    final_audio = create_audio(
+    create_audio(
         sentences=sentences,
         transition_sound=args.transition_sound,
+        output_file=args.output,
         target_lang=args.target_lang,
         target_key=target_lang_key,
         tr_key=tr_lang_key,
@@ -93,7 +94,6 @@ def fromtext_main(args):
         target_repeat=args.target_repeat,
         translation_repeat=args.translation_repeat,
         verbose=args.verbose,
+        tts_pool=build_tts_pool(args),
+        encoding=build_encoding_settings(args),
     )
-
-    # Save the final audio
-    final_audio.export(args.output, format="mp3")
@@ -1,66 +1,168 @@
 import os
 import sys
-import tempfile
+from collections import deque
+from itertools import islice
 
-from gtts import gTTS  # type: ignore
 from pydub import AudioSegment  # type: ignore
 from tqdm import tqdm
 
-from dualang.split_japanese_text import split_japanese_text
-from dualang.translator import build_translator, TranslationStrategy
+from dualang.audio_format import AudioFormat, EncodingSettings, get_output_format
+from dualang.audio_writer import StreamingAudioWriter, build_encoding_settings
+from dualang.tts_pool import TTSPool, build_tts_pool
+from dualang.split_japanese_text import iter_sentences
+from dualang.translation_memory import build_translation_memory
+from dualang.translator import build_batch_translator, DEEPL_MAX_BATCH_SIZE, TranslationStrategy
+
+
+def translate_in_batches(sentences, translate_batch_func, target_lang, batch_size=DEEPL_MAX_BATCH_SIZE):
+    """
+    Yields (sentence, translation) pairs, translating the sentences
+    `batch_size` at a time as they are read.
+    """
+    sentences = iter(sentences)
+    while True:
+        batch = list(islice(sentences, batch_size))
+        if not batch:
+            return
+        yield from zip(batch, translate_batch_func(batch, target_lang=target_lang))
+
+
+def chunk_file_name(output_file, index, extension):
+    """
+    Returns the name of the `index`-th chunk of `output_file`, starting at 1,
+    with `extension`, including the dot.
+    """
+    return f"{os.path.splitext(output_file)[0]}_{index:03d}{extension}"
+
+
+def write_playlist(playlist_file, chunks):
+    """
+    Writes an extended M3U playlist of (file, milliseconds, title) chunks,
+    with paths relative to the playlist. The playlist is replaced at once,
+    so a player never reads a partial one.
+    """
+    directory = os.path.dirname(os.path.abspath(playlist_file))
+    lines = ["#EXTM3U\n"]
+    for file, duration, title in chunks:
+        lines.append(f"#EXTINF:{round(duration / 1000)},{' '.join(title.split())}\n")
+        lines.append(os.path.relpath(os.path.abspath(file), directory) + "\n")
+    with open(playlist_file + ".tmp", "w", encoding="utf-8") as f:
+        f.write("".join(lines))
+    os.replace(playlist_file + ".tmp", playlist_file)
 
 
 def create_audio(
     sentences,
     transition_sound,
+    output_file,
     target_lang,
     interval,
     target_repeat,
     translation_repeat,
-    translate_func,
+    translate_batch_func,
     verbose,
+    tts_pool=None,
+    encoding=None,
+    chunk_sentences=None,
+    chunk_minutes=None,
 ):
-    final_audio = AudioSegment.silent(duration=0)
-
+    """
+    Renders the sentences to `output_file`. With `chunk_sentences` or
+    `chunk_minutes`, the output is cut after that many sentences or once
+    that many minutes are written, into files named after `output_file`
+    with a chunk number and the extension of the output format, and an
+    .m3u8 playlist of the finished chunks is updated as each one is closed.
+    A chunk is only opened once its first sentence is read.
+
+    Returns:
+        List[str]: The written files, in order.
+    """
     # Load the transition sound
     transition_sound = AudioSegment.from_file(transition_sound)
 
-    # Iterate through the sentences with a progress bar and print the currently processing sentence
-    with tqdm(total=len(sentences)) as pbar:
-        for i, sentence in enumerate(sentences, 1):
+    # Translate the sentences in batches as they are read, and convert target
+    # language and translation text to speech, in sentence order. `sentences`
+    # may be a generator, so the sentences whose speech is being synthesized
+    # are queued for the loop below.
+    tts_pool = tts_pool or TTSPool()
+    queued = deque()
+
+    def requests():
+        for sentence, translation_text in translate_in_batches(sentences, translate_batch_func, "ja"):
+            queued.append(sentence)
+            yield sentence, target_lang
+            yield translation_text, "en"
+
+    clips = tts_pool.imap(requests())
+
+    # Encode the output while it is being rendered
+    audio_format = AudioFormat.of(transition_sound).union(tts_pool.engine.audio_format)
+    silent = AudioSegment.silent(duration=interval)
+
+    chunked = chunk_sentences is not None or chunk_minutes is not None
+    extension = get_output_format((encoding or EncodingSettings()).output_format).extension
+    playlist_file = os.path.splitext(output_file)[0] + ".m3u8"
+    chunks = []  # (file, milliseconds, title) of the finished chunks
+    writer = None if chunked else StreamingAudioWriter(output_file, audio_format, encoding)
+    title, count = None, 0
+
+    def finish_chunk():
+        writer.close()
+        chunks.append((writer.output_file, len(writer), title or ""))
+        if chunked:
+            write_playlist(playlist_file, chunks)
             if verbose:
-                pbar.write(f"{i:03d} {sentence}")
-            pbar.set_postfix_str(f"Processing: {sentence}")
-            pbar.update()
-
-            translation_text = translate_func(sentence, target_lang="ja")
-
-            # Convert target language text to speech
-            target_tts = gTTS(text=sentence, lang=target_lang)
-            with tempfile.NamedTemporaryFile(delete=False) as target_file:
-                target_tts.save(target_file.name)
-                target_audio = AudioSegment.from_mp3(target_file.name)
-
-            # Convert translation text to speech
-            translation_tts = gTTS(text=translation_text, lang="en")
-            with tempfile.NamedTemporaryFile(delete=False) as translation_file:
-                translation_tts.save(translation_file.name)
-                translation_audio = AudioSegment.from_mp3(translation_file.name)
+                print(f"Wrote {writer.output_file}")
 
-            # Repeat and combine the audio with interval between repetitions
-            combined_audio = (
-                target_audio + AudioSegment.silent(duration=interval)
-            ) * target_repeat
-            combined_audio += (
-                translation_audio * translation_repeat
-                + AudioSegment.silent(duration=interval)
-            )
-            combined_audio += target_audio
-
-            # Add to the final audio with a "ding" sound
-            final_audio += combined_audio + transition_sound
-
-    return final_audio
+    # Iterate through the sentences with a progress bar and print the currently processing sentence
+    total = len(sentences) if hasattr(sentences, "__len__") else None
+    try:
+        with tqdm(total=total) as pbar:
+            # Target language and translation speech, synthesized ahead by the pool
+            for i, target_audio in enumerate(clips, 1):
+                translation_audio = next(clips)
+                sentence = queued.popleft()
+                if verbose:
+                    pbar.write(f"{i:03d} {sentence}")
+                pbar.set_postfix_str(f"Processing: {sentence}")
+                pbar.update()
+
+                if writer is None:
+                    chunk_file = chunk_file_name(output_file, len(chunks) + 1, extension)
+                    writer = StreamingAudioWriter(chunk_file, audio_format, encoding)
+                if title is None:
+                    title = sentence
+
+                # Repeat and combine the audio with interval between repetitions
+                for _ in range(target_repeat):
+                    writer.extend([target_audio, silent])
+                for _ in range(translation_repeat):
+                    writer.append(translation_audio)
+                writer.extend([silent, target_audio])
+
+                # Add to the final audio with a "ding" sound
+                writer.append(transition_sound)
+                count += 1
+
+                # Close the chunk between sentences once it is full
+                if chunked and (
+                    (chunk_sentences is not None and count >= chunk_sentences)
+                    or (chunk_minutes is not None and len(writer) >= chunk_minutes * 60000)
+                ):
+                    finish_chunk()
+                    writer, title, count = None, None, 0
+            if writer is not None:
+                finish_chunk()
+    except BaseException:
+        if writer is not None:
+            writer.abort()
+        raise
+
+    if chunked and chunks:
+        print(f"Wrote {len(chunks)} chunks and the playlist {playlist_file}")
+    elif chunked:
+        print("No sentences to render")
+    return [file for file, _, _ in chunks]
 
 
 def plaintext_main(args):
@@ -70,41 +172,57 @@ def plaintext_main(args):
         )
         sys.exit(1)
 
-    with open(args.input_file, "r", encoding="utf-8") as file:
-        text = file.read()
-
-    output_file = args.output_file or os.path.splitext(args.input)[0] + ".mp3"
-
-    # Split the text into sentences
-    sentences = split_japanese_text(text)
+    if args.chunk_sentences is not None and args.chunk_sentences < 1:
+        print(f"Error: Number of sentences per chunk must be at least 1, got {args.chunk_sentences}.")
+        sys.exit(1)
 
-    print("Sentences:")
-    for i, sentence in enumerate(sentences):
-        print(f" {i:03d} {sentence}")
+    if args.chunk_minutes is not None and args.chunk_minutes <= 0:
+        print(f"Error: Chunk length must be positive, got {args.chunk_minutes} minutes.")
+        sys.exit(1)
 
-    # Confirm with the user if they want to continue
-    user_input = input("Do you want to continue? (y/n): ")
-    if user_input.lower() not in ["y", "yes"]:
-        print("Exiting...")
-        sys.exit(0)
+    output_file = args.output_file or os.path.splitext(args.input_file)[0] + get_output_format(args.output_format).extension
 
+    translation_memory = build_translation_memory(args)
     try:
-        translate_func = build_translator(TranslationStrategy(args.tr_strategy))
+        translate_batch_func = build_batch_translator(TranslationStrategy(args.tr_strategy), translation_memory)
     except ValueError as e:
         print(str(e))
         exit(1)
 
-    # Generate TTS audio segments for each sentence
-    final_audio = create_audio(
-        sentences=sentences,
-        transition_sound=args.transition_sound,
-        target_lang="ja",
-        interval=100,
-        target_repeat=3,
-        translation_repeat=1,
-        translate_func=translate_func,
-        verbose=args.verbose,
-    )
-
-    # Save the final audio
-    final_audio.export(output_file, format="mp3", tags=None)
+    # Split the text into sentences, reading the file a line at a time
+    with open(args.input_file, "r", encoding="utf-8") as file:
+        sentences = iter_sentences(file)
+
+        # Without --yes, list the sentences and confirm with the user if they
+        # want to continue. With it, rendering starts with the first sentences
+        # while the rest of the file is being read.
+        if not args.yes:
+            sentences = list(sentences)
+            print("Sentences:")
+            for i, sentence in enumerate(sentences):
+                print(f" {i:03d} {sentence}")
+
+            user_input = input("Do you want to continue? (y/n): ")
+            if user_input.lower() not in ["y", "yes"]:
+                print("Exiting...")
+                sys.exit(0)
+
+        # Generate TTS audio segments for each sentence
+        create_audio(
+            sentences=sentences,
+            transition_sound=args.transition_sound,
+            output_file=output_file,
+            target_lang="ja",
+            interval=100,
+            target_repeat=3,
+            translation_repeat=1,
+            translate_batch_func=translate_batch_func,
+            verbose=args.verbose,
+            tts_pool=build_tts_pool(args),
+            encoding=build_encoding_settings(args),
+            chunk_sentences=args.chunk_sentences,
+            chunk_minutes=args.chunk_minutes,
+        )
+
+    if translation_memory is not None:
+        print(f"Translation memory: {translation_memory.hits} hits, {translation_memory.misses} misses")
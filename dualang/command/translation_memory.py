@@ -0,0 +1,27 @@
+import os
+import sys
+
+from dualang.translation_memory import TRANSLATION_MEMORY_FILE, TranslationMemory
+from dualang.tts_cache import get_cache_dir
+
+
+def translation_memory_main(args):
+    memory_file = os.path.join(get_cache_dir(args.cache_dir), TRANSLATION_MEMORY_FILE)
+
+    if args.import_file and not os.path.isfile(args.import_file):
+        print(f"Error: File {args.import_file} does not exist.")
+        sys.exit(1)
+
+    memory = TranslationMemory(memory_file)
+    try:
+        if args.import_file:
+            count = memory.import_json(args.import_file)
+            print(f"Imported {count} translations from {args.import_file}")
+
+        if args.export_file:
+            count = memory.export_json(args.export_file)
+            print(f"Exported {count} translations to {args.export_file}")
+
+        print(f"Translation memory {memory_file}: {len(memory)} translations")
+    finally:
+        memory.close()
@@ -0,0 +1,33 @@
+from typing import Iterable, Iterator, Tuple
+
+Interval = Tuple[int, int]  # (start, end) in milliseconds
+
+
+def merge_intervals(intervals: Iterable[Interval], padding: int = 0) -> Iterator[Interval]:
+    """
+    Pads intervals on both sides and merges the ones that overlap or touch.
+
+    Intervals are sorted by start first, then merged in a single pass.
+    Starts are clamped to 0 and empty intervals are dropped.
+
+    Args:
+        intervals (Iterable[Interval]): (start, end) pairs in milliseconds.
+        padding (int): Milliseconds added before the start and after the end.
+
+    Yields:
+        Interval: The merged intervals, in order.
+    """
+    current = None
+    for start, end in sorted(intervals):
+        start, end = max(0, start - padding), end + padding
+        if end <= start:
+            continue
+        if current is None:
+            current = (start, end)
+        elif start <= current[1]:
+            current = (current[0], max(current[1], end))
+        else:
+            yield current
+            current = (start, end)
+    if current is not None:
+        yield current
@@ -0,0 +1,89 @@
+"""
+Merging of subtitle cues into sentence units.
+
+Subtitles often split one spoken sentence across several cues, to keep each
+cue short on screen. Translating and speaking every cue on its own takes more
+requests, and the translations of sentence fragments are worse. `merge_cues`
+joins adjacent cues until a sentence ends, as long as they follow each other
+closely and the unit stays short enough to be repeated.
+"""
+from typing import Iterable, Iterator, List
+
+from dualang.split_japanese_text import SENTENCE_ENDINGS
+from dualang.subtitle_loader import Subtitle
+
+# Sentence endings of Japanese and of languages written with Latin script
+_SENTENCE_ENDINGS = SENTENCE_ENDINGS + "!?.．♪"
+# Japanese quotes hold a whole utterance, with or without a period
+_CLOSING_QUOTES = "」』"
+# Closing brackets and quotes that may follow the end of a sentence
+_CLOSING = "）】〉》)]\"'”’"
+
+DEFAULT_MAX_GAP = 500  # milliseconds
+DEFAULT_MAX_DURATION = 10000  # milliseconds
+
+
+def ends_sentence(text: str) -> bool:
+    """
+    Returns True if `text` ends with a sentence ending punctuation mark, or
+    with the end of a Japanese quote.
+    """
+    text = text.rstrip().rstrip(_CLOSING)
+    return not text or text[-1] in _SENTENCE_ENDINGS + _CLOSING_QUOTES
+
+
+def _is_cjk(char: str) -> bool:
+    # Kana, CJK ideographs and full-width punctuation are written without spaces
+    return "　" <= char <= "鿿" or "＀" <= char <= "￯"
+
+
+def _join(texts: List[str]) -> str:
+    text = texts[0].strip()
+    for part in texts[1:]:
+        part = part.strip()
+        separator = "" if _is_cjk(text[-1]) or _is_cjk(part[0]) else " "
+        text += separator + part
+    return text
+
+
+def merge_cues(
+    subtitles: Iterable[Subtitle],
+    max_gap: int = DEFAULT_MAX_GAP,
+    max_duration: int = DEFAULT_MAX_DURATION,
+) -> Iterator[Subtitle]:
+    """
+    Merges adjacent cues into sentence units.
+
+    A cue is appended to the unit before it if the unit does not end a
+    sentence, the cue starts at most `max_gap` milliseconds after the unit
+    ends, and the unit with the cue lasts at most `max_duration`
+    milliseconds. The texts of merged cues are joined with a space, or with
+    nothing between Japanese characters. Cues without text are dropped.
+
+    Args:
+        subtitles (Iterable[Subtitle]): Cues in order.
+        max_gap (int): Longest silence between two merged cues, in milliseconds.
+        max_duration (int): Longest unit, in milliseconds.
+
+    Yields:
+        Subtitle: The sentence units, in order.
+    """
+    start = end = 0
+    texts: List[str] = []
+    for subtitle in subtitles:
+        if not subtitle.text.strip():
+            continue
+        if (
+            texts
+            and not ends_sentence(texts[-1])
+            and 0 <= subtitle.start - end <= max_gap
+            and subtitle.end - start <= max_duration
+        ):
+            texts.append(subtitle.text)
+            end = subtitle.end
+            continue
+        if texts:
+            yield Subtitle(start, end, _join(texts) if len(texts) > 1 else texts[0])
+        start, end, texts = subtitle.start, subtitle.end, [subtitle.text]
+    if texts:
+        yield Subtitle(start, end, _join(texts) if len(texts) > 1 else texts[0])
@@ -0,0 +1,141 @@
+"""
+A small staged pipeline built on asyncio.
+
+Items flow from a source iterable through a list of stages to a sink. Every
+stage runs its function on worker threads and hands results to the next
+stage through a bounded queue, so a stage that falls behind makes the
+earlier ones wait instead of letting work pile up in memory. The sink
+receives the items in source order, whatever order the workers finish in.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from tqdm import tqdm
+
+_DONE = object()
+
+
+class Stage:
+    """
+    A step of the pipeline.
+
+    Args:
+        name (str): Name shown in verbose output.
+        func (Callable): Function applied to every item. If `batch_size` is
+            set, it receives a list of up to `batch_size` items and must
+            return a list of results in the same order.
+        workers (int): Number of items processed concurrently.
+        batch_size (Optional[int]): Number of items passed to `func` at once.
+    """
+
+    def __init__(self, name: str, func: Callable, workers: int = 1, batch_size: Optional[int] = None):
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.batch_size = batch_size
+
+
+class Pipeline:
+    def __init__(self, stages: List[Stage], queue_size: int = 8, verbose: bool = False):
+        self.stages = stages
+        self.queue_size = queue_size
+        self.verbose = verbose
+
+    def run(self, items: Iterable[Any], sink: Callable[[Any], None]) -> None:
+        """
+        Feeds `items` through all stages and calls `sink` on each result in order.
+        """
+        asyncio.run(self._run(items, sink))
+
+    async def _run(self, items: Iterable[Any], sink: Callable[[Any], None]) -> None:
+        loop = asyncio.get_running_loop()
+        queues = [
+            asyncio.Queue(maxsize=max(self.queue_size, stage.batch_size or 1))
+            for stage in self.stages
+        ]
+        queues.append(asyncio.Queue(maxsize=self.queue_size))
+
+        # Bound the number of items between the source and the sink, including
+        # the ones waiting in the sink's reorder buffer.
+        max_in_flight = sum(queue.maxsize for queue in queues) + sum(
+            stage.workers * (stage.batch_size or 1) for stage in self.stages
+        )
+        in_flight = asyncio.Semaphore(max_in_flight)
+
+        executor = ThreadPoolExecutor(max_workers=sum(stage.workers for stage in self.stages) + 1)
+
+        async def feed():
+            for index, item in enumerate(items):
+                await in_flight.acquire()
+                await queues[0].put((index, item))
+            await queues[0].put(_DONE)
+
+        async def work(stage: Stage, input_queue: asyncio.Queue, output_queue: asyncio.Queue, finished: List[int]):
+            while True:
+                entry = await input_queue.get()
+                if entry is _DONE:
+                    # Let the sibling workers see the end of the stream too, and
+                    # forward it once the last of them is done.
+                    await input_queue.put(_DONE)
+                    finished[0] += 1
+                    if finished[0] == stage.workers:
+                        await output_queue.put(_DONE)
+                    return
+
+                if stage.batch_size:
+                    batch = [entry]
+                    while len(batch) < stage.batch_size:
+                        entry = await input_queue.get()
+                        if entry is _DONE:
+                            await input_queue.put(_DONE)
+                            break
+                        batch.append(entry)
+                    results = await loop.run_in_executor(
+                        executor, stage.func, [item for _, item in batch]
+                    )
+                    for (index, _), result in zip(batch, results):
+                        await output_queue.put((index, result))
+                else:
+                    index, item = entry
+                    result = await loop.run_in_executor(executor, stage.func, item)
+                    await output_queue.put((index, result))
+
+        async def drain():
+            pending: Dict[int, Any] = {}
+            next_index = 0
+            while True:
+                entry = await queues[-1].get()
+                if entry is _DONE:
+                    return
+                index, item = entry
+                pending[index] = item
+                while next_index in pending:
+                    await loop.run_in_executor(executor, sink, pending.pop(next_index))
+                    next_index += 1
+                    in_flight.release()
+
+        async def report():
+            while True:
+                await asyncio.sleep(1)
+                depths = ", ".join(
+                    f"{stage.name}={queue.qsize()}" for stage, queue in zip(self.stages, queues)
+                )
+                tqdm.write(f"Queue depths: {depths}, sink={queues[-1].qsize()}")
+
+        tasks = [asyncio.ensure_future(feed())]
+        for stage, input_queue, output_queue in zip(self.stages, queues, queues[1:]):
+            finished = [0]
+            for _ in range(stage.workers):
+                tasks.append(asyncio.ensure_future(work(stage, input_queue, output_queue, finished)))
+        tasks.append(asyncio.ensure_future(drain()))
+        reporter = asyncio.ensure_future(report()) if self.verbose else None
+
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            if reporter is not None:
+                reporter.cancel()
+            executor.shutdown(wait=True)
@@ -0,0 +1,237 @@
+"""
+Checkpoints of a `fromaudio` render.
+
+Every cue of a render is turned into a segment of original audio, silence and
+TTS that only depends on the cue and the render settings. A RenderJob keeps
+these segments as raw PCM files in a work directory, and records each
+finished one in an append-only manifest, so a render that dies half way can
+resume where it stopped. Segments are keyed by the cue's timing and text
+rather than its position, so runs over different --offset/--limit chunks of
+the same subtitles share their work.
+"""
+import contextlib
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: jobs in use are not protected from pruning
+    fcntl = None  # type: ignore
+
+from pydub import AudioSegment  # type: ignore
+
+from dualang.audio_format import AudioFormat
+
+MANIFEST_FILE = "manifest.jsonl"
+JOB_FILE = "job.json"
+SEGMENTS_DIR = "segments"
+
+# Bounds of the work directories kept under the cache directory
+DEFAULT_JOBS_SIZE_MB = 8192
+MAX_JOB_AGE_DAYS = 14
+
+
+def job_key(input_audio: str, *settings) -> str:
+    """
+    Returns the name of the work directory for rendering `input_audio` with
+    `settings`. The input is identified by its path, size and mtime.
+    """
+    stat = os.stat(input_audio)
+    parts = [os.path.abspath(input_audio), stat.st_size, stat.st_mtime_ns, *settings]
+    return hashlib.sha256("\0".join(str(part) for part in parts).encode()).hexdigest()
+
+
+def cue_key(subtitle) -> str:
+    return hashlib.sha256(f"{subtitle.start}\0{subtitle.end}\0{subtitle.text}".encode()).hexdigest()
+
+
+class RenderJob:
+    """
+    Work directory holding the rendered segments of a job.
+
+    All segments are stored in `audio_format`. If the directory was created
+    for another format, or `resume` is false, its segments are discarded.
+    `save` may be called from several threads.
+
+    A job only ever creates and deletes its own files, JOB_FILE,
+    MANIFEST_FILE and SEGMENTS_DIR, in the work directory. While it is open,
+    it holds a lock on its manifest, so that `prune_jobs` in another process
+    leaves it alone.
+
+    Raises:
+        ValueError: If `work_dir` holds files but no job.
+    """
+
+    def __init__(self, work_dir: str, audio_format: AudioFormat, resume: bool = True):
+        self.work_dir = work_dir
+        self.audio_format = audio_format
+        self.segments_dir = os.path.join(work_dir, SEGMENTS_DIR)
+        self._lock = threading.Lock()
+
+        job = {"format": [audio_format.frame_rate, audio_format.channels, audio_format.sample_width]}
+        job_file = os.path.join(work_dir, JOB_FILE)
+        if os.path.isdir(work_dir) and os.listdir(work_dir) and not os.path.isfile(job_file):
+            raise ValueError(f"Job directory {work_dir} is not empty and does not hold a render job.")
+        if resume and self._read_json(job_file) != job:
+            resume = False
+        if not resume:
+            self._discard()
+        os.makedirs(self.segments_dir, exist_ok=True)
+        self._manifest = open(os.path.join(work_dir, MANIFEST_FILE), "a", encoding="utf-8")
+        if fcntl is not None:
+            fcntl.flock(self._manifest.fileno(), fcntl.LOCK_EX)
+        with open(job_file, "w", encoding="utf-8") as f:
+            json.dump(job, f)
+
+        self._done: Dict[str, str] = self._read_manifest()
+
+    @staticmethod
+    def _read_json(path: str) -> Optional[dict]:
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _read_manifest(self) -> Dict[str, str]:
+        done = {}
+        try:
+            with open(os.path.join(self.work_dir, MANIFEST_FILE), encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # The last line is cut short if a run was killed while writing it
+                        continue
+                    if os.path.isfile(os.path.join(self.work_dir, entry["file"])):
+                        done[entry["cue"]] = entry["file"]
+        except FileNotFoundError:
+            pass
+        return done
+
+    def __contains__(self, subtitle) -> bool:
+        return cue_key(subtitle) in self._done
+
+    def count(self, subtitles: Iterable) -> int:
+        """Returns how many of `subtitles` are already rendered."""
+        return sum(1 for subtitle in subtitles if subtitle in self)
+
+    def load(self, subtitle) -> AudioSegment:
+        with open(os.path.join(self.work_dir, self._done[cue_key(subtitle)]), "rb") as f:
+            data = f.read()
+        return AudioSegment(
+            data=data,
+            sample_width=self.audio_format.sample_width,
+            frame_rate=self.audio_format.frame_rate,
+            channels=self.audio_format.channels,
+        )
+
+    def save(self, subtitle, segments: List[AudioSegment]) -> List[AudioSegment]:
+        """
+        Stores the rendered segments of `subtitle` and records it as finished.
+        Returns the segments converted to the job's format.
+        """
+        key = cue_key(subtitle)
+        segments = [self.audio_format.convert(segment) for segment in segments]
+        file = os.path.join(SEGMENTS_DIR, f"{key}.pcm")
+        path = os.path.join(self.work_dir, file)
+        with open(path + ".tmp", "wb") as f:
+            for segment in segments:
+                f.write(segment.raw_data)
+        os.replace(path + ".tmp", path)
+
+        entry = {"cue": key, "file": file, "start": subtitle.start, "end": subtitle.end}
+        with self._lock:
+            self._manifest.write(json.dumps(entry) + "\n")
+            self._manifest.flush()
+            self._done[key] = file
+        return segments
+
+    def close(self) -> None:
+        self._manifest.close()
+
+    def _discard(self) -> None:
+        """
+        Deletes the files of the job. The job file goes last, so that the
+        directory is still known as a job if this is interrupted.
+        """
+        shutil.rmtree(self.segments_dir, ignore_errors=True)
+        for name in [MANIFEST_FILE, JOB_FILE]:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(os.path.join(self.work_dir, name))
+
+    def remove(self) -> None:
+        """
+        Closes the job and deletes its files, and the work directory if
+        nothing else is left in it.
+        """
+        self.close()
+        self._discard()
+        with contextlib.suppress(OSError):
+            os.rmdir(self.work_dir)
+
+
+def _job_size(work_dir: str) -> int:
+    size = 0
+    for root, _, files in os.walk(work_dir):
+        for name in files:
+            with contextlib.suppress(FileNotFoundError):
+                size += os.path.getsize(os.path.join(root, name))
+    return size
+
+
+def _remove_unless_open(work_dir: str) -> bool:
+    """Removes the job in `work_dir` unless another process has it open."""
+    try:
+        manifest = open(os.path.join(work_dir, MANIFEST_FILE), "a", encoding="utf-8")
+    except FileNotFoundError:
+        return False
+    with manifest:
+        if fcntl is not None:
+            try:
+                fcntl.flock(manifest.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return False
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return True
+
+
+def prune_jobs(
+    jobs_dir: str,
+    keep: Optional[str] = None,
+    max_bytes: int = DEFAULT_JOBS_SIZE_MB * 1024 * 1024,
+    max_age_days: float = MAX_JOB_AGE_DAYS,
+) -> None:
+    """
+    Removes the work directories in `jobs_dir` that were last written more
+    than `max_age_days` ago, then the least recently written ones until all
+    of them fit in `max_bytes`. `keep` and jobs that are open in another
+    process are never removed.
+    """
+    try:
+        names = os.listdir(jobs_dir)
+    except FileNotFoundError:
+        return
+    jobs = {}
+    for name in names:
+        work_dir = os.path.join(jobs_dir, name)
+        if keep is not None and os.path.abspath(work_dir) == os.path.abspath(keep):
+            continue
+        try:
+            jobs[work_dir] = os.path.getmtime(os.path.join(work_dir, MANIFEST_FILE))
+        except OSError:
+            continue
+
+    sizes = {work_dir: _job_size(work_dir) for work_dir in jobs}
+    total = sum(sizes.values()) + (_job_size(keep) if keep is not None else 0)
+    expired = time.time() - max_age_days * 24 * 60 * 60
+    for work_dir in sorted(jobs, key=jobs.__getitem__):
+        if total <= max_bytes and jobs[work_dir] >= expired:
+            break
+        if _remove_unless_open(work_dir):
+            total -= sizes[work_dir]
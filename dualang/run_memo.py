@@ -0,0 +1,77 @@
+"""
+Sharing of repeated work within a single run.
+
+Subtitles repeat themselves: short answers, song lyrics, opening and ending
+credits. A RunMemo is told up front how often each key will be requested,
+computes the value of a key the first time it is requested, and hands the
+same value to every later request. A value is dropped after its last
+request, so only the values of keys that are still to come are held.
+"""
+import threading
+from collections import Counter
+from concurrent.futures import Future
+from typing import Callable, Dict, Hashable, Iterable, List, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class RunMemo:
+    """
+    Computes the value of each key once, for a known list of requests.
+
+    Requests from several threads for a key whose value is being computed
+    wait for that value instead of computing it again.
+
+    Args:
+        keys (Iterable[Hashable]): Keys of all the requests to come, with
+            repeats. Keys requested more often than listed are computed again.
+    """
+
+    def __init__(self, keys: Iterable[Hashable]):
+        self._uses = Counter(keys)
+        self._values: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.saved = 0
+
+    def get(self, key: Hashable, compute: Callable[[], T]) -> T:
+        """Returns the value of `key`, calling `compute` if it is not known yet."""
+        return self.get_many([key], lambda keys: [compute()])[0]
+
+    def get_many(self, keys: Sequence[Hashable], compute_many: Callable[[List[Hashable]], List[T]]) -> List[T]:
+        """
+        Returns the values of `keys` in order. The unique keys whose value is
+        not known yet are passed to `compute_many` in a single call, which
+        must return their values in the same order.
+        """
+        missing: List[Tuple[Hashable, Future]] = []
+        futures: List[Future] = []
+        with self._lock:
+            for key in keys:
+                future = self._values.get(key)
+                if future is None:
+                    future = self._values[key] = Future()
+                    missing.append((key, future))
+                    self.calls += 1
+                else:
+                    self.saved += 1
+                futures.append(future)
+                # The last request of a key releases its value
+                uses = self._uses[key] - 1
+                if uses > 0:
+                    self._uses[key] = uses
+                else:
+                    self._uses.pop(key, None)
+                    del self._values[key]
+
+        if missing:
+            try:
+                values = compute_many([key for key, _ in missing])
+            except BaseException as e:
+                for _, future in missing:
+                    future.set_exception(e)
+                raise
+            for (_, future), value in zip(missing, values):
+                future.set_result(value)
+
+        return [future.result() for future in futures]
@@ -1,19 +1,79 @@
 import re
+from typing import Iterable, Iterator, Optional
 
+# Punctuation marks that end a Japanese sentence
+SENTENCE_ENDINGS = "。！？"
 
-def split_japanese_text(text):
-    # Check if there are any Japanese punctuation marks in the text
-    if not re.search(r"。|！|？", text):
-        return [text.strip()] if text.strip() else []
+_OPENING_QUOTES = "「『"
+_CLOSING_QUOTES = "」』"
+
+# Quotes, runs of sentence endings and ellipses, and line breaks
+_TOKEN = re.compile(
+    f"(?P<open>[{_OPENING_QUOTES}])"
+    f"|(?P<close>[{_CLOSING_QUOTES}])"
+    f"|(?P<end>(?:[{SENTENCE_ENDINGS}!?]|…|‥|\\.\\.\\.)+)"
+    "|(?P<newline>\n)"
+)
+# Anything but whitespace, punctuation and quotes
+_WORD = re.compile(f"[^\\s{SENTENCE_ENDINGS}!?…‥.{_OPENING_QUOTES}{_CLOSING_QUOTES}]")
+
+
+def iter_sentences(chunks: Iterable[str]) -> Iterator[str]:
+    """
+    Splits Japanese text into sentences, and yields each sentence as soon as
+    its end has been read.
+
+    Sentences end with a run of 。, ！, ？, ! or ?, with an ellipsis, at a line
+    break, and between a closing quote and an opening one. Punctuation
+    inside 「」 or 『』 quotes does not end a sentence. Sentences are stripped,
+    and pieces without any word, such as a lone 。, are dropped.
 
-    # Split the text based on common Japanese punctuation marks, but preserve the delimiters
-    sentences = re.split(r"(。|！|？)", text)
+    Args:
+        chunks (Iterable[str]): The text in pieces of any size, such as the
+            lines of a file.
+    """
+    buffer = ""
+    start = scan = depth = 0
+    final = False
+    chunks = iter(chunks)
+    while not final:
+        chunk = next(chunks, None)
+        if chunk is None:
+            final = True
+        else:
+            # Drop what was already yielded before appending
+            buffer, scan, start = buffer[start:] + chunk, scan - start, 0
 
-    # Combine each sentence with its trailing punctuation mark, and filter out empty strings
-    sentences = [
-        sentences[i].strip() + sentences[i + 1].strip()
-        for i in range(0, len(sentences) - 1, 2)
-        if sentences[i].strip()
-    ]
+        for match in _TOKEN.finditer(buffer, scan):
+            kind = match.lastgroup
+            if kind == "end" and match.end() == len(buffer) and not final:
+                # The run of punctuation may go on in the next chunk
+                break
+            scan = match.end()
+            boundary: Optional[int] = None
+            if kind == "open":
+                if depth == 0 and buffer[start : match.start()].rstrip().endswith(tuple(_CLOSING_QUOTES)):
+                    boundary = match.start()
+                depth += 1
+            elif kind == "close":
+                depth = max(depth - 1, 0)
+            elif kind == "newline":
+                depth = 0
+                boundary = match.end()
+            elif depth == 0:
+                boundary = match.end()
 
-    return sentences
+            if boundary is not None:
+                sentence = buffer[start:boundary]
+                start = boundary
+                if _WORD.search(sentence):
+                    yield sentence.strip()
+
+    sentence = buffer[start:]
+    if _WORD.search(sentence):
+        yield sentence.strip()
+
+
+def split_japanese_text(text):
+    """Splits Japanese text into a list of sentences. See `iter_sentences`."""
+    return list(iter_sentences([text]))
@@ -1,52 +1,202 @@
-import os
-import pyass
-import pysrt
-import webvtt
+"""
+Loading of subtitle files.
 
+SRT and VTT files are parsed natively, a line at a time, and their cues are
+yielded lazily by `iter_subtitles`. ASS files are read with pyass. For
+planning passes over many files, `load_cue_table` keeps the cues of a file
+in a CueTable, with the timings in two int32 arrays. Problems with a file
+are raised as SubtitleError.
+"""
+import html
+import os
+import re
+from array import array
 from dataclasses import dataclass
-from typing import List
+from typing import Iterable, Iterator, List, Optional, TextIO, Union, overload
+
+SUBTITLE_FORMATS = (".srt", ".ass", ".vtt")
+
+# "01:02:03,456", "02:03.456" (VTT may leave out the hours) or "1:02:03.4"
+_TIMESTAMP = re.compile(r"\s*(?:(\d+):)?(\d{1,2}):(\d{1,2})[,.](\d{1,3})")
+_ARROW = re.compile(r"\s*-->")
+_VTT_TAG = re.compile(r"<[^>]*>")
+
+
+class SubtitleError(ValueError):
+    """Raised when a subtitle file is missing, unsupported or malformed."""
 
 
 @dataclass
 class Subtitle:
+    __slots__ = ("start", "end", "text")
+
     start: int  # milleseconds
     end: int  # milliseconds
     text: str
 
 
-def load_subtitle_file(subtitle_file: str) -> List[Subtitle]:
-    # Validate if the subtitle file exists
+def _parse_timestamp(line: str, pos: int):
+    match = _TIMESTAMP.match(line, pos)
+    if match is None:
+        return None, pos
+    hours, minutes, seconds, fraction = match.groups()
+    # "1:02:03.4" is 400 milliseconds, not 4
+    ms = ((int(hours or 0) * 60 + int(minutes)) * 60 + int(seconds)) * 1000 + int(fraction.ljust(3, "0"))
+    return ms, match.end()
+
+
+def _parse_timing(line: str):
+    """Returns the (start, end) of an "start --> end [settings]" line, or None."""
+    start, pos = _parse_timestamp(line, 0)
+    if start is None:
+        return None
+    arrow = _ARROW.match(line, pos)
+    if arrow is None:
+        return None
+    end, _ = _parse_timestamp(line, arrow.end())
+    if end is None:
+        return None
+    return start, end
+
+
+def parse_cues(lines: Iterable[str], vtt: bool = False, name: str = "<subtitles>") -> Iterator[Subtitle]:
+    """
+    Parses SRT or VTT cues from `lines` and yields them as they are read.
+
+    A cue is a timing line, optionally preceded by a number or identifier,
+    followed by its text up to the next blank line. Blocks without a timing
+    line, such as the VTT header, NOTE and STYLE blocks, are skipped. The
+    lines of a cue's text are joined with newlines. In VTT, tags such as
+    <v Speaker> or <i> are removed and character references are decoded.
+
+    Raises:
+        SubtitleError: If a line has a "-->" arrow but no valid timing.
+    """
+    timing = None
+    text: List[str] = []
+    for number, line in enumerate(lines, 1):
+        line = line.rstrip("\r\n")
+        if timing is None:
+            if "-->" in line:
+                timing = _parse_timing(line)
+                if timing is None:
+                    raise SubtitleError(f"{name}:{number}: Invalid cue timing: {line.strip()}")
+            continue
+        if line.strip():
+            text.append(line)
+            continue
+        yield _make_subtitle(timing, text, vtt)
+        timing, text = None, []
+    if timing is not None:
+        yield _make_subtitle(timing, text, vtt)
+
+
+def _make_subtitle(timing, lines: List[str], vtt: bool) -> Subtitle:
+    text = "\n".join(lines)
+    if vtt:
+        text = html.unescape(_VTT_TAG.sub("", text))
+    return Subtitle(timing[0], timing[1], text)
+
+
+def iter_subtitles(subtitle_file: str, encoding: str = "utf-8-sig") -> Iterator[Subtitle]:
+    """
+    Yields the cues of an SRT, VTT or ASS file in file order. SRT and VTT
+    files are read lazily.
+
+    Raises:
+        SubtitleError: If the file does not exist, is not a supported format,
+            cannot be decoded with `encoding` or is malformed.
+    """
     if not os.path.isfile(subtitle_file):
-        print(f"Error: Subtitle file {subtitle_file} does not exist.")
-        exit(1)
-
-    # Load the subtitle file and parse it into a list of Subtitle objects
-    if subtitle_file.endswith(".srt"):
-        subtitle_data = pysrt.open(subtitle_file)
-        subtitles = [
-            Subtitle(s.start.ordinal, s.end.ordinal, s.text) for s in subtitle_data
-        ]
-    elif subtitle_file.endswith(".ass"):
-        with open(subtitle_file, encoding="utf_8_sig") as f:
-            subtitle_data = pyass.load(f).events
-        subtitles = [
-            Subtitle(e.start.total_milliseconds(), e.end.total_milliseconds(), e.text)
-            for e in subtitle_data
-        ]
-    elif subtitle_file.endswith(".vtt"):
-        subtitle_data = webvtt.read(subtitle_file)
-        subtitles = [
-            Subtitle(s.start_in_seconds * 1000, s.end_in_seconds * 1000, s.text)
-            for s in subtitle_data
-        ]
-    else:
-        print(
-            f"Error: Unsupported subtitle file format. Only .srt, .ass and .vtt are supported."
+        raise SubtitleError(f"Subtitle file {subtitle_file} does not exist.")
+    extension = os.path.splitext(subtitle_file)[1].lower()
+    if extension not in SUBTITLE_FORMATS:
+        raise SubtitleError(
+            f"Unsupported subtitle file format {extension}. Only {', '.join(SUBTITLE_FORMATS)} are supported."
         )
-        exit(1)
+
+    with open(subtitle_file, encoding=encoding) as f:
+        try:
+            if extension == ".ass":
+                yield from _read_ass(f, subtitle_file)
+            else:
+                yield from parse_cues(f, vtt=extension == ".vtt", name=subtitle_file)
+        except UnicodeDecodeError as e:
+            raise SubtitleError(f"{subtitle_file} is not a valid {encoding} file: {e}")
+
+
+def _read_ass(f: TextIO, subtitle_file: str) -> Iterator[Subtitle]:
+    import pyass  # type: ignore
+
+    try:
+        events = pyass.load(f).events
+    except UnicodeDecodeError:
+        raise
+    except Exception as e:
+        raise SubtitleError(f"{subtitle_file} is not a valid ASS file: {e}")
+    for event in events:
+        yield Subtitle(event.start.total_milliseconds(), event.end.total_milliseconds(), event.text)
+
+
+class CueTable:
+    """
+    Compact table of cues: start and end times in int32 arrays, and the
+    texts in a list. Indexing returns a Subtitle, slicing a CueTable.
+    """
+
+    __slots__ = ("starts", "ends", "texts")
+
+    def __init__(self, subtitles: Iterable[Subtitle] = ()):
+        self.starts = array("i")
+        self.ends = array("i")
+        self.texts: List[str] = []
+        for subtitle in subtitles:
+            self.append(subtitle)
+
+    def append(self, subtitle: Subtitle) -> None:
+        self.starts.append(subtitle.start)
+        self.ends.append(subtitle.end)
+        self.texts.append(subtitle.text)
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    @overload
+    def __getitem__(self, index: int) -> Subtitle: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> "CueTable": ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Subtitle, "CueTable"]:
+        if isinstance(index, slice):
+            table = CueTable()
+            table.starts = self.starts[index]
+            table.ends = self.ends[index]
+            table.texts = self.texts[index]
+            return table
+        return Subtitle(self.starts[index], self.ends[index], self.texts[index])
+
+    def __iter__(self) -> Iterator[Subtitle]:
+        for start, end, text in zip(self.starts, self.ends, self.texts):
+            yield Subtitle(start, end, text)
+
+
+def load_cue_table(subtitle_file: str, encoding: str = "utf-8-sig") -> CueTable:
+    """
+    Loads the cues of a subtitle file into a CueTable. See `iter_subtitles`.
+    """
+    return CueTable(iter_subtitles(subtitle_file, encoding))
+
+
+def load_subtitle_file(subtitle_file: str, encoding: Optional[str] = None) -> List[Subtitle]:
+    """
+    Loads the cues of an SRT, VTT or ASS file into a list.
+
+    Raises:
+        SubtitleError: If the file cannot be loaded or has no cues.
+    """
+    subtitles = list(iter_subtitles(subtitle_file, encoding or "utf-8-sig"))
     print(f"Loaded subtitle file: {len(subtitles)} lines")
     if len(subtitles) == 0:
-        print(f"Error: Subtitle file is empty.")
-        exit(1)
-
+        raise SubtitleError(f"Subtitle file {subtitle_file} is empty.")
     return subtitles
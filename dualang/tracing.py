@@ -0,0 +1,122 @@
+"""
+Lightweight tracing of where a render spends its time.
+
+Code that does expensive work wraps it in `span`, and may attach arguments
+such as byte counts or cache hits to the yielded dict. Spans are only
+recorded while a Tracer is active, and cost next to nothing otherwise. The
+recorded spans can be written in the Chrome trace event format, to be opened
+in chrome://tracing or https://ui.perfetto.dev, and summarized as a table.
+"""
+import contextlib
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterator, List, Optional
+
+
+class Tracer:
+    """Collects spans from any number of threads."""
+
+    def __init__(self):
+        self._events: List[Dict[str, Any]] = []
+        self._threads: Dict[int, str] = {}
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+
+    def record(self, name: str, start: float, end: float, args: Dict[str, Any]) -> None:
+        thread = threading.current_thread()
+        event = {
+            "name": name,
+            "cat": name.split(".")[0],
+            "ph": "X",
+            "ts": round((start - self._start) * 1e6, 1),
+            "dur": round((end - start) * 1e6, 1),
+            "pid": os.getpid(),
+            "tid": thread.ident,
+            "args": args,
+        }
+        with self._lock:
+            self._events.append(event)
+            self._threads.setdefault(thread.ident, thread.name)
+
+    def write(self, trace_file: str) -> None:
+        """Writes the spans as a Chrome trace file."""
+        metadata = [
+            {"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid, "args": {"name": name}}
+            for tid, name in self._threads.items()
+        ]
+        with self._lock:
+            events = metadata + self._events
+        with open(trace_file, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, ensure_ascii=False)
+
+    def summary(self) -> str:
+        """
+        Returns a table with the number of calls, total, mean and maximum
+        duration, bytes processed and cache hits of every kind of span.
+        """
+        stats: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        with self._lock:
+            for event in self._events:
+                entry = stats[event["name"]]
+                entry["calls"] += 1
+                entry["total"] += event["dur"] / 1e6
+                entry["max"] = max(entry["max"], event["dur"] / 1e6)
+                entry["bytes"] += event["args"].get("bytes", 0)
+                if "cache_hit" in event["args"]:
+                    entry["lookups"] += 1
+                    entry["hits"] += bool(event["args"]["cache_hit"])
+                elif "lookups" in event["args"]:
+                    entry["lookups"] += event["args"]["lookups"]
+                    entry["hits"] += event["args"].get("cache_hits", 0)
+
+        width = max([len("Span")] + [len(name) for name in stats])
+        lines = [
+            f"{'Span':<{width}}  {'Calls':>7}  {'Total s':>9}  {'Mean ms':>9}  {'Max ms':>9}  {'MB':>9}  Cache hits"
+        ]
+        for name, entry in sorted(stats.items(), key=lambda item: -item[1]["total"]):
+            hits = f"{int(entry['hits'])}/{int(entry['lookups'])}" if entry["lookups"] else "-"
+            lines.append(
+                f"{name:<{width}}  {int(entry['calls']):>7}  {entry['total']:>9.2f}  "
+                f"{entry['total'] / entry['calls'] * 1000:>9.1f}  {entry['max'] * 1000:>9.1f}  "
+                f"{entry['bytes'] / (1024 * 1024):>9.1f}  {hits}"
+            )
+        return "\n".join(lines)
+
+
+_tracer: Optional[Tracer] = None
+
+
+def start_tracing() -> Tracer:
+    """Starts recording spans in this process and returns the tracer."""
+    global _tracer
+    _tracer = Tracer()
+    return _tracer
+
+
+def stop_tracing() -> None:
+    global _tracer
+    _tracer = None
+
+
+@contextlib.contextmanager
+def span(name: str, **args) -> Iterator[Dict[str, Any]]:
+    """
+    Records the time spent in the block as a span called `name`, with
+    `args` and whatever the block adds to the yielded dict.
+
+    Names are dotted, and their first part is used as the span's category.
+    The summary totals the "bytes" argument, and cache hits from either a
+    "cache_hit" flag or "lookups" and "cache_hits" counts.
+    """
+    tracer = _tracer
+    if tracer is None:
+        yield args
+        return
+    start = time.perf_counter()
+    try:
+        yield args
+    finally:
+        tracer.record(name, start, time.perf_counter(), args)
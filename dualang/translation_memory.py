@@ -0,0 +1,152 @@
+import json
+import os
+import sqlite3
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from dualang.tracing import span
+from dualang.tts_cache import get_cache_dir
+
+TRANSLATION_MEMORY_FILE = "translations.sqlite3"
+
+
+class TranslationMemory:
+    """
+    Persistent store of translations keyed by (source text, target language,
+    translation strategy), backed by SQLite.
+
+    `wrap_batch` turns any batch translate function into one that only calls
+    the backend for texts it has not translated before.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS translations (
+                source TEXT NOT NULL,
+                target_lang TEXT NOT NULL,
+                strategy TEXT NOT NULL,
+                translation TEXT NOT NULL,
+                PRIMARY KEY (source, target_lang, strategy)
+            )
+            """
+        )
+        self._connection.commit()
+
+    def get(self, source: str, target_lang: str, strategy: str) -> Optional[str]:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT translation FROM translations"
+                " WHERE source = ? AND target_lang = ? AND strategy = ?",
+                (source, target_lang, strategy),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return row[0]
+
+    def put(self, source: str, target_lang: str, strategy: str, translation: str) -> None:
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?)",
+                (source, target_lang, strategy, translation),
+            )
+            self._connection.commit()
+
+    def put_many(self, entries: Iterable[Tuple[str, str, str, str]]) -> None:
+        """
+        Stores (source, target_lang, strategy, translation) entries in a single transaction.
+        """
+        with self._lock:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?)", list(entries)
+            )
+            self._connection.commit()
+
+    def wrap_batch(
+        self, translate_batch_func: Callable[[List[str], str], List[str]], strategy: str
+    ) -> Callable[[List[str], str], List[str]]:
+        """
+        Returns a batch translate function that answers from the memory when
+        possible and records every new translation made by
+        `translate_batch_func`. Only the unique texts missing from the memory
+        are passed to `translate_batch_func`, in a single call.
+        """
+
+        def translate_batch(texts: List[str], target_lang: str) -> List[str]:
+            translations: Dict[str, str] = {}
+            missing: List[str] = []
+            unique_texts = dict.fromkeys(texts)
+            with span("translate.memory", lookups=len(unique_texts)) as trace:
+                for text in unique_texts:
+                    translation = self.get(text, target_lang, strategy)
+                    if translation is None:
+                        missing.append(text)
+                    else:
+                        translations[text] = translation
+                trace["cache_hits"] = len(translations)
+
+            if missing:
+                new_translations = translate_batch_func(missing, target_lang=target_lang)
+                self.put_many(
+                    (text, target_lang, strategy, translation)
+                    for text, translation in zip(missing, new_translations)
+                )
+                translations.update(zip(missing, new_translations))
+
+            return [translations[text] for text in texts]
+
+        return translate_batch
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+
+    def export_json(self, output_file: str) -> int:
+        """
+        Writes all entries to a JSON file and returns the number of entries written.
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT source, target_lang, strategy, translation FROM translations"
+                " ORDER BY strategy, target_lang, source"
+            ).fetchall()
+        entries = [
+            {"source": source, "target_lang": target_lang, "strategy": strategy, "translation": translation}
+            for source, target_lang, strategy, translation in rows
+        ]
+        with open(output_file, "w", encoding="utf-8") as f:
+            json.dump(entries, f, ensure_ascii=False, indent=2)
+        return len(entries)
+
+    def import_json(self, input_file: str) -> int:
+        """
+        Adds the entries of a JSON file written by `export_json` and returns
+        the number of entries read. Existing entries with the same key are replaced.
+        """
+        with open(input_file, encoding="utf-8") as f:
+            entries = json.load(f)
+        self.put_many((e["source"], e["target_lang"], e["strategy"], e["translation"]) for e in entries)
+        return len(entries)
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+def build_translation_memory(args) -> Optional[TranslationMemory]:
+    """
+    Builds the translation memory configured by the --cache-dir and
+    --no-translation-memory command line options.
+    """
+    if getattr(args, "no_translation_memory", False):
+        return None
+    return TranslationMemory(os.path.join(get_cache_dir(args.cache_dir), TRANSLATION_MEMORY_FILE))
@@ -1,7 +1,13 @@
 import os
 from enum import Enum
-from typing import Callable
-import deepl
+from typing import Callable, Iterator, List, Optional
+
+from dualang.tracing import span
+from dualang.translation_memory import TranslationMemory
+
+# Limits of a single DeepL translate request
+DEEPL_MAX_BATCH_SIZE = 50
+DEEPL_MAX_REQUEST_BYTES = 128 * 1024
 
 
 class TranslationStrategy(Enum):
@@ -9,15 +15,68 @@ class TranslationStrategy(Enum):
     FAKE = "fake"
 
 
-def build_translator(strategy: TranslationStrategy) -> Callable[[str, str], str]:
+def build_batch_translator(
+    strategy: TranslationStrategy, memory: Optional[TranslationMemory] = None
+) -> Callable[[List[str], str], List[str]]:
+    """
+    Returns a function that translates a list of texts into the target
+    language and returns the translations in the same order.
+
+    Texts are sent to the backend in the largest batches it accepts. If a
+    translation memory is provided, texts that were translated before with
+    the same strategy and target language are answered from it.
+    """
+    translate_batch_func = _build_backend(strategy)
+    if memory is not None:
+        return memory.wrap_batch(translate_batch_func, strategy.value)
+    return translate_batch_func
+
+
+def chunk_texts(texts: List[str], max_count: int, max_bytes: int) -> Iterator[List[str]]:
+    """
+    Splits texts into consecutive chunks of at most `max_count` texts and
+    `max_bytes` UTF-8 bytes. A single text larger than `max_bytes` gets a
+    chunk of its own.
+    """
+    chunk: List[str] = []
+    chunk_bytes = 0
+    for text in texts:
+        text_bytes = len(text.encode())
+        if chunk and (len(chunk) >= max_count or chunk_bytes + text_bytes > max_bytes):
+            yield chunk
+            chunk = []
+            chunk_bytes = 0
+        chunk.append(text)
+        chunk_bytes += text_bytes
+    if chunk:
+        yield chunk
+
+
+def _build_backend(strategy: TranslationStrategy) -> Callable[[List[str], str], List[str]]:
     if strategy == TranslationStrategy.DEEPL:
+        import deepl
+
         translator = deepl.Translator(os.environ["DEEPL_API_KEY"])
-        return translator.translate_text
+
+        def _deepl_translate_batch_func(texts: List[str], target_lang: str) -> List[str]:
+            translations = []
+            for chunk in chunk_texts(texts, DEEPL_MAX_BATCH_SIZE, DEEPL_MAX_REQUEST_BYTES):
+                with span("translate.deepl", texts=len(chunk), bytes=sum(len(text.encode()) for text in chunk)):
+                    results = translator.translate_text(chunk, target_lang=target_lang)
+                translations.extend(result.text for result in results)
+            return translations
+
+        return _deepl_translate_batch_func
     elif strategy == TranslationStrategy.FAKE:
-        return _fake_translate_func
+        return _fake_translate_batch_func
     else:
         raise ValueError(f"Unsupported translation strategy {strategy}.")
 
 
+def _fake_translate_batch_func(texts: List[str], target_lang: str) -> List[str]:
+    with span("translate.fake", texts=len(texts)):
+        return [_fake_translate_func(text, target_lang) for text in texts]
+
+
 def _fake_translate_func(text: str, target_lang: str) -> str:
     return f"[{target_lang}] Hello world"
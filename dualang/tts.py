@@ -0,0 +1,144 @@
+import contextlib
+import os
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from pydub import AudioSegment  # type: ignore
+
+from dualang.audio_format import AudioFormat
+from dualang.audio_loader import decode_audio
+from dualang.tracing import span
+from dualang.tts_cache import TTSCache
+from dualang.tts_engine import DEFAULT_TTS_ENGINE, TTSEngine, get_tts_engine
+
+
+class RateLimiter:
+    """
+    Spaces out calls to `wait` so that at most `requests_per_second` of them
+    return per second, across all threads. A rate of None disables limiting.
+    """
+
+    def __init__(self, requests_per_second: Optional[float] = None):
+        self.interval = 1.0 / requests_per_second if requests_per_second else 0.0
+        self._lock = threading.Lock()
+        self._next_time = 0.0
+
+    def wait(self) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_time)
+            self._next_time = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+@dataclass
+class SpeechFile:
+    path: str
+    temporary: bool  # True if the file is not in the cache and can be removed once loaded
+    cache: Optional[TTSCache] = None  # Cache the file is pinned in, if any
+
+    def load(self, audio_format: Optional[AudioFormat] = None) -> AudioSegment:
+        """
+        Decodes the speech, straight into `audio_format` if provided, so the
+        clip can be written out without any further conversion.
+        """
+        extension = os.path.splitext(self.path)[1][1:]
+        try:
+            with span("tts.decode") as trace:
+                if audio_format is None:
+                    segment = AudioSegment.from_file(self.path, format=extension)
+                elif extension == "wav":
+                    # pydub reads WAV files itself, which is cheaper than starting ffmpeg
+                    segment = audio_format.convert(AudioSegment.from_file(self.path, format=extension))
+                else:
+                    segment = decode_audio(self.path, audio_format)
+                trace["bytes"] = len(segment.raw_data)
+            return segment
+        finally:
+            self.release()
+
+    def release(self) -> None:
+        """
+        Removes the file if it is temporary, or unpins it from the cache.
+        Called by `load`.
+        """
+        if self.temporary:
+            os.remove(self.path)
+        elif self.cache is not None:
+            self.cache.release(self.path)
+            self.cache = None
+
+
+def synthesize_to_file(
+    text: str,
+    lang: str,
+    cache: Optional[TTSCache] = None,
+    rate_limiter: Optional[RateLimiter] = None,
+    engine: Optional[TTSEngine] = None,
+) -> SpeechFile:
+    """
+    Converts text into speech and returns the file holding it, reusing a
+    previously synthesized clip if possible.
+
+    Args:
+        text (str): Text to speak.
+        lang (str): Language of the text.
+        cache (Optional[TTSCache]): Cache of synthesized clips. If not provided,
+            every call goes to the TTS engine.
+        rate_limiter (Optional[RateLimiter]): Limiter to wait on before each
+            request to a remote TTS engine. Cache hits are not limited.
+        engine (Optional[TTSEngine]): Engine to synthesize with. Defaults to gTTS.
+
+    Returns:
+        SpeechFile: The file with the synthesized speech.
+    """
+    engine = engine or get_tts_engine(DEFAULT_TTS_ENGINE)
+    if cache is not None:
+        with span("tts.cache", engine=engine.name) as trace:
+            cached_file = cache.get(engine.name, lang, text, engine.extension)
+            trace["cache_hit"] = cached_file is not None
+        if cached_file is not None:
+            return SpeechFile(cached_file, temporary=False, cache=cache)
+
+    if rate_limiter is not None and not engine.local:
+        with span("tts.rate_limit"):
+            rate_limiter.wait()
+
+    fd, tts_file = tempfile.mkstemp(suffix=f".{engine.extension}")
+    os.close(fd)
+    with span("tts.request", engine=engine.name, characters=len(text)) as trace:
+        try:
+            engine.save(text, lang, tts_file)
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(tts_file)
+            raise
+        trace["bytes"] = os.path.getsize(tts_file)
+
+    cached_file = cache.put(engine.name, lang, text, tts_file, engine.extension) if cache is not None else None
+    if cached_file is not None:
+        return SpeechFile(cached_file, temporary=False, cache=cache)
+    return SpeechFile(tts_file, temporary=True)
+
+
+def synthesize(
+    text: str,
+    lang: str,
+    cache: Optional[TTSCache] = None,
+    rate_limiter: Optional[RateLimiter] = None,
+    engine: Optional[TTSEngine] = None,
+) -> AudioSegment:
+    """
+    Converts text into speech, reusing a previously synthesized clip if possible.
+    See `synthesize_to_file` for the arguments.
+
+    Returns:
+        AudioSegment: The synthesized speech.
+    """
+    return synthesize_to_file(text, lang, cache, rate_limiter, engine).load()
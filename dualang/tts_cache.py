@@ -0,0 +1,205 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+from typing import Dict, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: clips are only pinned within the process
+    fcntl = None  # type: ignore
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "dualang")
+DEFAULT_TTS_CACHE_SIZE_MB = 2048
+
+# Eviction trims the cache to this share of its maximum size, so that it does
+# not have to run again on the next clip
+LOW_WATER_MARK = 0.9
+
+
+def get_cache_dir(cache_dir: Optional[str] = None) -> str:
+    """
+    Returns the root directory for persistent caches.
+
+    The directory is taken from the `cache_dir` argument, then from the
+    DUALANG_CACHE_DIR environment variable, and defaults to ~/.cache/dualang.
+    """
+    if cache_dir:
+        return cache_dir
+    return os.environ.get("DUALANG_CACHE_DIR", DEFAULT_CACHE_DIR)
+
+
+class TTSCache:
+    """
+    On-disk, content-addressed store of synthesized speech clips.
+
+    Clips are keyed by (engine, language, text) and stored under a two-level
+    directory layout named after the SHA-256 of the key. A clip's mtime is
+    refreshed on every hit. Once the total size exceeds `max_bytes`, the
+    least recently used clips are evicted down to LOW_WATER_MARK of it, and
+    clips larger than the whole cache are not stored.
+
+    The clips returned by `get` and `put` are pinned until `release` is
+    called, so they are not evicted before they are loaded, neither by this
+    cache nor by another process sharing the directory.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_TTS_CACHE_SIZE_MB * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._sizes: Dict[str, int] = self._scan()
+        self._total_bytes = sum(self._sizes.values())
+        # Path -> (descriptor holding a shared lock, number of holders)
+        self._pins: Dict[str, Tuple[int, int]] = {}
+
+    @staticmethod
+    def key(engine: str, lang: str, text: str) -> str:
+        return hashlib.sha256("\0".join([engine, lang, text]).encode()).hexdigest()
+
+    def path_for(self, engine: str, lang: str, text: str, extension: str = "mp3") -> str:
+        key = self.key(engine, lang, text)
+        return os.path.join(self.directory, key[:2], f"{key}.{extension}")
+
+    def get(self, engine: str, lang: str, text: str, extension: str = "mp3") -> Optional[str]:
+        """
+        Returns the path of the cached clip, pinned until `release`, or None
+        if it is not cached.
+        """
+        path = self.path_for(engine, lang, text, extension)
+        with self._lock:
+            if not self._pin(path):
+                self.misses += 1
+                return None
+            self.hits += 1
+        os.utime(path)
+        return path
+
+    def put(self, engine: str, lang: str, text: str, source_file: str, extension: str = "mp3") -> Optional[str]:
+        """
+        Moves `source_file` into the cache and returns its new path, pinned
+        until `release`. Returns None and leaves `source_file` where it is if
+        the clip is larger than the cache.
+        """
+        size = os.path.getsize(source_file)
+        if size > self.max_bytes:
+            return None
+
+        path = self.path_for(engine, lang, text, extension)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Move via a temporary name in the target directory so that concurrent
+        # readers never see a partially written clip.
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        os.close(fd)
+        shutil.move(source_file, temp_path)
+
+        with self._lock:
+            # Pinned before it can be seen, so that no other process evicts it
+            self._pin(temp_path)
+            os.replace(temp_path, path)
+            self._pins[path] = self._pins.pop(temp_path)
+            self._total_bytes += size - self._sizes.get(path, 0)
+            self._sizes[path] = size
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+        return path
+
+    def release(self, path: str) -> None:
+        """Unpins a clip returned by `get` or `put` once it is loaded."""
+        with self._lock:
+            fd, holders = self._pins.pop(path)
+            if holders > 1:
+                self._pins[path] = (fd, holders - 1)
+            else:
+                os.close(fd)
+
+    def _pin(self, path: str) -> bool:
+        """Pins `path` and returns True, or returns False if it does not exist."""
+        if path in self._pins:
+            fd, holders = self._pins[path]
+            self._pins[path] = (fd, holders + 1)
+            return True
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except FileNotFoundError:
+            return False
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_SH)
+            # Another process may have evicted it before the lock was taken
+            if os.fstat(fd).st_nlink == 0:
+                os.close(fd)
+                return False
+        self._pins[path] = (fd, 1)
+        return True
+
+    @staticmethod
+    def _remove_unless_pinned(path: str) -> bool:
+        """Removes `path` unless another process pinned it."""
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except FileNotFoundError:
+            return True
+        try:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    return False
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            return True
+        finally:
+            os.close(fd)
+
+    def _evict(self) -> None:
+        # Other processes may share the directory, so start from what is on disk.
+        self._sizes = self._scan()
+        self._total_bytes = sum(self._sizes.values())
+        if self._total_bytes <= self.max_bytes:
+            return
+
+        target = int(self.max_bytes * LOW_WATER_MARK)
+        mtimes = {path: self._mtime(path) for path in self._sizes}
+        for path in sorted(mtimes, key=mtimes.__getitem__):
+            if self._total_bytes <= target:
+                break
+            if path in self._pins or not self._remove_unless_pinned(path):
+                continue
+            self._total_bytes -= self._sizes.pop(path)
+
+    def _scan(self) -> Dict[str, int]:
+        sizes = {}
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".tmp"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    sizes[path] = os.path.getsize(path)
+                except FileNotFoundError:
+                    pass
+        return sizes
+
+    @staticmethod
+    def _mtime(path: str) -> float:
+        try:
+            return os.path.getmtime(path)
+        except FileNotFoundError:
+            return 0.0
+
+
+def build_tts_cache(args) -> Optional[TTSCache]:
+    """
+    Builds the TTS cache configured by the --cache-dir, --tts-cache-size and
+    --no-tts-cache command line options.
+    """
+    if args.no_tts_cache:
+        return None
+    directory = os.path.join(get_cache_dir(args.cache_dir), "tts")
+    return TTSCache(directory, max_bytes=args.tts_cache_size * 1024 * 1024)
@@ -0,0 +1,92 @@
+"""
+Text-to-speech backends.
+
+An engine writes the speech for a text to a file. Engines are registered by
+name in TTS_ENGINES and selected with the --tts-engine command line option.
+"""
+import array
+import hashlib
+import math
+import sys
+import wave
+from abc import ABC, abstractmethod
+from typing import Dict
+
+from dualang.audio_format import AudioFormat
+
+
+class TTSEngine(ABC):
+    name: str
+    extension: str  # extension of the files written by `save`
+    audio_format: AudioFormat  # format of the decoded speech
+    local: bool  # True if the engine does not call a remote service
+
+    @abstractmethod
+    def save(self, text: str, lang: str, path: str) -> None:
+        """Writes the speech for `text` in `lang` to `path`."""
+
+
+class GTTSEngine(TTSEngine):
+    """Google Translate's text-to-speech service."""
+
+    name = "gtts"
+    extension = "mp3"
+    # gTTS returns 24 kHz mono MP3
+    audio_format = AudioFormat(frame_rate=24000, channels=1, sample_width=2)
+    local = False
+
+    def save(self, text: str, lang: str, path: str) -> None:
+        from gtts import gTTS  # type: ignore
+
+        gTTS(text=text, lang=lang).save(path)
+
+
+class ToneEngine(TTSEngine):
+    """
+    Offline engine that speaks every text as a sine tone.
+
+    The pitch is derived from the language and text, and the duration grows
+    with the length of the text, roughly like speech. The output only depends
+    on its input, so renders are reproducible and can be profiled without
+    the network.
+    """
+
+    name = "tone"
+    extension = "wav"
+    audio_format = AudioFormat(frame_rate=24000, channels=1, sample_width=2)
+    local = True
+
+    BASE_MS = 200
+    MS_PER_CHARACTER = 80
+    AMPLITUDE = 0.3
+
+    def save(self, text: str, lang: str, path: str) -> None:
+        frame_rate = self.audio_format.frame_rate
+        digest = hashlib.sha256(f"{lang}\0{text}".encode()).digest()
+        # A whole number of samples per period, so one period can be repeated
+        period = 30 + int.from_bytes(digest[:4], "big") % 91  # 200 to 800 Hz
+        cycle = array.array(
+            "h",
+            (round(self.AMPLITUDE * 32767 * math.sin(2 * math.pi * i / period)) for i in range(period)),
+        )
+        if sys.byteorder == "big":
+            cycle.byteswap()
+
+        frames = frame_rate * (self.BASE_MS + self.MS_PER_CHARACTER * len(text.strip())) // 1000
+        data = cycle.tobytes() * (frames // period) + cycle.tobytes()[: frames % period * 2]
+        with wave.open(path, "wb") as f:
+            f.setnchannels(self.audio_format.channels)
+            f.setsampwidth(self.audio_format.sample_width)
+            f.setframerate(frame_rate)
+            f.writeframes(data)
+
+
+TTS_ENGINES: Dict[str, TTSEngine] = {engine.name: engine for engine in [GTTSEngine(), ToneEngine()]}
+DEFAULT_TTS_ENGINE = GTTSEngine.name
+
+
+def get_tts_engine(name: str) -> TTSEngine:
+    try:
+        return TTS_ENGINES[name]
+    except KeyError:
+        raise ValueError(f"Unknown TTS engine {name}. Options are {', '.join(TTS_ENGINES)}.")
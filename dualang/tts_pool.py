@@ -0,0 +1,65 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Deque, Iterable, Iterator, Optional, Tuple
+
+from pydub import AudioSegment  # type: ignore
+
+from dualang.tts import RateLimiter, SpeechFile, synthesize, synthesize_to_file
+from dualang.tts_cache import TTSCache, build_tts_cache
+from dualang.tts_engine import DEFAULT_TTS_ENGINE, TTSEngine, get_tts_engine
+
+
+class TTSPool:
+    """
+    Synthesizes speech on a bounded number of worker threads.
+
+    `imap` yields the clips in the order of the requests, so the rendered
+    output is identical to synthesizing them one after another. At most
+    `2 * workers` requests are in flight at a time.
+    """
+
+    def __init__(
+        self,
+        workers: int = 1,
+        requests_per_second: Optional[float] = None,
+        cache: Optional[TTSCache] = None,
+        engine: Optional[TTSEngine] = None,
+    ):
+        if workers < 1:
+            raise ValueError(f"Number of TTS workers must be at least 1, got {workers}.")
+        self.workers = workers
+        self.cache = cache
+        self.engine = engine or get_tts_engine(DEFAULT_TTS_ENGINE)
+        self.rate_limiter = RateLimiter(requests_per_second)
+
+    def synthesize(self, text: str, lang: str) -> AudioSegment:
+        return synthesize(text, lang, self.cache, self.rate_limiter, self.engine)
+
+    def synthesize_to_file(self, text: str, lang: str) -> SpeechFile:
+        return synthesize_to_file(text, lang, self.cache, self.rate_limiter, self.engine)
+
+    def imap(self, requests: Iterable[Tuple[str, str]]) -> Iterator[AudioSegment]:
+        """
+        Synthesizes (text, lang) requests concurrently and yields the clips in order.
+        """
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            pending: Deque = deque()
+            for text, lang in requests:
+                if len(pending) >= 2 * self.workers:
+                    yield pending.popleft().result()
+                pending.append(executor.submit(self.synthesize, text, lang))
+            while pending:
+                yield pending.popleft().result()
+
+
+def build_tts_pool(args) -> TTSPool:
+    """
+    Builds the TTS pool configured by the --tts-engine, --tts-workers and
+    --tts-rps command line options, backed by the cache from `build_tts_cache`.
+    """
+    return TTSPool(
+        workers=args.tts_workers,
+        requests_per_second=args.tts_rps,
+        cache=build_tts_cache(args),
+        engine=get_tts_engine(args.tts_engine),
+    )
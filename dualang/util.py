@@ -1,5 +1,10 @@
+import sys
+
 import xattr
 
 
 def add_label_to_file(file_path: str, label: str):
+    # Finder tags only exist on macOS, and other platforms reject the attribute name
+    if sys.platform != "darwin":
+        return
     xattr.setxattr(file_path, "com.apple.metadata:_kMDItemUserTags", label.encode())
@@ -1,9 +1,9 @@
 import argparse
-from dualang.command.fromtext import fromtext_main
-from dualang.command.fromaudio import fromaudio_main
-from dualang.command.plaintext import plaintext_main
-from dualang.command.condense_audio import condense_audio_main
-from dualang.command.create_epub import create_epub_main
+from dualang.args_helper import LazyCommand, positive_int
+from dualang.audio_format import DEFAULT_OUTPUT_FORMAT, OUTPUT_FORMATS
+from dualang.merge_cues import DEFAULT_MAX_DURATION, DEFAULT_MAX_GAP
+from dualang.tts_cache import DEFAULT_TTS_CACHE_SIZE_MB
+from dualang.tts_engine import DEFAULT_TTS_ENGINE, TTS_ENGINES
 
 
 def main():
@@ -13,7 +13,7 @@ def main():
 
     # Create a parser for the "fromtext" command
     parser_fromtext = subparsers.add_parser("fromtext")
-    parser_fromtext.set_defaults(func=fromtext_main)
+    parser_fromtext.set_defaults(func=LazyCommand("dualang.command.fromtext", "fromtext_main"))
     _add_fromtext_arguments(parser_fromtext)
 
     # Create a parser for the "fromaudio" command
@@ -32,6 +32,10 @@ def main():
     parser_create_epub = subparsers.add_parser("create-epub")
     _add_create_epub_arguments(parser_create_epub)
 
+    # Create a parser for the "translation-memory" command
+    parser_translation_memory = subparsers.add_parser("translation-memory")
+    _add_translation_memory_arguments(parser_translation_memory)
+
     # Parse the arguments
     args = parser.parse_args()
 
@@ -54,14 +58,18 @@ def _add_condense_audio_arguments(parser_condense_audio):
     parser_condense_audio.add_argument(
         "--padding",
         type=int,
-        help="Padding in milliseconds between audio segments. If not provided, it will default to 0.",
+        help="Padding in milliseconds kept before and after each subtitle. Overlapping padded subtitles are merged. If not provided, it will default to 0.",
     )
     parser_condense_audio.add_argument(
         "--subtitle",
         required=True,
         help="Subtitle file to process. Supports .srt, .ass and .vtt formats.",
     )
-    parser_condense_audio.set_defaults(func=condense_audio_main)  # Placeholder function
+    _add_audio_track_argument(parser_condense_audio)
+    parser_condense_audio.add_argument(
+        "-v", "--verbose", action="store_true", help="Enable verbose output."
+    )
+    parser_condense_audio.set_defaults(func=LazyCommand("dualang.command.condense_audio", "condense_audio_main"))
 
 def _add_plaintext_arguments(parser_plaintext):
     parser_plaintext.add_argument(
@@ -81,7 +89,30 @@ def _add_plaintext_arguments(parser_plaintext):
     parser_plaintext.add_argument(
         "-v", "--verbose", action="store_true", help="Enable verbose output."
     )
-    parser_plaintext.set_defaults(func=plaintext_main)
+    parser_plaintext.add_argument(
+        "-y",
+        "--yes",
+        action="store_true",
+        help="Do not list the sentences and ask for confirmation. Rendering then starts while the input file is still being read.",
+    )
+    parser_plaintext.add_argument(
+        "--chunk-sentences",
+        type=int,
+        help="Write the output in chunks of this many sentences, to files numbered after the output file, with an .m3u8 playlist that lists each chunk as soon as it is finished.",
+    )
+    parser_plaintext.add_argument(
+        "--chunk-minutes",
+        type=float,
+        help="Write the output in chunks of about this many minutes, cut between sentences. Can be combined with --chunk-sentences.",
+    )
+    _add_tts_arguments(parser_plaintext)
+    _add_output_arguments(parser_plaintext)
+    parser_plaintext.add_argument(
+        "--no-translation-memory",
+        action="store_true",
+        help="Disable the translation memory and translate every sentence again.",
+    )
+    parser_plaintext.set_defaults(func=LazyCommand("dualang.command.plaintext", "plaintext_main"))
 
 
 def _add_fromtext_arguments(parser_fromtext):
@@ -131,12 +162,27 @@ def _add_fromtext_arguments(parser_fromtext):
     parser_fromtext.add_argument(
         "-v", "--verbose", action="store_true", help="Enable verbose output."
     )
-    parser_fromtext.set_defaults(func=fromtext_main)
+    _add_tts_arguments(parser_fromtext)
+    _add_output_arguments(parser_fromtext)
+    parser_fromtext.set_defaults(func=LazyCommand("dualang.command.fromtext", "fromtext_main"))
 
 
 def _add_fromaudio_arguments(parser_fromaudio):
+    input_group = parser_fromaudio.add_mutually_exclusive_group(required=True)
+    input_group.add_argument(
+        "-i", "--input-audio", help="Input audio file to process."
+    )
+    input_group.add_argument(
+        "-d",
+        "--input-dir",
+        help="Directory of episodes to process in batch. Every audio file with a subtitle file of the same name is rendered, and a summary is printed at the end.",
+    )
     parser_fromaudio.add_argument(
-        "-i", "--input-audio", required=True, help="Input audio file to process."
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of episodes to render in parallel processes with --input-dir. Default is 1.",
     )
     parser_fromaudio.add_argument(
         "-s",
@@ -146,7 +192,7 @@ def _add_fromaudio_arguments(parser_fromaudio):
     parser_fromaudio.add_argument(
         "-o",
         "--output-file",
-        help="Output audio file. If not provided, it will be derived from the input audio file.",
+        help="Output audio file, or output directory with --input-dir. If not provided, it will be derived from the input audio file.",
     )
     parser_fromaudio.add_argument(
         "--transition-sound", required=True, help="Transition sound file."
@@ -179,13 +225,126 @@ def _add_fromaudio_arguments(parser_fromaudio):
         default=0,
         help="Start from index-offset subtitles. If not provided, it will start from the beginning.",
     )
+    parser_fromaudio.add_argument(
+        "--merge-cues",
+        action="store_true",
+        help="Merge cues that split a sentence into one unit, which is translated, spoken and repeated as a whole. --offset and --limit then count units.",
+    )
+    parser_fromaudio.add_argument(
+        "--merge-max-gap",
+        type=int,
+        default=DEFAULT_MAX_GAP,
+        help=f"Longest silence between two merged cues, in milliseconds. Default is {DEFAULT_MAX_GAP}.",
+    )
+    parser_fromaudio.add_argument(
+        "--merge-max-duration",
+        type=int,
+        default=DEFAULT_MAX_DURATION,
+        help=f"Longest merged unit, in milliseconds. Default is {DEFAULT_MAX_DURATION}.",
+    )
+    _add_audio_track_argument(parser_fromaudio)
+    parser_fromaudio.add_argument(
+        "--decode-mode",
+        choices=["full", "ranges", "mmap"],
+        default="full",
+        help='How to decode the input audio. "full" decodes the whole file into memory; "ranges" decodes only the audio under the processed subtitles, and repeats only that part of the original at the end, which is much faster for --offset/--limit runs on long files; "mmap" decodes the whole file once to a raw PCM file in the cache directory, reused while the input is unchanged, and memory-maps it. Older decodes of the same file are removed, and the least recently used decodes once they take more than 8 GB. Default is "full".',
+    )
     parser_fromaudio.add_argument(
         "--silent-interval",
         type=int,
         default=100,
         help="Silent interval in milliseconds. If not provided, it will default to 100 milliseconds.",
     )
-    parser_fromaudio.set_defaults(func=fromaudio_main)
+    _add_tts_arguments(parser_fromaudio)
+    _add_output_arguments(parser_fromaudio)
+    parser_fromaudio.add_argument(
+        "--no-translation-memory",
+        action="store_true",
+        help="Disable the translation memory and translate every sentence again.",
+    )
+    parser_fromaudio.add_argument(
+        "--trace",
+        help="Write a Chrome trace of where the render spends its time to this JSON file, and print a summary table. Open it in chrome://tracing or https://ui.perfetto.dev.",
+    )
+    parser_fromaudio.add_argument(
+        "--job-dir",
+        help="Work directory where rendered sentences are checkpointed. If not provided, it will be derived from the input audio file and the settings under the cache directory.",
+    )
+    parser_fromaudio.add_argument(
+        "--no-resume",
+        action="store_true",
+        help="Discard the sentences rendered by earlier runs and render everything again.",
+    )
+    parser_fromaudio.add_argument(
+        "--keep-job-dir",
+        action="store_true",
+        help="Keep the work directory after a run over all subtitles. It is always kept after --offset/--limit runs, so later runs can reuse their sentences. Work directories under the cache directory that were not written for 14 days, or beyond 8 GB in all, are pruned at the start of a run.",
+    )
+    parser_fromaudio.add_argument(
+        "--no-checkpoint",
+        action="store_true",
+        help="Do not checkpoint rendered sentences. Saves writing every sentence to disk, but an interrupted run starts over.",
+    )
+    parser_fromaudio.set_defaults(func=LazyCommand("dualang.command.fromaudio", "fromaudio_main"))
+
+def _add_audio_track_argument(parser):
+    parser.add_argument(
+        "--audio-track",
+        help='Audio track of the input to use, either its position among the audio tracks starting at 0 or a language tag such as "ja" or "jpn". If not provided, the default track is used.',
+    )
+
+def _add_tts_arguments(parser):
+    parser.add_argument(
+        "--tts-engine",
+        choices=list(TTS_ENGINES),
+        default=DEFAULT_TTS_ENGINE,
+        help=f'Text-to-speech engine. "gtts" uses Google Translate\'s TTS service; "tone" speaks every sentence as a sine tone whose length grows with the sentence, offline and deterministically, for testing and profiling. Default is "{DEFAULT_TTS_ENGINE}".',
+    )
+    parser.add_argument(
+        "--cache-dir",
+        help="Directory for persistent caches. If not provided, it will default to $DUALANG_CACHE_DIR or ~/.cache/dualang.",
+    )
+    parser.add_argument(
+        "--tts-cache-size",
+        type=int,
+        default=DEFAULT_TTS_CACHE_SIZE_MB,
+        help=f"Maximum size of the TTS cache in megabytes. Least recently used clips are evicted first. Default is {DEFAULT_TTS_CACHE_SIZE_MB}.",
+    )
+    parser.add_argument(
+        "--no-tts-cache",
+        action="store_true",
+        help="Disable the TTS cache and synthesize every sentence again.",
+    )
+    parser.add_argument(
+        "--tts-workers",
+        type=positive_int,
+        default=1,
+        help="Number of sentences to synthesize concurrently. Default is 1.",
+    )
+    parser.add_argument(
+        "--tts-rps",
+        type=float,
+        help="Maximum number of TTS requests per second. If not provided, requests are not rate limited.",
+    )
+
+def _add_output_arguments(parser):
+    parser.add_argument(
+        "--format",
+        dest="output_format",
+        choices=list(OUTPUT_FORMATS),
+        default=DEFAULT_OUTPUT_FORMAT,
+        help=f'Output format. "opus" gives much smaller files for speech at the same quality; "aac" writes an .m4a file, "m4b" an audiobook and "wav" uncompressed audio. Default is "{DEFAULT_OUTPUT_FORMAT}".',
+    )
+    parser.add_argument(
+        "--bitrate",
+        help='Output bitrate, such as "64k". Defaults to '
+        + ", ".join(
+            f"{output_format.bitrate} for {name}"
+            for name, output_format in OUTPUT_FORMATS.items()
+            if output_format.bitrate is not None
+        )
+        + ".",
+    )
 
 def _add_create_epub_arguments(parser_create_epub):
     parser_create_epub.add_argument(
@@ -197,7 +356,39 @@ def _add_create_epub_arguments(parser_create_epub):
     parser_create_epub.add_argument(
         "--output", required=True, help="Output epub file. If the file extension is not provided, '.epub' will be appended."
     )
-    parser_create_epub.set_defaults(func=create_epub_main)
+    parser_create_epub.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        help="Number of processes parsing SRT files in parallel. Default is the number of CPUs.",
+    )
+    parser_create_epub.add_argument(
+        "--since",
+        action="store_true",
+        help="Only parse the SRT files that changed since they were last added to a book with --since, and take the other chapters from the chapter store in the cache directory. The store keeps the latest chapter of each SRT file, up to 256 MB in all.",
+    )
+    parser_create_epub.add_argument(
+        "--cache-dir",
+        help="Directory for persistent caches. If not provided, it will default to $DUALANG_CACHE_DIR or ~/.cache/dualang.",
+    )
+    parser_create_epub.set_defaults(func=LazyCommand("dualang.command.create_epub", "create_epub_main"))
+
+def _add_translation_memory_arguments(parser_translation_memory):
+    parser_translation_memory.add_argument(
+        "--cache-dir",
+        help="Directory for persistent caches. If not provided, it will default to $DUALANG_CACHE_DIR or ~/.cache/dualang.",
+    )
+    parser_translation_memory.add_argument(
+        "--export",
+        dest="export_file",
+        help="Export all stored translations to this JSON file.",
+    )
+    parser_translation_memory.add_argument(
+        "--import",
+        dest="import_file",
+        help="Import translations from a JSON file written by --export.",
+    )
+    parser_translation_memory.set_defaults(func=LazyCommand("dualang.command.translation_memory", "translation_memory_main"))
 
 if __name__ == "__main__":
     main()
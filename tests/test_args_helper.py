@@ -1 +1,49 @@
-# This is an empty file
+import argparse
+import os
+import tempfile
+import unittest
+
+from dualang.args_helper import find_episodes, get_subtitle_file_name, positive_int
+
+
+class TestArgsHelper(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.directory = self.temp_dir.name
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def touch(self, *names):
+        for name in names:
+            open(os.path.join(self.directory, name), "w").close()
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def test_positive_int(self):
+        self.assertEqual(positive_int("3"), 3)
+        with self.assertRaisesRegex(argparse.ArgumentTypeError, "at least 1, got 0"):
+            positive_int("0")
+        with self.assertRaises(ValueError):
+            positive_int("many")
+
+    def test_get_subtitle_file_name_prefers_plain_name(self):
+        self.touch("ep1.mkv", "ep1.ja.srt", "ep1.vtt")
+        self.assertEqual(get_subtitle_file_name(self.path("ep1.mkv"), None), self.path("ep1.vtt"))
+        self.assertEqual(get_subtitle_file_name(self.path("ep1.mkv"), "other.srt"), "other.srt")
+
+    def test_find_episodes_pairs_audio_with_subtitles(self):
+        self.touch("ep1.mkv", "ep1.srt", "ep2.m4a", "ep2.en.ass", "ep2.ja.ass", "ep3.mp3", "notes.txt")
+        os.mkdir(self.path("extras"))
+        self.assertEqual(
+            find_episodes(self.directory),
+            [
+                (self.path("ep1.mkv"), self.path("ep1.srt")),
+                (self.path("ep2.m4a"), self.path("ep2.ja.ass")),
+            ],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
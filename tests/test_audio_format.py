@@ -0,0 +1,29 @@
+import unittest
+
+from pydub import AudioSegment  # type: ignore
+
+from dualang.audio_format import AudioFormat
+
+
+class TestAudioFormat(unittest.TestCase):
+    def test_negotiate_picks_union(self):
+        audio_format = AudioFormat.negotiate(
+            [AudioFormat(16000, 2, 2), AudioFormat(44100, 1, 2), AudioFormat(24000, 1, 4)]
+        )
+        self.assertEqual(audio_format, AudioFormat(44100, 2, 4))
+
+    def test_silence(self):
+        audio_format = AudioFormat(24000, 2, 2)
+        silence = audio_format.silence(100)
+        self.assertEqual(AudioFormat.of(silence), audio_format)
+        self.assertEqual(len(silence), 100)
+        self.assertEqual(silence.raw_data, AudioSegment.silent(duration=100, frame_rate=24000).set_channels(2).raw_data)
+
+    def test_convert_keeps_segments_in_format(self):
+        audio_format = AudioFormat(24000, 1, 2)
+        segment = audio_format.silence(50)
+        self.assertIs(audio_format.convert(segment), segment)
+
+
+if __name__ == "__main__":
+    unittest.main()
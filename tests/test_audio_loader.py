@@ -1 +1,82 @@
-# This is an empty file
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import ffmpeg  # type: ignore
+from pydub.generators import Sine  # type: ignore
+
+from dualang.audio_format import AudioFormat
+from dualang.audio_loader import load_audio_segment, probe, select_audio_track
+
+TRACKS = [
+    {"codec_name": "aac", "tags": {"language": "eng"}, "disposition": {"default": 0}},
+    {"codec_name": "aac", "tags": {"language": "jpn"}, "disposition": {"default": 1}},
+]
+
+
+class TestSelectAudioTrack(unittest.TestCase):
+    def test_default_track(self):
+        self.assertEqual(select_audio_track(TRACKS), 1)
+        self.assertEqual(select_audio_track([{"codec_name": "mp3"}]), 0)
+
+    def test_index_and_language(self):
+        self.assertEqual(select_audio_track(TRACKS, "0"), 0)
+        self.assertEqual(select_audio_track(TRACKS, "ja"), 1)
+        self.assertEqual(select_audio_track(TRACKS, "ENG"), 0)
+
+    def test_no_match(self):
+        with self.assertRaises(ValueError):
+            select_audio_track(TRACKS, "2")
+        with self.assertRaises(ValueError):
+            select_audio_track(TRACKS, "fr")
+        with self.assertRaises(ValueError):
+            select_audio_track([])
+
+
+@unittest.skipUnless(shutil.which("ffmpeg") and shutil.which("ffprobe"), "ffmpeg is not installed")
+class TestLoadAudioSegment(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        english = os.path.join(self.temp_dir.name, "english.wav")
+        japanese = os.path.join(self.temp_dir.name, "japanese.wav")
+        Sine(440).to_audio_segment(duration=1000).set_frame_rate(16000).export(english, format="wav")
+        Sine(880).to_audio_segment(duration=2000).set_frame_rate(16000).export(japanese, format="wav")
+        self.input_audio = os.path.join(self.temp_dir.name, "input.mkv")
+        (
+            ffmpeg.output(
+                ffmpeg.input(english),
+                ffmpeg.input(japanese),
+                self.input_audio,
+                **{"c:a": "flac", "metadata:s:a:0": "language=eng", "metadata:s:a:1": "language=jpn"},
+            )
+            .run(quiet=True)
+        )
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_loads_selected_track(self):
+        self.assertEqual(len(load_audio_segment(self.input_audio)), 1000)
+        self.assertEqual(len(load_audio_segment(self.input_audio, audio_track="jpn")), 2000)
+        self.assertEqual(len(load_audio_segment(self.input_audio, audio_track="1")), 2000)
+
+    def test_decodes_to_requested_format(self):
+        audio_format = AudioFormat(frame_rate=44100, channels=2, sample_width=2)
+        segment = load_audio_segment(self.input_audio, audio_track="jpn", audio_format=audio_format)
+        self.assertEqual(AudioFormat.of(segment), audio_format)
+        self.assertAlmostEqual(len(segment), 2000, delta=5)
+
+    def test_probe_is_cached_on_disk(self):
+        cache_dir = os.path.join(self.temp_dir.name, "probe")
+        info = probe(self.input_audio, cache_dir)
+        self.assertEqual(len(os.listdir(cache_dir)), 1)
+
+        with mock.patch("dualang.audio_loader._probes", {}), mock.patch("ffmpeg.probe") as ffprobe:
+            self.assertEqual(probe(self.input_audio, cache_dir), info)
+            ffprobe.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
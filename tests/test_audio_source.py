@@ -0,0 +1,123 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from pydub import AudioSegment  # type: ignore
+from pydub.generators import Sine  # type: ignore
+
+from dualang.audio_source import AudioSource, MmapAudioSource, RangeAudioSource, SegmentAudioSource
+
+
+class TestSegmentAudioSource(unittest.TestCase):
+    def test_iter_chunks_covers_range(self):
+        segment = AudioSegment.silent(duration=150 * 1000, frame_rate=8000)
+        source = SegmentAudioSource(segment)
+        chunks = list(source.iter_chunks(1000, 130 * 1000))
+        self.assertEqual([len(chunk) for chunk in chunks], [60000, 60000, 9000])
+        self.assertEqual(b"".join(c.raw_data for c in chunks), segment[1000 : 130 * 1000].raw_data)
+
+    def test_sources_must_implement_every_method(self):
+        class SliceOnly(AudioSource):
+            def slice(self, start, end):
+                return AudioSegment.silent(end - start)
+
+        with self.assertRaises(TypeError):
+            SliceOnly()
+
+
+@unittest.skipUnless(shutil.which("ffmpeg") and shutil.which("ffprobe"), "ffmpeg is not installed")
+class TestRangeAudioSource(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.input_audio = os.path.join(self.temp_dir.name, "input.wav")
+        self.segment = Sine(440).to_audio_segment(duration=5000).set_frame_rate(16000)
+        self.segment.export(self.input_audio, format="wav")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_slice_matches_full_decode(self):
+        source = RangeAudioSource(self.input_audio)
+        self.assertEqual(source.audio_format.frame_rate, 16000)
+        self.assertEqual(source.slice(1200, 2700).raw_data, self.segment[1200:2700].raw_data)
+        self.assertEqual(len(source.slice(3000, 3000)), 0)
+
+    def test_iter_chunks(self):
+        source = RangeAudioSource(self.input_audio)
+        data = b"".join(chunk.raw_data for chunk in source.iter_chunks(500, 4500))
+        self.assertEqual(data, self.segment[500:4500].raw_data)
+
+
+@unittest.skipUnless(shutil.which("ffmpeg") and shutil.which("ffprobe"), "ffmpeg is not installed")
+class TestMmapAudioSource(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.scratch_dir = os.path.join(self.temp_dir.name, "pcm")
+        self.input_audio = os.path.join(self.temp_dir.name, "input.wav")
+        self.segment = Sine(440).to_audio_segment(duration=3000).set_frame_rate(16000)
+        self.segment.export(self.input_audio, format="wav")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_slices_are_views_over_decoded_file(self):
+        source = MmapAudioSource(self.input_audio, self.scratch_dir)
+        audio_slice = source.slice(1200, 2700)
+        self.assertIsInstance(audio_slice.raw_data, memoryview)
+        self.assertEqual(bytes(audio_slice.raw_data), self.segment[1200:2700].raw_data)
+        self.assertEqual(len(source.slice(2900, 5000)), 100)
+
+        data = b"".join(bytes(chunk.raw_data) for chunk in source.iter_chunks())
+        self.assertEqual(data, self.segment.raw_data)
+
+    def test_reuses_decoded_file_until_input_changes(self):
+        first = MmapAudioSource(self.input_audio, self.scratch_dir)
+        self.assertEqual(MmapAudioSource(self.input_audio, self.scratch_dir).pcm_file, first.pcm_file)
+
+        self.segment[:1000].export(self.input_audio, format="wav")
+        changed = MmapAudioSource(self.input_audio, self.scratch_dir)
+        self.assertNotEqual(changed.pcm_file, first.pcm_file)
+        self.assertEqual(len(changed.slice(0, 5000)), 1000)
+        # The decode of the old version of the file is removed
+        self.assertEqual(os.listdir(self.scratch_dir), [os.path.basename(changed.pcm_file)])
+
+    def test_evicts_least_recently_used_decodes(self):
+        inputs = []
+        for i in range(3):
+            inputs.append(os.path.join(self.temp_dir.name, f"input{i}.wav"))
+            self.segment.export(inputs[-1], format="wav")
+        # Each decode is 3 s of 16 kHz 16-bit mono
+        size = 3 * 16000 * 2
+        first = MmapAudioSource(inputs[0], self.scratch_dir, max_bytes=2 * size)
+        os.utime(first.pcm_file, (time.time() - 100, time.time() - 100))
+        second = MmapAudioSource(inputs[1], self.scratch_dir, max_bytes=2 * size)
+        os.utime(second.pcm_file, (time.time() - 200, time.time() - 200))
+        # Reusing the first decode makes the second one the least recently used
+        MmapAudioSource(inputs[0], self.scratch_dir, max_bytes=2 * size)
+
+        third = MmapAudioSource(inputs[2], self.scratch_dir, max_bytes=2 * size)
+        self.assertEqual(
+            sorted(os.listdir(self.scratch_dir)),
+            sorted(os.path.basename(source.pcm_file) for source in [first, third]),
+        )
+
+    def test_removes_partial_decode_on_failure(self):
+        def fail(**kwargs):
+            # ffmpeg dies half way through writing the output
+            temp_file = mock_ffmpeg.input.return_value.output.call_args.args[0]
+            with open(temp_file, "wb") as f:
+                f.write(b"\0" * 100)
+            raise RuntimeError("ffmpeg failed")
+
+        with mock.patch("dualang.audio_source.ffmpeg") as mock_ffmpeg:
+            mock_ffmpeg.input.return_value.output.return_value.overwrite_output.return_value.run.side_effect = fail
+            with self.assertRaisesRegex(RuntimeError, "ffmpeg failed"):
+                MmapAudioSource(self.input_audio, self.scratch_dir)
+        self.assertEqual(os.listdir(self.scratch_dir), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from pydub import AudioSegment  # type: ignore
+from pydub.generators import Sine  # type: ignore
+
+from dualang.audio_format import AudioFormat, EncodingSettings, OUTPUT_FORMATS
+from dualang.audio_writer import StreamingAudioWriter
+
+
+@unittest.skipUnless(shutil.which("ffmpeg"), "ffmpeg is not installed")
+class TestStreamingAudioWriter(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.output_file = os.path.join(self.temp_dir.name, "out.wav")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_writes_segments_in_target_format(self):
+        tone = Sine(440).to_audio_segment(duration=300).set_frame_rate(24000)
+        stereo = Sine(880).to_audio_segment(duration=200).set_frame_rate(44100).set_channels(2)
+        audio_format = AudioFormat(frame_rate=44100, channels=2, sample_width=2)
+
+        with StreamingAudioWriter(self.output_file, audio_format, EncodingSettings("wav")) as writer:
+            writer.extend([tone, stereo, tone])
+            self.assertAlmostEqual(len(writer), 800, delta=1)
+
+        expected = b"".join(audio_format.convert(s).raw_data for s in [tone, stereo, tone])
+        result = AudioSegment.from_wav(self.output_file)
+        self.assertEqual(AudioFormat.of(result), audio_format)
+        self.assertEqual(result.raw_data, expected)
+
+    def test_removes_partial_output_on_error(self):
+        audio_format = AudioFormat(frame_rate=8000, channels=1, sample_width=2)
+        with self.assertRaises(ValueError):
+            with StreamingAudioWriter(self.output_file, audio_format, EncodingSettings("wav")) as writer:
+                writer.append(AudioSegment.silent(duration=100, frame_rate=8000))
+                raise ValueError("render failed")
+        self.assertFalse(os.path.exists(self.output_file))
+
+    def test_encodes_every_output_format(self):
+        audio_format = AudioFormat(frame_rate=44100, channels=1, sample_width=2)
+        tone = Sine(440).to_audio_segment(duration=1500, volume=-12).set_frame_rate(44100)
+        for output_format in OUTPUT_FORMATS.values():
+            output_file = os.path.join(self.temp_dir.name, "out" + output_format.extension)
+            with StreamingAudioWriter(output_file, audio_format, EncodingSettings(output_format.name)) as writer:
+                for start in range(0, len(tone), 370):
+                    writer.append(tone[start : start + 370])
+            # Within the encoder delay and padding of the lossy codecs
+            self.assertAlmostEqual(len(AudioSegment.from_file(output_file)), len(tone), delta=60)
+
+
+class TestAudioFormat(unittest.TestCase):
+    def test_union(self):
+        a = AudioFormat(frame_rate=24000, channels=1, sample_width=2)
+        b = AudioFormat(frame_rate=16000, channels=2, sample_width=2)
+        self.assertEqual(a.union(b), AudioFormat(frame_rate=24000, channels=2, sample_width=2))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from pydub import AudioSegment  # type: ignore
+from pydub.generators import Sine  # type: ignore
+
+from dualang.command.condense_audio import condense_audio
+from dualang.subtitle_loader import Subtitle
+
+
+@unittest.skipUnless(shutil.which("ffmpeg") and shutil.which("ffprobe"), "ffmpeg is not installed")
+class TestCondenseAudio(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.input_file = os.path.join(self.temp_dir.name, "input.wav")
+        self.output_file = os.path.join(self.temp_dir.name, "output.wav")
+        Sine(440).to_audio_segment(duration=10000).set_frame_rate(16000).export(self.input_file, format="wav")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_keeps_padded_and_merged_cues(self):
+        subtitles = [
+            Subtitle(1000, 2000, "a"),
+            Subtitle(2100, 3000, "b"),
+            Subtitle(6000, 7000, "c"),
+        ]
+        duration = condense_audio(self.input_file, subtitles, self.output_file, padding=100)
+        self.assertEqual(duration, 2200 + 1200)
+
+        output = AudioSegment.from_wav(self.output_file)
+        self.assertAlmostEqual(len(output), duration, delta=20)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+import os
+import tempfile
+import unittest
+import zipfile
+from xml.etree import ElementTree
+
+from dualang.command.create_epub import ChapterStore, create_epub, read_srt_files
+from dualang.subtitle_loader import SubtitleError
+
+OPF = "{http://www.idpf.org/2007/opf}"
+XHTML = "{http://www.w3.org/1999/xhtml}"
+NCX = "{http://www.daisy.org/z3986/2005/ncx/}"
+EPUB_TYPE = "{http://www.idpf.org/2007/ops}type"
+SRT = "1\n00:00:01,000 --> 00:00:02,000\n<i>Tom & Jerry</i>\n\n2\n00:00:03,000 --> 00:00:04,000\n今日は<br>晴れ\n"
+
+
+class TestCreateEpub(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.input_dir = os.path.join(self.temp_dir.name, "input")
+        self.store_dir = os.path.join(self.temp_dir.name, "store")
+        os.makedirs(self.input_dir)
+        for name in ["show_ep02-ja.srt", "show_ep01-ja.srt", "notes.txt"]:
+            with open(os.path.join(self.input_dir, name), "w", encoding="utf-8") as f:
+                f.write(SRT.replace("Tom", name[:7]))
+        self.subtitles = read_srt_files(self.input_dir)
+        self.output = os.path.join(self.temp_dir.name, "book.epub")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def read_chapters(self):
+        with zipfile.ZipFile(self.output) as book:
+            self.assertEqual(book.namelist()[0], "mimetype")
+            self.assertEqual(book.read("mimetype"), b"application/epub+zip")
+            for name in ["EPUB/content.opf", "EPUB/nav.xhtml", "EPUB/toc.ncx"]:
+                ElementTree.fromstring(book.read(name))
+            return [book.read(f"EPUB/chap_{i}.xhtml").decode() for i in range(len(self.subtitles))]
+
+    def test_writes_a_chapter_per_srt_file(self):
+        create_epub(self.subtitles, self.output, "Show & Tell")
+        chapters = self.read_chapters()
+        self.assertEqual(len(chapters), 2)
+        root = ElementTree.fromstring(chapters[0])
+        texts = [element.text for element in root.iter() if element.tag.endswith(("h1", "p"))]
+        self.assertEqual(texts, ["show ep01", "show_ep & Jerry", "今日は晴れ"])
+        self.assertIn("show ep02", chapters[1])
+        self.assertFalse(os.path.exists(self.output + ".tmp"))
+
+    def test_package_lists_the_chapters(self):
+        create_epub(self.subtitles, self.output, "Show")
+        with zipfile.ZipFile(self.output) as book:
+            mimetype = book.infolist()[0]
+            self.assertEqual((mimetype.filename, mimetype.compress_type), ("mimetype", zipfile.ZIP_STORED))
+            self.assertEqual(mimetype.extra, b"")
+            container = ElementTree.fromstring(book.read("META-INF/container.xml"))
+            rootfile = next(element for element in container.iter() if element.tag.endswith("rootfile"))
+            self.assertEqual(rootfile.get("full-path"), "EPUB/content.opf")
+            package = ElementTree.fromstring(book.read("EPUB/content.opf"))
+            items = {item.get("id"): item.get("href") for item in package.iter(f"{OPF}item")}
+            for href in items.values():
+                book.getinfo(f"EPUB/{href}")
+            spine = [itemref.get("idref") for itemref in package.iter(f"{OPF}itemref")]
+            self.assertEqual(spine, ["nav", "chapter_0", "chapter_1"])
+            self.assertEqual([items[idref] for idref in spine[1:]], ["chap_0.xhtml", "chap_1.xhtml"])
+            chapters = [name for name in book.namelist() if name.startswith("EPUB/chap_")]
+            self.assertEqual(len(chapters), len(spine) - 1)
+            nav_item = next(item for item in package.iter(f"{OPF}item") if item.get("properties") == "nav")
+            self.assertEqual(nav_item.get("href"), "nav.xhtml")
+            self.assertEqual(package.find(f"{OPF}spine").get("toc"), "ncx")
+
+            # The table of contents links every chapter in spine order, with its title
+            nav = ElementTree.fromstring(book.read("EPUB/nav.xhtml"))
+            toc = next(element for element in nav.iter(f"{XHTML}nav") if element.get(EPUB_TYPE) == "toc")
+            links = [(link.get("href"), link.text) for link in toc.iter(f"{XHTML}a")]
+            self.assertEqual(links, [("chap_0.xhtml", "show ep01"), ("chap_1.xhtml", "show ep02")])
+            ncx = ElementTree.fromstring(book.read("EPUB/toc.ncx"))
+            sources = [content.get("src") for content in ncx.iter(f"{NCX}content")]
+            self.assertEqual(sources, ["chap_0.xhtml", "chap_0.xhtml", "chap_1.xhtml"])
+            ids = [point.get("id") for point in ncx.iter(f"{NCX}navPoint")]
+            self.assertEqual(len(ids), len(set(ids)))
+
+    def test_failure_leaves_no_files(self):
+        os.remove(self.subtitles[1])
+        with self.assertRaises(SubtitleError):
+            create_epub(self.subtitles, self.output, "Show")
+        self.assertEqual(sorted(os.listdir(self.temp_dir.name)), ["input"])
+
+    def test_parallel_book_matches(self):
+        create_epub(self.subtitles, self.output, "Show")
+        chapters = self.read_chapters()
+        create_epub(self.subtitles, self.output, "Show", jobs=2, store_dir=self.store_dir)
+        self.assertEqual(self.read_chapters(), chapters)
+
+    def test_store_is_only_used_with_since(self):
+        create_epub(self.subtitles, self.output, "Show", store_dir=self.store_dir)
+        self.assertFalse(os.path.exists(self.store_dir))
+
+    def test_store_keeps_the_latest_chapter_of_each_file(self):
+        store = ChapterStore(self.store_dir, max_bytes=1000)
+        store.put(self.subtitles[0], "first")
+        old = store.path_for(self.subtitles[0])
+        os.utime(self.subtitles[0], (1, 1))
+        store.put(self.subtitles[0], "changed")
+        self.assertFalse(os.path.exists(old))
+        self.assertEqual(store.get(self.subtitles[0]), "changed")
+
+        # Least recently used chapters go first once the store is full
+        store.put(self.subtitles[1], "x" * 998)
+        os.utime(store.path_for(self.subtitles[0]), (1, 1))
+        store.prune()
+        self.assertIsNone(store.get(self.subtitles[0]))
+        self.assertIsNotNone(store.get(self.subtitles[1]))
+
+    def test_since_only_parses_changed_files(self):
+        create_epub(self.subtitles, self.output, "Show", store_dir=self.store_dir, since=True)
+        store = ChapterStore(self.store_dir)
+        for subtitle in self.subtitles:
+            with open(store.path_for(subtitle), "w", encoding="utf-8") as f:
+                f.write("stored")
+        with open(self.subtitles[1], "a", encoding="utf-8") as f:
+            f.write("\n3\n00:00:05,000 --> 00:00:06,000\nNew line\n")
+
+        create_epub(self.subtitles, self.output, "Show", store_dir=self.store_dir, since=True)
+        chapters = self.read_chapters()
+        self.assertEqual(chapters[0], "stored")
+        self.assertIn("<p>New line</p>", chapters[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
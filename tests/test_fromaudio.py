@@ -1 +1,161 @@
-# This is an empty file
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+from pydub import AudioSegment  # type: ignore
+from pydub.generators import Sine  # type: ignore
+
+from dualang.command.fromaudio import create_audio_from_audio, select_subtitles
+from dualang.subtitle_loader import Subtitle
+from dualang.tts_engine import ToneEngine, get_tts_engine
+from dualang.tts_pool import TTSPool
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def fake_translate_batch(texts, target_lang):
+    return [f"{target_lang} {text}" for text in texts]
+
+
+class TestSelectSubtitles(unittest.TestCase):
+    def test_merges_before_offset_and_limit(self):
+        subtitles = [
+            Subtitle(0, 500, "今日は"),
+            Subtitle(600, 1000, "晴れ。"),
+            Subtitle(1100, 1500, "散歩"),
+            Subtitle(1600, 2000, "しよう。"),
+        ]
+        args = SimpleNamespace(merge_cues=True, merge_max_gap=500, merge_max_duration=10000, offset=1, limit=1)
+        self.assertEqual(select_subtitles(args, subtitles), [Subtitle(1100, 2000, "散歩しよう。")])
+
+        args.merge_cues = False
+        self.assertEqual(select_subtitles(args, subtitles), [Subtitle(600, 1000, "晴れ。")])
+
+
+@unittest.skipUnless(shutil.which("ffmpeg") and shutil.which("ffprobe"), "ffmpeg is not installed")
+class TestCreateAudioFromAudio(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.input_audio = os.path.join(self.temp_dir.name, "input.wav")
+        self.transition_sound = os.path.join(self.temp_dir.name, "bell.wav")
+        Sine(440).to_audio_segment(duration=3000).set_frame_rate(16000).export(self.input_audio, format="wav")
+        Sine(880).to_audio_segment(duration=200).set_frame_rate(16000).export(self.transition_sound, format="wav")
+        self.subtitles = [Subtitle(0, 500, "一"), Subtitle(1000, 1500, ""), Subtitle(2000, 2500, "三")]
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def render(self, output_file, **kwargs):
+        return create_audio_from_audio(
+            self.input_audio,
+            self.subtitles,
+            output_file,
+            self.transition_sound,
+            "EN",
+            False,
+            translate_batch_func=fake_translate_batch,
+            tts_pool=TTSPool(engine=get_tts_engine("tone")),
+            **kwargs,
+        )
+
+    def test_renders_cues_then_original(self):
+        output_file = os.path.join(self.temp_dir.name, "output.mp3")
+        self.render(output_file)
+
+        # Empty cues are skipped; each cue is played twice, then its speech,
+        # then twice again, with silences in between, and a transition sound
+        speech = ToneEngine.BASE_MS + ToneEngine.MS_PER_CHARACTER * len("EN 一")
+        expected = 2 * (4 * 500 + 5 * 100 + speech + 200) + 3000
+        self.assertAlmostEqual(len(AudioSegment.from_file(output_file)), expected, delta=100)
+
+    def test_resumed_render_matches(self):
+        job_dir = os.path.join(self.temp_dir.name, "job")
+        first = os.path.join(self.temp_dir.name, "first.mp3")
+        second = os.path.join(self.temp_dir.name, "second.mp3")
+        self.render(first, job_dir=job_dir).close()
+
+        def fail(texts, target_lang):
+            raise AssertionError("Rendered cues should not be translated again")
+
+        create_audio_from_audio(
+            self.input_audio,
+            self.subtitles,
+            second,
+            self.transition_sound,
+            "EN",
+            False,
+            translate_batch_func=fail,
+            tts_pool=TTSPool(engine=get_tts_engine("tone")),
+            job_dir=job_dir,
+        )
+        with open(first, "rb") as f1, open(second, "rb") as f2:
+            self.assertEqual(f1.read(), f2.read())
+
+    def test_repeated_sentences_are_translated_once(self):
+        self.subtitles = [Subtitle(0, 500, "一"), Subtitle(1000, 1500, "二"), Subtitle(2000, 2500, "一")]
+        translated = []
+
+        def translate_batch(texts, target_lang):
+            translated.extend(texts)
+            return fake_translate_batch(texts, target_lang)
+
+        output_file = os.path.join(self.temp_dir.name, "output.mp3")
+        create_audio_from_audio(
+            self.input_audio,
+            self.subtitles,
+            output_file,
+            self.transition_sound,
+            "EN",
+            False,
+            translate_batch_func=translate_batch,
+            tts_pool=TTSPool(engine=get_tts_engine("tone")),
+        )
+        self.assertEqual(translated, ["一", "二"])
+
+        speech = ToneEngine.BASE_MS + ToneEngine.MS_PER_CHARACTER * len("EN 一")
+        expected = 3 * (4 * 500 + 5 * 100 + speech + 200) + 3000
+        self.assertAlmostEqual(len(AudioSegment.from_file(output_file)), expected, delta=100)
+
+
+@unittest.skipUnless(shutil.which("ffmpeg") and shutil.which("ffprobe"), "ffmpeg is not installed")
+class TestFromaudioCommand(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_unknown_audio_track_is_an_error(self):
+        input_audio = os.path.join(self.temp_dir.name, "input.wav")
+        subtitle_file = os.path.join(self.temp_dir.name, "input.srt")
+        Sine(440).to_audio_segment(duration=1000).export(input_audio, format="wav")
+        with open(subtitle_file, "w", encoding="utf-8") as f:
+            f.write("1\n00:00:00,000 --> 00:00:00,500\n一\n")
+
+        result = subprocess.run(
+            [
+                sys.executable, "main.py", "fromaudio",
+                "--input-audio", input_audio,
+                "--transition-sound", input_audio,
+                "--tr-strategy", "fake",
+                "--tts-engine", "tone",
+                "--cache-dir", os.path.join(self.temp_dir.name, "cache"),
+                "--audio-track", "3",
+            ],
+            cwd=ROOT,
+            env={**os.environ, "DEEPL_API_KEY": "unused"},
+            capture_output=True,
+            text=True,
+        )
+        self.assertEqual(result.returncode, 1, result.stderr)
+        self.assertIn(f"Error: {input_audio}: No audio track matches 3", result.stdout)
+        self.assertNotIn("Traceback", result.stderr)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import io
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+from pydub.generators import Sine  # type: ignore
+
+from dualang.command.fromaudio_batch import EpisodeResult, print_report
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestPrintReport(unittest.TestCase):
+    def test_lists_every_episode(self):
+        results = [
+            EpisodeResult("/season/episode01.mkv", 12.34),
+            EpisodeResult("/season/ep02.mkv", 0.5, "SubtitleError: ep02.srt:3: Invalid cue timing"),
+        ]
+        output = io.StringIO()
+        with redirect_stdout(output):
+            print_report(results, 13.0)
+        self.assertEqual(
+            output.getvalue().splitlines(),
+            [
+                "Episode            Time  Result",
+                "episode01.mkv     12.3s  ok",
+                "ep02.mkv           0.5s  failed: SubtitleError: ep02.srt:3: Invalid cue timing",
+                "Rendered 1 of 2 episodes in 13.0s",
+            ],
+        )
+
+
+@unittest.skipUnless(shutil.which("ffmpeg") and shutil.which("ffprobe"), "ffmpeg is not installed")
+class TestFromaudioBatch(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.input_dir = os.path.join(self.temp_dir.name, "season")
+        self.output_dir = os.path.join(self.temp_dir.name, "out")
+        os.makedirs(self.input_dir)
+        os.makedirs(self.output_dir)
+        for name in ["ep1", "ep2", "ep3", "ep4"]:
+            Sine(440).to_audio_segment(duration=1500).export(self.path(f"{name}.wav"), format="wav")
+        self.write("ep1.srt", "1\n00:00:00,000 --> 00:00:00,500\nはい\n\n2\n00:00:00,600 --> 00:00:01,000\n一\n")
+        self.write("ep2.ja.srt", "1\n00:00:00,000 --> 00:00:00,500\nはい\n\n2\n00:00:00,600 --> 00:00:01,000\n二\n")
+        # A broken subtitle file, and ep4.wav has none at all
+        self.write("ep3.srt", "1\n00:00:00 --> soon\n三\n")
+        self.write("notes.txt", "Season notes")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.input_dir, name)
+
+    def write(self, name, content):
+        with open(self.path(name), "w", encoding="utf-8") as f:
+            f.write(content)
+
+    def test_renders_paired_episodes_and_reports_failures(self):
+        result = subprocess.run(
+            [
+                sys.executable, "main.py", "fromaudio",
+                "--input-dir", self.input_dir,
+                "--output-file", self.output_dir,
+                "--transition-sound", self.path("ep4.wav"),
+                "--tr-strategy", "fake",
+                "--tts-engine", "tone",
+                "--cache-dir", os.path.join(self.temp_dir.name, "cache"),
+                "--jobs", "2",
+            ],
+            cwd=ROOT,
+            env={**os.environ, "DEEPL_API_KEY": "unused"},
+            capture_output=True,
+            text=True,
+        )
+        lines = result.stdout.splitlines()
+
+        # ep4.wav has no subtitles and is skipped; the broken ep3 fails on
+        # its own, and the batch exits with an error once the others are done
+        self.assertEqual(result.returncode, 1, result.stderr)
+        self.assertIn(f"Found 3 episodes in {self.input_dir}", lines)
+        self.assertEqual(sorted(os.listdir(self.output_dir)), ["ep1.mp3", "ep2.mp3"])
+        self.assertRegex(result.stdout, r"ep1\.wav +[\d.]+s  ok")
+        self.assertRegex(result.stdout, r"ep2\.wav +[\d.]+s  ok")
+        self.assertRegex(result.stdout, r"ep3\.wav +[\d.]+s  failed: SubtitleError: .*ep3\.srt:2: Invalid cue timing")
+        self.assertIn("Rendered 2 of 3 episodes", result.stdout)
+
+        # Lines are translated once for the season, and the line shared by
+        # ep1 and ep2 is synthesized once before the episodes are rendered
+        self.assertIn("Translated 3 unique lines", lines)
+        self.assertIn("Synthesized 1 lines shared by several episodes", lines)
+
+
+if __name__ == "__main__":
+    unittest.main()
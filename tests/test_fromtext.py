@@ -1 +1,53 @@
-# This is an empty file
+import os
+import shutil
+import tempfile
+import unittest
+
+from pydub import AudioSegment  # type: ignore
+from pydub.generators import Sine  # type: ignore
+
+from dualang.command.fromtext import create_audio
+from dualang.tts_engine import ToneEngine, get_tts_engine
+from dualang.tts_pool import TTSPool
+
+
+def speech_ms(text):
+    return ToneEngine.BASE_MS + ToneEngine.MS_PER_CHARACTER * len(text)
+
+
+@unittest.skipUnless(shutil.which("ffmpeg"), "ffmpeg is not installed")
+class TestCreateAudio(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.transition_sound = os.path.join(self.temp_dir.name, "bell.wav")
+        Sine(880).to_audio_segment(duration=200).set_frame_rate(16000).export(self.transition_sound, format="wav")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_repeats_target_and_translation(self):
+        sentences = [{"ja": "こんにちは", "en": "Hello"}, {"ja": "はい", "en": "Yes"}]
+        output_file = os.path.join(self.temp_dir.name, "output.mp3")
+        create_audio(
+            sentences,
+            self.transition_sound,
+            output_file,
+            "ja",
+            "ja",
+            "en",
+            interval=100,
+            target_repeat=2,
+            translation_repeat=1,
+            verbose=False,
+            tts_pool=TTSPool(engine=get_tts_engine("tone")),
+        )
+
+        # (target, silence) x 2, translation, silence, target, transition
+        expected = sum(
+            3 * speech_ms(sentence["ja"]) + 3 * 100 + speech_ms(sentence["en"]) + 200 for sentence in sentences
+        )
+        self.assertAlmostEqual(len(AudioSegment.from_file(output_file)), expected, delta=100)
+
+
+if __name__ == "__main__":
+    unittest.main()
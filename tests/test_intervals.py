@@ -0,0 +1,28 @@
+import unittest
+
+from dualang.intervals import merge_intervals
+
+
+class TestMergeIntervals(unittest.TestCase):
+    def test_merges_overlapping_and_adjacent_intervals(self):
+        intervals = [(5000, 6000), (1000, 2000), (1500, 2500), (2500, 3000), (8000, 9000)]
+        self.assertEqual(
+            list(merge_intervals(intervals)),
+            [(1000, 3000), (5000, 6000), (8000, 9000)],
+        )
+
+    def test_padding_merges_close_intervals(self):
+        intervals = [(1000, 2000), (2300, 3000), (4000, 5000)]
+        self.assertEqual(
+            list(merge_intervals(intervals, padding=200)),
+            [(800, 3200), (3800, 5200)],
+        )
+
+    def test_clamps_start_and_drops_empty_intervals(self):
+        self.assertEqual(list(merge_intervals([(100, 500), (1000, 1200)], padding=200)), [(0, 700), (800, 1400)])
+        self.assertEqual(list(merge_intervals([(900, 900), (1000, 800)])), [])
+        self.assertEqual(list(merge_intervals([])), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1 +1,66 @@
-# This is an empty file
+import os
+import subprocess
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Dependencies that only the subcommands need
+HEAVY_MODULES = ["deepl", "ebooklib", "ffmpeg", "gtts", "pyass", "pydub", "pysrt", "tqdm", "webvtt", "xattr"]
+
+# Time to import what `main.py --help` needs, on top of the interpreter's own startup
+IMPORT_TIME_BUDGET_MS = 100
+
+
+def import_times(*args):
+    """
+    Runs main.py with `args` under -X importtime, and returns the cumulative
+    import time in microseconds of every top-level import made after startup.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "main.py", *args],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    started = False
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if name.strip() == "site" and not name.startswith("  "):
+            started = True
+            continue
+        if started and not name.startswith("  "):
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+class TestMain(unittest.TestCase):
+    def test_help_does_not_load_subcommand_dependencies(self):
+        times = import_times("--help")
+        self.assertIn("argparse", times)
+        for module in HEAVY_MODULES:
+            self.assertNotIn(module, times)
+
+        total_ms = sum(times.values()) / 1000
+        self.assertLess(total_ms, IMPORT_TIME_BUDGET_MS, f"Imports for --help took {total_ms:.1f} ms: {times}")
+
+    def test_subcommand_help_does_not_load_subcommand_dependencies(self):
+        times = import_times("fromaudio", "--help")
+        for module in HEAVY_MODULES:
+            self.assertNotIn(module, times)
+
+    def test_rejects_no_tts_workers(self):
+        result = subprocess.run(
+            [sys.executable, "main.py", "fromaudio", "--tts-workers", "0"], cwd=ROOT, capture_output=True, text=True
+        )
+        self.assertEqual(result.returncode, 2)
+        self.assertIn("argument --tts-workers: must be at least 1, got 0", result.stderr)
+
+
+
+if __name__ == "__main__":
+    unittest.main()
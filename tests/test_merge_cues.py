@@ -0,0 +1,58 @@
+import unittest
+
+from dualang.merge_cues import ends_sentence, merge_cues
+from dualang.subtitle_loader import Subtitle
+
+
+class TestMergeCues(unittest.TestCase):
+    def test_merges_cues_until_the_sentence_ends(self):
+        subtitles = [
+            Subtitle(1000, 2000, "今日は"),
+            Subtitle(2100, 3000, "いい天気ですね。"),
+            Subtitle(3100, 4000, "I wanted to say"),
+            Subtitle(4200, 5000, "that it is sunny!"),
+            Subtitle(5100, 6000, "「行こう」"),
+            Subtitle(6100, 7000, "うん"),
+        ]
+        self.assertEqual(
+            list(merge_cues(subtitles)),
+            [
+                Subtitle(1000, 3000, "今日はいい天気ですね。"),
+                Subtitle(3100, 5000, "I wanted to say that it is sunny!"),
+                Subtitle(5100, 6000, "「行こう」"),
+                Subtitle(6100, 7000, "うん"),
+            ],
+        )
+
+    def test_gap_and_duration_limits(self):
+        subtitles = [
+            Subtitle(0, 1000, "一"),
+            Subtitle(1600, 2000, "二"),
+            Subtitle(2000, 3000, "三"),
+            Subtitle(3000, 4000, "四"),
+            Subtitle(3500, 4500, "overlapping"),
+        ]
+        self.assertEqual(
+            list(merge_cues(subtitles, max_gap=500, max_duration=2000)),
+            [
+                Subtitle(0, 1000, "一"),
+                Subtitle(1600, 3000, "二三"),
+                Subtitle(3000, 4000, "四"),
+                Subtitle(3500, 4500, "overlapping"),
+            ],
+        )
+
+    def test_keeps_single_cues_and_drops_empty_ones(self):
+        subtitles = [Subtitle(0, 1000, " Line one\nline two "), Subtitle(1000, 1500, "\n")]
+        self.assertEqual(list(merge_cues(subtitles)), [Subtitle(0, 1000, " Line one\nline two ")])
+        self.assertEqual(list(merge_cues([])), [])
+
+    def test_ends_sentence(self):
+        for text in ["はい。", "Really?! ", "「そうか！」", "(laughs)."]:
+            self.assertTrue(ends_sentence(text), text)
+        for text in ["それは", "and then,", "「待って"]:
+            self.assertFalse(ends_sentence(text), text)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import random
+import threading
+import time
+import unittest
+
+from dualang.pipeline import Pipeline, Stage
+
+
+def _jitter(func):
+    def wrapper(item):
+        time.sleep(random.uniform(0, 0.005))
+        return func(item)
+
+    return wrapper
+
+
+class TestPipeline(unittest.TestCase):
+    def test_sink_receives_items_in_order(self):
+        batches = []
+
+        def double(items):
+            batches.append(len(items))
+            return [item * 2 for item in items]
+
+        results = []
+        Pipeline(
+            [
+                Stage("double", double, batch_size=10),
+                Stage("increment", _jitter(lambda item: item + 1), workers=4),
+                Stage("negate", _jitter(lambda item: -item), workers=3),
+            ],
+            queue_size=2,
+        ).run(range(55), results.append)
+
+        self.assertEqual(results, [-(i * 2 + 1) for i in range(55)])
+        self.assertEqual(batches, [10, 10, 10, 10, 10, 5])
+
+    def test_in_flight_items_are_bounded(self):
+        lock = threading.Lock()
+        in_flight = [0, 0]  # current, maximum
+
+        def source():
+            for i in range(200):
+                with lock:
+                    in_flight[0] += 1
+                    in_flight[1] = max(in_flight[1], in_flight[0])
+                yield i
+
+        def slow_sink(item):
+            time.sleep(0.001)
+            with lock:
+                in_flight[0] -= 1
+
+        Pipeline([Stage("identity", lambda item: item, workers=2)], queue_size=2).run(source(), slow_sink)
+        self.assertLess(in_flight[1], 20)
+
+    def test_errors_are_raised(self):
+        def fail(item):
+            if item == 7:
+                raise RuntimeError("boom")
+            return item
+
+        with self.assertRaises(RuntimeError):
+            Pipeline([Stage("fail", fail, workers=2)]).run(range(20), lambda item: None)
+
+
+if __name__ == "__main__":
+    unittest.main()
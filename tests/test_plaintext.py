@@ -0,0 +1,149 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from pydub import AudioSegment  # type: ignore
+from pydub.generators import Sine  # type: ignore
+
+from dualang.audio_format import EncodingSettings
+from dualang.command.plaintext import create_audio, translate_in_batches
+from dualang.tts_engine import ToneEngine, get_tts_engine
+from dualang.tts_pool import TTSPool
+
+
+def speech_ms(text):
+    return ToneEngine.BASE_MS + ToneEngine.MS_PER_CHARACTER * len(text)
+
+
+def fake_translate_batch(texts, target_lang):
+    return [f"{target_lang} {text}" for text in texts]
+
+
+class TestTranslateInBatches(unittest.TestCase):
+    def test_translates_batches_as_sentences_are_read(self):
+        read = []
+        batches = []
+
+        def sentences():
+            for sentence in ["一", "二", "三"]:
+                read.append(sentence)
+                yield sentence
+
+        def translate_batch(texts, target_lang):
+            batches.append(list(texts))
+            return fake_translate_batch(texts, target_lang)
+
+        pairs = translate_in_batches(sentences(), translate_batch, "en", batch_size=2)
+        self.assertEqual(next(pairs), ("一", "en 一"))
+        self.assertEqual(read, ["一", "二"])
+        self.assertEqual(list(pairs), [("二", "en 二"), ("三", "en 三")])
+        self.assertEqual(batches, [["一", "二"], ["三"]])
+
+
+@unittest.skipUnless(shutil.which("ffmpeg"), "ffmpeg is not installed")
+class TestCreateAudio(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.transition_sound = os.path.join(self.temp_dir.name, "bell.wav")
+        Sine(880).to_audio_segment(duration=200).set_frame_rate(16000).export(self.transition_sound, format="wav")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_renders_sentences_from_a_generator(self):
+        sentences = ["こんにちは。", "はい。"]
+        output_file = os.path.join(self.temp_dir.name, "output.mp3")
+        create_audio(
+            iter(sentences),
+            self.transition_sound,
+            output_file,
+            "ja",
+            interval=100,
+            target_repeat=2,
+            translation_repeat=1,
+            translate_batch_func=fake_translate_batch,
+            verbose=False,
+            tts_pool=TTSPool(engine=get_tts_engine("tone")),
+        )
+
+        # (target, silence) x 2, translation, silence, target, transition
+        expected = sum(
+            3 * speech_ms(sentence) + 3 * 100 + speech_ms(f"ja {sentence}") + 200 for sentence in sentences
+        )
+        self.assertAlmostEqual(len(AudioSegment.from_file(output_file)), expected, delta=100)
+
+    def test_writes_chunks_and_playlist(self):
+        sentences = ["一。", "二。", "三。", "四。", "五。"]
+        output_file = os.path.join(self.temp_dir.name, "book.wav")
+        kwargs = dict(
+            interval=100,
+            target_repeat=1,
+            translation_repeat=1,
+            translate_batch_func=fake_translate_batch,
+            verbose=False,
+            tts_pool=TTSPool(engine=get_tts_engine("tone")),
+            encoding=EncodingSettings("wav"),
+        )
+        files = create_audio(iter(sentences), self.transition_sound, output_file, "ja", chunk_sentences=2, **kwargs)
+
+        self.assertEqual([os.path.basename(file) for file in files], ["book_001.wav", "book_002.wav", "book_003.wav"])
+        self.assertFalse(os.path.exists(output_file))
+        with open(os.path.join(self.temp_dir.name, "book.m3u8"), encoding="utf-8") as f:
+            playlist = f.read().splitlines()
+        self.assertEqual(playlist[0], "#EXTM3U")
+        self.assertEqual(playlist[2::2], ["book_001.wav", "book_002.wav", "book_003.wav"])
+        self.assertTrue(playlist[1].startswith("#EXTINF:") and playlist[1].endswith(",一。"))
+        self.assertTrue(playlist[5].endswith(",五。"))
+
+        # target, silence, translation, silence, target, transition
+        durations = [len(AudioSegment.from_file(file)) for file in files]
+        per_sentence = [2 * speech_ms(sentence) + 2 * 100 + speech_ms(f"ja {sentence}") + 200 for sentence in sentences]
+        for duration, expected in zip(durations, [sum(per_sentence[0:2]), sum(per_sentence[2:4]), per_sentence[4]]):
+            self.assertAlmostEqual(duration, expected, delta=5)
+
+        # A chunk is closed once it is at least as long as --chunk-minutes
+        files = create_audio(
+            iter(sentences), self.transition_sound, output_file, "ja", chunk_minutes=per_sentence[0] / 60000, **kwargs
+        )
+        self.assertEqual(len(files), len(sentences))
+
+    def test_chunks_take_the_extension_of_the_format(self):
+        output_file = os.path.join(self.temp_dir.name, "book.wav")
+        files = create_audio(
+            iter(["一。", "二。"]),
+            self.transition_sound,
+            output_file,
+            "ja",
+            interval=100,
+            target_repeat=1,
+            translation_repeat=1,
+            translate_batch_func=fake_translate_batch,
+            verbose=False,
+            tts_pool=TTSPool(engine=get_tts_engine("tone")),
+            encoding=EncodingSettings("opus"),
+            chunk_sentences=1,
+        )
+        self.assertEqual([os.path.basename(file) for file in files], ["book_001.opus", "book_002.opus"])
+
+    def test_empty_input_writes_no_chunks(self):
+        output_file = os.path.join(self.temp_dir.name, "book.mp3")
+        files = create_audio(
+            iter([]),
+            self.transition_sound,
+            output_file,
+            "ja",
+            interval=100,
+            target_repeat=1,
+            translation_repeat=1,
+            translate_batch_func=fake_translate_batch,
+            verbose=False,
+            tts_pool=TTSPool(engine=get_tts_engine("tone")),
+            chunk_minutes=30,
+        )
+        self.assertEqual(files, [])
+        self.assertEqual(sorted(os.listdir(self.temp_dir.name)), ["bell.wav"])
+
+
+if __name__ == "__main__":
+    unittest.main()
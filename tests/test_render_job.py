@@ -0,0 +1,137 @@
+import os
+import tempfile
+import time
+import unittest
+from types import SimpleNamespace
+
+from pydub import AudioSegment  # type: ignore
+
+from dualang.audio_format import AudioFormat
+from dualang.render_job import MANIFEST_FILE, RenderJob, job_key, prune_jobs
+
+
+def cue(start, end, text):
+    return SimpleNamespace(start=start, end=end, text=text)
+
+
+class TestRenderJob(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.work_dir = os.path.join(self.temp_dir.name, "job")
+        self.audio_format = AudioFormat(16000, 1, 2)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_saved_segments_survive_a_new_run(self):
+        job = RenderJob(self.work_dir, self.audio_format)
+        first, second = cue(0, 1000, "こんにちは"), cue(1000, 2000, "さようなら")
+        saved = job.save(first, [AudioSegment.silent(300, frame_rate=8000), AudioSegment.silent(200)])
+        self.assertEqual(AudioFormat.of(saved[0]), self.audio_format)
+        job.close()
+
+        resumed = RenderJob(self.work_dir, self.audio_format)
+        self.assertIn(cue(0, 1000, "こんにちは"), resumed)
+        self.assertNotIn(second, resumed)
+        self.assertEqual(resumed.count([first, second]), 1)
+        segment = resumed.load(first)
+        self.assertEqual(len(segment), 500)
+        self.assertEqual(segment.raw_data, b"".join(s.raw_data for s in saved))
+        resumed.close()
+
+    def test_truncated_manifest_line_is_ignored(self):
+        job = RenderJob(self.work_dir, self.audio_format)
+        job.save(cue(0, 1000, "a"), [AudioSegment.silent(100)])
+        job.close()
+        with open(os.path.join(self.work_dir, MANIFEST_FILE), "a") as f:
+            f.write('{"cue": "abc", "fi')
+
+        self.assertEqual(RenderJob(self.work_dir, self.audio_format).count([cue(0, 1000, "a")]), 1)
+
+    def test_no_resume_or_other_format_discards_segments(self):
+        job = RenderJob(self.work_dir, self.audio_format)
+        job.save(cue(0, 1000, "a"), [AudioSegment.silent(100)])
+        job.close()
+
+        self.assertNotIn(cue(0, 1000, "a"), RenderJob(self.work_dir, AudioFormat(24000, 1, 2)))
+
+        job = RenderJob(self.work_dir, self.audio_format)
+        job.save(cue(0, 1000, "a"), [AudioSegment.silent(100)])
+        job.close()
+        self.assertNotIn(cue(0, 1000, "a"), RenderJob(self.work_dir, self.audio_format, resume=False))
+
+    def test_only_removes_its_own_files(self):
+        os.makedirs(self.work_dir)
+        notes = os.path.join(self.work_dir, "notes.txt")
+        with open(notes, "w") as f:
+            f.write("mine")
+        with self.assertRaisesRegex(ValueError, "does not hold a render job"):
+            RenderJob(self.work_dir, self.audio_format)
+        os.remove(notes)
+
+        job = RenderJob(self.work_dir, self.audio_format)
+        job.save(cue(0, 1000, "a"), [AudioSegment.silent(100)])
+        job.close()
+        with open(notes, "w") as f:
+            f.write("mine")
+
+        # A job for another format starts over, but keeps the other file
+        job = RenderJob(self.work_dir, AudioFormat(24000, 1, 2))
+        self.assertNotIn(cue(0, 1000, "a"), job)
+        self.assertTrue(os.path.isfile(notes))
+
+        # So does removing the job after a completed run
+        job.save(cue(0, 1000, "a"), [AudioSegment.silent(100)])
+        job.remove()
+        self.assertEqual(os.listdir(self.work_dir), ["notes.txt"])
+
+        # The work directory goes with the job if nothing else is left in it
+        os.remove(notes)
+        RenderJob(self.work_dir, self.audio_format).remove()
+        self.assertFalse(os.path.exists(self.work_dir))
+
+    def make_job(self, jobs_dir, name, milliseconds, age_days):
+        """Creates a closed job with one segment, last written `age_days` ago."""
+        job = RenderJob(os.path.join(jobs_dir, name), self.audio_format)
+        job.save(cue(0, 1000, name), [AudioSegment.silent(milliseconds, frame_rate=16000)])
+        job.close()
+        written = time.time() - age_days * 24 * 60 * 60
+        os.utime(os.path.join(jobs_dir, name, MANIFEST_FILE), (written, written))
+        return job
+
+    def test_prune_jobs_removes_old_and_least_recent_jobs(self):
+        jobs_dir = os.path.join(self.temp_dir.name, "jobs")
+        # 100 ms of 16 kHz mono is 3200 bytes
+        for name, age_days in [("expired", 30), ("oldest", 3), ("older", 2), ("recent", 1), ("kept", 20)]:
+            self.make_job(jobs_dir, name, 100, age_days)
+
+        prune_jobs(jobs_dir, keep=os.path.join(jobs_dir, "kept"), max_bytes=11000, max_age_days=14)
+        self.assertEqual(sorted(os.listdir(jobs_dir)), ["kept", "older", "recent"])
+
+    def test_prune_jobs_leaves_open_jobs(self):
+        jobs_dir = os.path.join(self.temp_dir.name, "jobs")
+        self.make_job(jobs_dir, "closed", 100, 30)
+        self.make_job(jobs_dir, "open", 100, 30)
+        job = RenderJob(os.path.join(jobs_dir, "open"), self.audio_format)
+        os.utime(os.path.join(jobs_dir, "open", MANIFEST_FILE), (0, 0))
+
+        prune_jobs(jobs_dir, max_bytes=0)
+        self.assertEqual(os.listdir(jobs_dir), ["open"])
+        self.assertEqual(job.count([cue(0, 1000, "open")]), 1)
+        job.close()
+
+    def test_job_key_depends_on_input_and_settings(self):
+        input_audio = os.path.join(self.temp_dir.name, "input.wav")
+        with open(input_audio, "wb") as f:
+            f.write(b"audio")
+        key = job_key(input_audio, "EN-US", "deepl", 100)
+        self.assertEqual(job_key(input_audio, "EN-US", "deepl", 100), key)
+        self.assertNotEqual(job_key(input_audio, "DE", "deepl", 100), key)
+
+        with open(input_audio, "ab") as f:
+            f.write(b"more audio")
+        self.assertNotEqual(job_key(input_audio, "EN-US", "deepl", 100), key)
+
+
+if __name__ == "__main__":
+    unittest.main()
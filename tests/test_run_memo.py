@@ -0,0 +1,60 @@
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from dualang.run_memo import RunMemo
+
+
+class TestRunMemo(unittest.TestCase):
+    def test_computes_each_key_once(self):
+        memo = RunMemo(["a", "b", "a", "a"])
+        computed = []
+
+        def compute_many(keys):
+            computed.extend(keys)
+            return [key.upper() for key in keys]
+
+        self.assertEqual(memo.get_many(["a", "b", "a"], compute_many), ["A", "B", "A"])
+        self.assertEqual(memo.get("a", lambda: "?"), "A")
+        self.assertEqual(computed, ["a", "b"])
+        self.assertEqual((memo.calls, memo.saved), (2, 2))
+
+    def test_releases_values_after_last_use(self):
+        memo = RunMemo(["a", "a"])
+        memo.get("a", lambda: 1)
+        memo.get("a", lambda: 2)
+        # Requests beyond the listed ones are computed again
+        self.assertEqual(memo.get("a", lambda: 3), 3)
+        self.assertEqual(memo._values, {})
+
+    def test_concurrent_requests_wait_for_the_value(self):
+        memo = RunMemo(["a"] * 8)
+        calls = []
+        lock = threading.Lock()
+
+        def compute():
+            with lock:
+                calls.append(1)
+            time.sleep(0.05)
+            return "A"
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            values = list(executor.map(lambda _: memo.get("a", compute), range(8)))
+        self.assertEqual(values, ["A"] * 8)
+        self.assertEqual(len(calls), 1)
+
+    def test_failure_is_raised_to_every_request(self):
+        memo = RunMemo(["a", "a"])
+
+        def fail():
+            raise RuntimeError("failed")
+
+        with self.assertRaises(RuntimeError):
+            memo.get("a", fail)
+        with self.assertRaises(RuntimeError):
+            memo.get("a", lambda: "A")
+
+
+if __name__ == "__main__":
+    unittest.main()
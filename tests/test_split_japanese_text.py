@@ -1,6 +1,6 @@
 import unittest
 
-from dualang.split_japanese_text import split_japanese_text
+from dualang.split_japanese_text import iter_sentences, split_japanese_text
 
 
 class TestSplitJapaneseText(unittest.TestCase):
@@ -22,6 +22,27 @@ class TestSplitJapaneseText(unittest.TestCase):
             ["今日はいい天気ですね散歩に行きませんかいいえ忙しいです"],
         )
 
+    def test_quotes_ellipses_and_line_breaks(self):
+        text = "「行こう。」と彼は言った。「待って」「いや！」それは……違う\n改行の前\n\n最後の文"
+        self.assertEqual(
+            split_japanese_text(text),
+            ["「行こう。」と彼は言った。", "「待って」", "「いや！」それは……", "違う", "改行の前", "最後の文"],
+        )
+        self.assertEqual(split_japanese_text("本当？！嘘でしょ!?ええ..."), ["本当？！", "嘘でしょ!?", "ええ..."])
+
+    def test_iter_sentences_streams_chunks(self):
+        text = "今日はいい天気ですね！？散歩に「行きませんか。」いいえ……忙しいです。\n最後"
+        # Sentences and runs of punctuation split across chunks of every size
+        for size in range(1, len(text) + 1):
+            chunks = [text[i : i + size] for i in range(0, len(text), size)]
+            self.assertEqual(list(iter_sentences(chunks)), split_japanese_text(text), size)
+
+        def lines():
+            yield "一文目。二文目\n"
+            raise AssertionError("Read past the first line")
+
+        self.assertEqual(list(zip(range(2), iter_sentences(lines()))), [(0, "一文目。"), (1, "二文目")])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -2,7 +2,15 @@ import os
 import unittest
 import tempfile
 
-from dualang.subtitle_loader import load_subtitle_file, Subtitle
+from dualang.subtitle_loader import (
+    CueTable,
+    iter_subtitles,
+    load_cue_table,
+    load_subtitle_file,
+    parse_cues,
+    Subtitle,
+    SubtitleError,
+)
 
 
 class TestSubtitleLoader(unittest.TestCase):
@@ -37,6 +45,99 @@ class TestSubtitleLoader(unittest.TestCase):
             self.assertEqual(subtitles[0].text, "This is a test.")
             os.remove(temp.name)
 
+    def test_parse_srt_cues(self):
+        lines = [
+            "\ufeff1\r\n",
+            "00:00:01,000 --> 00:00:02,500\r\n",
+            "<i>First line</i>\r\n",
+            "second line\r\n",
+            "\r\n",
+            "\r\n",
+            "2\n",
+            "01:02:03,004 --> 01:02:04,000\n",
+            "Last",
+        ]
+        subtitles = list(parse_cues(lines[1:]))
+        self.assertEqual(
+            subtitles,
+            [
+                Subtitle(1000, 2500, "<i>First line</i>\nsecond line"),
+                Subtitle(3723004, 3724000, "Last"),
+            ],
+        )
+
+    def test_parse_vtt_cues(self):
+        vtt_content = (
+            "WEBVTT - Episode 1\n\n"
+            "NOTE a comment\nspanning two lines\n\n"
+            "STYLE\n::cue { color: yellow }\n\n"
+            "intro\n"
+            "00:01.250 --> 00:03.750 align:start position:10%\n"
+            "<v Bob>Tom &amp; <i>Jerry</i></v>\n\n"
+            "1:00:00.000 --> 1:00:01.000\n"
+            "Later\n"
+        )
+        subtitles = list(parse_cues(vtt_content.splitlines(keepends=True), vtt=True))
+        self.assertEqual(subtitles, [Subtitle(1250, 3750, "Tom & Jerry"), Subtitle(3600000, 3601000, "Later")])
+
+    def test_parse_cues_is_lazy(self):
+        def lines():
+            yield "00:00:01,000 --> 00:00:02,000\n"
+            yield "First\n"
+            yield "\n"
+            raise AssertionError("Read past the first cue")
+
+        self.assertEqual(next(parse_cues(lines())), Subtitle(1000, 2000, "First"))
+
+    def test_short_fractions(self):
+        srt = ["1\n", "00:00:01,5 --> 0:00:02,25\n", "Text\n"]
+        self.assertEqual(list(parse_cues(srt)), [Subtitle(1500, 2250, "Text")])
+        vtt = ["WEBVTT\n", "\n", "00:01.5 --> 1:00:02.05\n", "Text\n"]
+        self.assertEqual(list(parse_cues(vtt, vtt=True)), [Subtitle(1500, 3602050, "Text")])
+
+    def test_invalid_timing_raises(self):
+        with self.assertRaisesRegex(SubtitleError, r"episode.srt:2: Invalid cue timing"):
+            list(parse_cues(["1\n", "00:00:01 --> 00:00:02,000\n", "Text\n"], name="episode.srt"))
+
+    def test_errors_raise(self):
+        with self.assertRaises(SubtitleError):
+            load_subtitle_file("tests/missing.srt")
+        with tempfile.TemporaryDirectory() as temp_dir:
+            unsupported = os.path.join(temp_dir, "subtitles.sub")
+            empty = os.path.join(temp_dir, "empty.srt")
+            latin1 = os.path.join(temp_dir, "latin1.srt")
+            for path, content in [
+                (unsupported, b""),
+                (empty, b"\n"),
+                (latin1, "00:00:01,000 --> 00:00:02,000\nCaf\u00e9\n".encode("latin-1")),
+            ]:
+                with open(path, "wb") as f:
+                    f.write(content)
+            with self.assertRaisesRegex(SubtitleError, "Unsupported"):
+                load_subtitle_file(unsupported)
+            with self.assertRaisesRegex(SubtitleError, "empty"):
+                load_subtitle_file(empty)
+            with self.assertRaisesRegex(SubtitleError, "utf-8"):
+                load_subtitle_file(latin1)
+            self.assertEqual(list(iter_subtitles(latin1, encoding="latin-1"))[0].text, "Caf\u00e9")
+
+    def test_cue_table(self):
+        subtitles = list(iter_subtitles("tests/test.ass"))
+        table = load_cue_table("tests/test.ass")
+        self.assertEqual(len(table), len(subtitles))
+        self.assertEqual(list(table), subtitles)
+        self.assertEqual(table[1], Subtitle(3850, 5310, "お前ら 剣を抜け"))
+        self.assertEqual(table[-1], subtitles[-1])
+
+        tail = table[1:]
+        self.assertIsInstance(tail, CueTable)
+        self.assertEqual(list(tail), subtitles[1:])
+        self.assertEqual(tail.starts.typecode, "i")
+
+        table.append(Subtitle(1, 2, "x"))
+        self.assertEqual(len(tail), len(subtitles) - 1)
+        self.assertEqual(table[len(subtitles)], Subtitle(1, 2, "x"))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,59 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+
+from dualang.tracing import span, start_tracing, stop_tracing
+
+
+class TestTracing(unittest.TestCase):
+    def tearDown(self):
+        stop_tracing()
+
+    def test_spans_are_ignored_without_tracer(self):
+        with span("tts.request", engine="tone") as trace:
+            trace["bytes"] = 10
+        self.assertEqual(trace, {"engine": "tone", "bytes": 10})
+
+    def test_records_spans_from_threads(self):
+        tracer = start_tracing()
+
+        def work(hit):
+            with span("tts.cache") as trace:
+                trace["cache_hit"] = hit
+            with span("tts.request", bytes=1024 * 1024):
+                pass
+
+        threads = [threading.Thread(target=work, args=(i % 2 == 0,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        with span("translate.memory", lookups=10) as trace:
+            trace["cache_hits"] = 7
+        stop_tracing()
+        with span("ignored"):
+            pass
+
+        summary = tracer.summary().splitlines()
+        self.assertEqual(len(summary), 4)
+        rows = {line.split()[0]: line.split() for line in summary[1:]}
+        self.assertEqual(rows["tts.cache"][-1], "2/4")
+        self.assertEqual(rows["tts.request"][1], "4")
+        self.assertEqual(rows["tts.request"][-2], "4.0")
+        self.assertEqual(rows["translate.memory"][-1], "7/10")
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            trace_file = os.path.join(temp_dir, "trace.json")
+            tracer.write(trace_file)
+            with open(trace_file) as f:
+                events = json.load(f)["traceEvents"]
+        spans = [event for event in events if event["ph"] == "X"]
+        self.assertEqual(len(spans), 9)
+        self.assertEqual({event["cat"] for event in spans}, {"tts", "translate"})
+        self.assertTrue(any(event["ph"] == "M" for event in events))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import os
+import tempfile
+import unittest
+
+from dualang.translation_memory import TranslationMemory
+from dualang.translator import build_batch_translator, TranslationStrategy
+
+
+class TestTranslationMemory(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.memory_file = os.path.join(self.temp_dir.name, "translations.sqlite3")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_wrap_batch_only_translates_new_texts(self):
+        calls = []
+
+        def translate_batch(texts, target_lang):
+            calls.extend(texts)
+            return [f"{target_lang}:{text}" for text in texts]
+
+        memory = TranslationMemory(self.memory_file)
+        translate_batch_func = memory.wrap_batch(translate_batch, "test")
+        self.assertEqual(translate_batch_func(["はい"], target_lang="EN-US"), ["EN-US:はい"])
+        self.assertEqual(translate_batch_func(["はい"], target_lang="EN-US"), ["EN-US:はい"])
+        self.assertEqual(translate_batch_func(["はい"], target_lang="DE"), ["DE:はい"])
+        self.assertEqual(calls, ["はい", "はい"])
+        self.assertEqual((memory.hits, memory.misses), (1, 2))
+        memory.close()
+
+        # Translations persist across runs
+        memory = TranslationMemory(self.memory_file)
+        memory.wrap_batch(translate_batch, "test")(["はい"], target_lang="EN-US")
+        self.assertEqual(len(calls), 2)
+        memory.close()
+
+    def test_wrap_batch_translates_unique_missing_texts_once(self):
+        calls = []
+
+        def translate_batch(texts, target_lang):
+            calls.append(list(texts))
+            return [f"{target_lang}:{text}" for text in texts]
+
+        memory = TranslationMemory(self.memory_file)
+        memory.put("はい", "EN-US", "test", "Yes")
+        translate_batch_func = memory.wrap_batch(translate_batch, "test")
+        self.assertEqual(
+            translate_batch_func(["え?", "はい", "え?", "いいえ"], target_lang="EN-US"),
+            ["EN-US:え?", "Yes", "EN-US:え?", "EN-US:いいえ"],
+        )
+        self.assertEqual(calls, [["え?", "いいえ"]])
+        memory.close()
+
+    def test_build_batch_translator_with_memory(self):
+        memory = TranslationMemory(self.memory_file)
+        translate_batch_func = build_batch_translator(TranslationStrategy.FAKE, memory)
+        self.assertEqual(translate_batch_func(["はい"], target_lang="EN-US"), ["[EN-US] Hello world"])
+        self.assertEqual(memory.get("はい", "EN-US", "fake"), "[EN-US] Hello world")
+        memory.close()
+
+    def test_export_and_import(self):
+        memory = TranslationMemory(self.memory_file)
+        memory.put("はい", "EN-US", "deepl", "Yes")
+        export_file = os.path.join(self.temp_dir.name, "memory.json")
+        self.assertEqual(memory.export_json(export_file), 1)
+        memory.close()
+
+        other = TranslationMemory(os.path.join(self.temp_dir.name, "other.sqlite3"))
+        self.assertEqual(other.import_json(export_file), 1)
+        self.assertEqual(other.get("はい", "EN-US", "deepl"), "Yes")
+        other.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,28 @@
+import unittest
+
+from dualang.translator import build_batch_translator, chunk_texts, TranslationStrategy
+
+
+class TestTranslator(unittest.TestCase):
+    def test_fake_batch_translator_keeps_order(self):
+        translate_batch_func = build_batch_translator(TranslationStrategy.FAKE)
+        self.assertEqual(
+            translate_batch_func(["はい", "いいえ"], target_lang="EN-US"),
+            ["[EN-US] Hello world", "[EN-US] Hello world"],
+        )
+        self.assertEqual(translate_batch_func([], target_lang="EN-US"), [])
+
+    def test_chunk_texts_by_count(self):
+        texts = [str(i) for i in range(7)]
+        chunks = list(chunk_texts(texts, max_count=3, max_bytes=1000))
+        self.assertEqual(chunks, [["0", "1", "2"], ["3", "4", "5"], ["6"]])
+
+    def test_chunk_texts_by_bytes(self):
+        # Each Japanese character is 3 bytes in UTF-8
+        texts = ["はい", "いいえ", "え", "x" * 20]
+        chunks = list(chunk_texts(texts, max_count=50, max_bytes=16))
+        self.assertEqual(chunks, [["はい", "いいえ"], ["え"], ["x" * 20]])
+
+
+if __name__ == "__main__":
+    unittest.main()
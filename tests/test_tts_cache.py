@@ -0,0 +1,131 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from dualang.tts import synthesize_to_file
+from dualang.tts_cache import TTSCache
+from dualang.tts_engine import ToneEngine
+
+
+class TestTTSCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.temp_dir.name, "tts")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _make_clip(self, size):
+        fd, path = tempfile.mkstemp(dir=self.temp_dir.name)
+        with os.fdopen(fd, "wb") as f:
+            f.write(b"\0" * size)
+        return path
+
+    def _put(self, cache, text, size, age=None):
+        """Stores a clip of `size` bytes last used `age` seconds ago, unpinned."""
+        path = cache.put("gtts", "ja", text, self._make_clip(size))
+        cache.release(path)
+        if age is not None:
+            os.utime(path, (time.time() - age, time.time() - age))
+        return path
+
+    def test_put_and_get(self):
+        cache = TTSCache(self.cache_dir)
+        self.assertIsNone(cache.get("gtts", "ja", "はい"))
+
+        path = self._put(cache, "はい", 10)
+        self.assertEqual(cache.get("gtts", "ja", "はい"), path)
+        self.assertIsNone(cache.get("gtts", "en", "はい"))
+        self.assertIsNone(cache.get("tone", "ja", "はい"))
+        self.assertEqual((cache.hits, cache.misses), (1, 3))
+
+        # A new instance sees clips stored by a previous run
+        self.assertEqual(TTSCache(self.cache_dir).get("gtts", "ja", "はい"), path)
+
+    def test_evicts_least_recently_used(self):
+        cache = TTSCache(self.cache_dir, max_bytes=25)
+        first = self._put(cache, "first", 10, age=300)
+        second = self._put(cache, "second", 10, age=200)
+
+        # Touch the first clip so that the second one becomes the oldest
+        cache.release(cache.get("gtts", "ja", "first"))
+        self._put(cache, "third", 10)
+
+        self.assertTrue(os.path.exists(first))
+        self.assertFalse(os.path.exists(second))
+        self.assertIsNotNone(cache.get("gtts", "ja", "third"))
+
+    def test_evicts_down_to_the_low_water_mark(self):
+        cache = TTSCache(self.cache_dir, max_bytes=100)
+        paths = [self._put(cache, str(i), 10, age=100 - i) for i in range(10)]
+
+        # The 11th clip brings the cache to 110 bytes, and the two oldest
+        # clips are evicted to get under 90
+        newest = self._put(cache, "new", 10)
+        self.assertEqual([os.path.exists(path) for path in paths], [False, False] + [True] * 8)
+        self.assertTrue(os.path.exists(newest))
+
+    def test_tiny_cache_keeps_pinned_clips(self):
+        cache = TTSCache(self.cache_dir, max_bytes=15)
+        first = cache.put("gtts", "ja", "first", self._make_clip(10))
+        second = cache.put("gtts", "ja", "second", self._make_clip(10))
+        self.assertEqual(second, cache.path_for("gtts", "ja", "second"))
+        # Both clips are still to be loaded, so the cache goes over its size for now
+        self.assertTrue(os.path.exists(first))
+        self.assertTrue(os.path.exists(second))
+
+        # Once released, the first clip is evicted by the next one
+        cache.release(first)
+        cache.release(second)
+        self.assertTrue(os.path.exists(self._put(cache, "third", 1)))
+        self.assertFalse(os.path.exists(first))
+
+        # Clips larger than the whole cache are not stored
+        clip = self._make_clip(20)
+        self.assertIsNone(cache.put("gtts", "ja", "large", clip))
+        self.assertTrue(os.path.exists(clip))
+        self.assertIsNone(cache.get("gtts", "ja", "large"))
+
+    def test_clips_pinned_by_another_cache_are_kept(self):
+        # Another process sharing the directory holds a clip that it is loading
+        other = TTSCache(self.cache_dir, max_bytes=15)
+        pinned = other.put("gtts", "ja", "pinned", self._make_clip(10))
+        os.utime(pinned, (time.time() - 300, time.time() - 300))
+
+        cache = TTSCache(self.cache_dir, max_bytes=15)
+        newest = self._put(cache, "new", 10)
+        self.assertTrue(os.path.exists(pinned))
+        self.assertTrue(os.path.exists(newest))
+
+        other.release(pinned)
+        self._put(cache, "newer", 10)
+        self.assertFalse(os.path.exists(pinned))
+
+    def test_failed_synthesis_leaves_no_file(self):
+        cache = TTSCache(self.cache_dir)
+        engine = ToneEngine()
+        temp_files = []
+
+        def save(text, lang, path):
+            temp_files.append(path)
+            raise RuntimeError("TTS failed")
+
+        with mock.patch.object(engine, "save", side_effect=save):
+            with self.assertRaisesRegex(RuntimeError, "TTS failed"):
+                synthesize_to_file("はい", "ja", cache, engine=engine)
+        self.assertFalse(os.path.exists(temp_files[0]))
+
+    def test_synthesize_with_empty_cache(self):
+        cache = TTSCache(self.cache_dir, max_bytes=0)
+        for _ in range(2):
+            speech_file = synthesize_to_file("はい", "ja", cache, engine=ToneEngine())
+            self.assertTrue(speech_file.temporary)
+            self.assertGreater(len(speech_file.load()), 0)
+            self.assertFalse(os.path.exists(speech_file.path))
+        self.assertEqual(os.listdir(self.cache_dir), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import os
+import tempfile
+import unittest
+
+from pydub import AudioSegment  # type: ignore
+
+from dualang.audio_format import AudioFormat
+from dualang.tts import synthesize, synthesize_to_file
+from dualang.tts_cache import TTSCache
+from dualang.tts_engine import ToneEngine, TTSEngine, get_tts_engine
+
+
+class TestToneEngine(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.engine = get_tts_engine("tone")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_is_deterministic_and_scales_with_text(self):
+        short = synthesize("Hello", "en", engine=self.engine)
+        self.assertEqual(AudioFormat.of(short), self.engine.audio_format)
+        self.assertEqual(len(short), ToneEngine.BASE_MS + 5 * ToneEngine.MS_PER_CHARACTER)
+        self.assertEqual(synthesize("Hello", "en", engine=self.engine).raw_data, short.raw_data)
+        self.assertNotEqual(synthesize("Hallo", "en", engine=self.engine).raw_data, short.raw_data)
+        self.assertGreater(len(synthesize("Hello world", "en", engine=self.engine)), len(short))
+
+    def test_cached_by_engine(self):
+        cache = TTSCache(os.path.join(self.temp_dir.name, "tts"))
+        speech_file = synthesize_to_file("Hello", "en", cache, engine=self.engine)
+        self.assertFalse(speech_file.temporary)
+        self.assertTrue(speech_file.path.endswith(".wav"))
+        self.assertEqual(cache.get("tone", "en", "Hello", "wav"), speech_file.path)
+        self.assertIsNone(cache.get("gtts", "en", "Hello"))
+        self.assertIsInstance(speech_file.load(), AudioSegment)
+
+    def test_unknown_engine(self):
+        with self.assertRaises(ValueError):
+            get_tts_engine("espeak")
+
+    def test_engines_must_implement_save(self):
+        class Silent(TTSEngine):
+            name = "silent"
+
+        with self.assertRaises(TypeError):
+            Silent()
+
+
+if __name__ == "__main__":
+    unittest.main()
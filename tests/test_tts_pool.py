@@ -0,0 +1,45 @@
+import random
+import threading
+import time
+import unittest
+from unittest import mock
+
+from dualang.tts import RateLimiter
+from dualang.tts_pool import TTSPool
+
+
+class TestTTSPool(unittest.TestCase):
+    def test_imap_keeps_request_order(self):
+        lock = threading.Lock()
+        active = [0, 0]  # current, maximum
+
+        def fake_synthesize(text, lang, cache, rate_limiter, engine):
+            with lock:
+                active[0] += 1
+                active[1] = max(active[1], active[0])
+            time.sleep(random.uniform(0, 0.01))
+            with lock:
+                active[0] -= 1
+            return f"{lang}:{text}"
+
+        requests = [(str(i), "ja") for i in range(40)]
+        with mock.patch("dualang.tts_pool.synthesize", fake_synthesize):
+            clips = list(TTSPool(workers=4).imap(requests))
+
+        self.assertEqual(clips, [f"ja:{i}" for i in range(40)])
+        self.assertLessEqual(active[1], 4)
+
+    def test_rejects_invalid_worker_count(self):
+        with self.assertRaises(ValueError):
+            TTSPool(workers=0)
+
+    def test_rate_limiter_spaces_out_requests(self):
+        rate_limiter = RateLimiter(requests_per_second=100)
+        start = time.monotonic()
+        for _ in range(6):
+            rate_limiter.wait()
+        self.assertGreaterEqual(time.monotonic() - start, 0.05)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,22 @@
+import unittest
+from unittest import mock
+
+from dualang.util import add_label_to_file
+
+
+class TestAddLabelToFile(unittest.TestCase):
+    def test_sets_finder_tag_on_macos(self):
+        with mock.patch("dualang.util.sys.platform", "darwin"), mock.patch("dualang.util.xattr") as xattr:
+            add_label_to_file("output.mp3", "bilingual-audio")
+        xattr.setxattr.assert_called_once_with(
+            "output.mp3", "com.apple.metadata:_kMDItemUserTags", b"bilingual-audio"
+        )
+
+    def test_does_nothing_on_other_platforms(self):
+        with mock.patch("dualang.util.sys.platform", "linux"), mock.patch("dualang.util.xattr") as xattr:
+            add_label_to_file("output.mp3", "bilingual-audio")
+        xattr.setxattr.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()